@@ -0,0 +1,88 @@
+"""
+Offline load test of both pipelines against the fake Gemini backend.
+
+Measures throughput, injected faults and limiter waits reproducibly, with no
+network or quota. Run with: python benchmarks/bench_fake_backend.py --reviews 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from src.autoprompt import AutoPromptEngine
+from src.backends import FakeBackend
+from src.baseline import BaselinePipeline
+from src.client_pool import ClientProvider
+from src.evaluator import Evaluator
+from src.rate_limiter import RateLimiter
+from src.utils import Review, iter_reviews
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", default="config/prompt_config.yaml")
+    parser.add_argument("--reviews", type=int, default=200, help="Reviews per pipeline (sample data is cycled)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rpm", type=float, default=6000, help="Shared requests-per-minute limit")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Override the mean fake latency")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    settings = dict(config.get("backend", {}), type="fake")
+    if args.latency_ms is not None:
+        settings["latency"] = dict(settings.get("latency", {}), mean_ms=args.latency_ms)
+    config.update(backend=settings, cache={"enabled": False},
+                  rate_limits={"requests_per_minute": args.rpm, "burst": args.concurrency})
+    config["variant_selection"] = dict(config.get("variant_selection", {}), state_path=None)
+
+    # Reuse the labelled sample with unique ids so every review is a fresh request
+    samples = list(iter_reviews(settings.get("reviews_path", "data/reviews.csv")))
+    reviews = [
+        Review(review_id=f"{i}-{r.review_id}", review_text=r.review_text)
+        for i, r in enumerate(islice(cycle(samples), args.reviews))
+    ]
+
+    evaluator = Evaluator(settings.get("ground_truth_path", "data/ground_truth.json"))
+    for name, pipeline_cls in [("baseline", BaselinePipeline), ("autoprompt", AutoPromptEngine)]:
+        backend = FakeBackend.from_config(settings)
+        provider = ClientProvider.from_config(config, backend=backend)
+        limiter = RateLimiter.from_config(config)
+        pipeline = pipeline_cls(config, rate_limiter=limiter, provider=provider)
+
+        start = time.perf_counter()
+        results = asyncio.run(pipeline.process_many(reviews, concurrency=args.concurrency))
+        elapsed = time.perf_counter() - start
+
+        # Map the synthetic ids back to their labelled originals for scoring
+        for result in results:
+            result.review_id = result.review_id.split("-", 1)[1]
+        metrics = evaluator.calculate_metrics(results)
+
+        print(f"\n{name.upper()}")
+        print(f"  reviews/s:        {len(results) / elapsed:.1f} ({elapsed:.2f}s for {len(results)})")
+        print(f"  backend calls:    {backend.calls} ({backend.calls / len(results):.2f} per review)")
+        print(f"  injected faults:  {backend.injected}")
+        print(f"  connections:      {provider.stats()['connections_opened']} opened, "
+              f"{provider.stats()['reuse_rate']:.0%} of calls reused one")
+        print(f"  limiter wait:     {limiter.total_wait:.2f}s total")
+        print(f"  accuracy:         {metrics['overall_accuracy']:.1f}% "
+              f"(failure rate {metrics['failure_rate']:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
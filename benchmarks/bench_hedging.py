@@ -0,0 +1,68 @@
+"""
+Benchmark: tail latency of model calls with and without hedged requests, on the fake backend.
+
+Run with: python benchmarks/bench_hedging.py --calls 2000 --sigma 1.0
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backends import FakeBackend
+from src.client_pool import ClientProvider
+from src.hedging import HedgePolicy
+from src.json_extract import extract_json
+from src.llm import LLMClient
+from src.rate_limiter import RateLimiter
+
+PROMPT = "Extract product, sentiment and reason as JSON. Review: 'I love this coffee maker'"
+
+
+async def run(client: LLMClient, calls: int, concurrency: int) -> np.ndarray:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            await client.generate_async(PROMPT, parse=extract_json)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mean-ms", type=float, default=50, help="Mean fake latency")
+    parser.add_argument("--sigma", type=float, default=1.0, help="Lognormal spread (larger = heavier tail)")
+    parser.add_argument("--percentile", type=float, default=95, help="Hedge after this call-latency percentile")
+    parser.add_argument("--budget", type=float, default=0.1, help="Extra calls allowed per call")
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, lognormal latency mean {args.mean_ms:.0f}ms sigma {args.sigma}, "
+          f"concurrency {args.concurrency}")
+    baseline_p99 = None
+    hedged = HedgePolicy(percentile=args.percentile, budget=args.budget, min_samples=50, holdout=0)
+    for label, hedging in [("no hedging", None), (f"hedged at p{args.percentile:g}", hedged)]:
+        backend = FakeBackend(latency={"distribution": "lognormal", "mean_ms": args.mean_ms, "sigma": args.sigma},
+                              seed=0)
+        provider = ClientProvider(backend)
+        client = LLMClient(provider.get_model("fake"), "fake", RateLimiter(requests_per_minute=1e9),
+                           hedging=hedging)
+        latencies = asyncio.run(run(client, args.calls, args.concurrency)) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        baseline_p99 = baseline_p99 or p99
+        print(f"  {label:16} p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  p99 {p99:7.1f}ms  "
+              f"({backend.calls / args.calls - 1:+.1%} calls, p99 {p99 / baseline_p99 - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
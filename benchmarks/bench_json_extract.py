@@ -0,0 +1,54 @@
+"""
+Microbenchmark: shared linear-time JSON extractor vs the old two-regex approach.
+
+Run with: python benchmarks/bench_json_extract.py
+"""
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.json_extract import extract_json
+
+
+def legacy_extract_json(text: str) -> dict:
+    """The regex-based extractor previously duplicated in both pipelines"""
+    text = text.strip()
+    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if json_match:
+        text = json_match.group(1)
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if json_match:
+        text = json_match.group(0)
+    return json.loads(text)
+
+
+PAYLOAD = '{"product": "coffee maker", "sentiment": "positive", "reason": "brews \\"fast\\" and hot"}'
+NOISE = "The customer seems happy overall, although shipping took a while. "
+
+
+def make_cases():
+    """Long, noisy responses on which both extractors succeed"""
+    return {
+        "fenced, short": f"Here you go:\n```json\n{PAYLOAD}\n```",
+        "fenced, 50KB chatter after": f"```json\n{PAYLOAD}\n```\n" + NOISE * 750,
+        "bare, 200KB chatter after": f"Answer: {PAYLOAD}\n" + NOISE * 3000,
+        "bare, 200KB chatter before": NOISE * 3000 + PAYLOAD,
+    }
+
+
+def main():
+    print(f"{'case':<30} {'legacy (us)':>12} {'shared (us)':>12} {'speedup':>8}")
+    for name, text in make_cases().items():
+        assert legacy_extract_json(text) == extract_json(text)
+        number = 200
+        legacy = timeit.timeit(lambda: legacy_extract_json(text), number=number) / number * 1e6
+        shared = timeit.timeit(lambda: extract_json(text), number=number) / number * 1e6
+        print(f"{name:<30} {legacy:>12.1f} {shared:>12.1f} {legacy / shared:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
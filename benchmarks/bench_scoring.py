@@ -0,0 +1,62 @@
+"""
+Benchmark: scoring candidate extractions one dict at a time vs in one vectorized batch.
+
+Run with: python benchmarks/bench_scoring.py --candidates 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.scoring import HeuristicScorer
+
+PRODUCTS = ["coffee maker", "Pixel 9", "a", "", "ultra-wide curved gaming monitor with a very long name indeed", None]
+SENTIMENTS = ["positive", "Negative", "neutral", "MIXED", "great", None]
+REASONS = ["brews fast and hot", "ok", "", None, "battery lasts the whole day"]
+
+
+def make_candidates(n: int, seed: int = 0) -> pd.DataFrame:
+    """Candidate extractions with a realistic mix of good, partial and broken fields"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "product": np.array(PRODUCTS, dtype=object)[rng.integers(len(PRODUCTS), size=n)],
+        "sentiment": np.array(SENTIMENTS, dtype=object)[rng.integers(len(SENTIMENTS), size=n)],
+        "reason": np.array(REASONS, dtype=object)[rng.integers(len(REASONS), size=n)],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", default="config/prompt_config.yaml")
+    parser.add_argument("--candidates", type=int, default=1000000)
+    parser.add_argument("--scalar-sample", type=int, default=100000,
+                        help="Candidates scored one by one (extrapolated to the full count)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        scorer = HeuristicScorer.from_config(yaml.safe_load(f))
+    frame = make_candidates(args.candidates)
+
+    start = time.perf_counter()
+    batch_scores = scorer.score_batch(frame)
+    batch_seconds = time.perf_counter() - start
+
+    sample = frame.head(args.scalar_sample).to_dict("records")
+    start = time.perf_counter()
+    scalar_scores = [scorer.score(candidate) for candidate in sample]
+    scalar_seconds = (time.perf_counter() - start) * args.candidates / len(sample)
+
+    assert np.allclose(batch_scores[:len(sample)], scalar_scores)
+    print(f"{args.candidates:,} candidates, {len(scorer.rules)} rules")
+    print(f"  one at a time: {scalar_seconds:8.2f}s (extrapolated from {len(sample):,})")
+    print(f"  vectorized:    {batch_seconds:8.2f}s ({scalar_seconds / batch_seconds:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
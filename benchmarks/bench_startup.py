@@ -0,0 +1,108 @@
+"""
+Benchmark: startup cost of the package and entry points, measured with python -X importtime.
+
+Each target is imported (or run) in a fresh interpreter `--repeat` times and the
+fastest run is kept. Save a run with --json and pass it back with --compare to
+track regressions; --max-ms fails (exit 1) when importing `src` gets slower.
+
+Run with: python benchmarks/bench_startup.py --repeat 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (label, python -c code): what a short job pays before doing any work
+TARGETS = [
+    ("import src", "import src"),
+    ("import src.baseline", "import src.baseline"),
+    ("import src.autoprompt", "import src.autoprompt"),
+    ("import src.evaluator", "import src.evaluator"),
+    ("import visualize_results", "import visualize_results"),
+    ("main.py --help", "import sys, runpy; sys.argv = ['main.py', '--help']; runpy.run_path('main.py', run_name='__main__')"),
+]
+
+
+def parse_importtime(stderr: str):
+    """(self_us, cumulative_us, module, depth) for each `import time:` line"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), name.strip(), depth))
+    return rows
+
+
+def measure(code: str):
+    """Wall seconds and parsed importtime rows for one fresh interpreter"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{result.stderr[-2000:]}")
+    return wall, parse_importtime(result.stderr)
+
+
+def summarize(rows, top: int) -> dict:
+    """Total import time and the packages that account for most of it"""
+    by_package = defaultdict(int)
+    for self_us, _, name, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "import_ms": sum(self_us for self_us, _, _, _ in rows) / 1000.0,
+        "modules": len(rows),
+        "heaviest": {package: us / 1000.0 for package, us in heaviest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per target (fastest kept)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages listed per target")
+    parser.add_argument("--json", metavar="PATH", help="Write the measurements to this file")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier --json output to compare against")
+    parser.add_argument("--max-ms", type=float, help="Fail if `import src` takes longer than this")
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["targets"]
+
+    results = {}
+    for label, code in TARGETS:
+        runs = [measure(code) for _ in range(args.repeat)]
+        wall, rows = min(runs, key=lambda run: run[0])
+        results[label] = dict(summarize(rows, args.top), wall_ms=wall * 1000.0)
+
+    print(f"Python {sys.version.split()[0]}, fastest of {args.repeat} fresh interpreters")
+    print(f"  {'target':26} {'wall':>9} {'imports':>9} {'modules':>8}  heaviest packages (self time)")
+    for label, result in results.items():
+        delta = ""
+        if label in previous:
+            delta = f" ({result['import_ms'] - previous[label]['import_ms']:+.0f}ms)"
+        heaviest = ", ".join(f"{package} {ms:.0f}ms" for package, ms in result["heaviest"].items())
+        print(f"  {label:26} {result['wall_ms']:7.0f}ms {result['import_ms']:7.0f}ms {result['modules']:8}"
+              f"  {heaviest}{delta}")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "targets": results}, f, indent=2)
+
+    if args.max_ms is not None and results["import src"]["import_ms"] > args.max_ms:
+        print(f"import src took {results['import src']['import_ms']:.0f}ms (limit {args.max_ms:.0f}ms)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,22 @@
 import os
 from dotenv import load_dotenv
-from src.utils import load_reviews, save_results, Review, ExtractedData
+from src.utils import iter_reviews, save_results
+from src.streaming import stream_process
+from src.checkpoint import RunJournal
+from src.json_extract import repair_stats
 from src.baseline import BaselinePipeline
 from src.autoprompt import AutoPromptEngine
 from src.evaluator import Evaluator
+from src.rate_limiter import RateLimiter
+from src.cache import ResponseCache
+from src.client_pool import ClientProvider
+from src.dedup import DedupIndex
+from src.resilience import AdaptiveConcurrency
+from src import metrics, tracing
 from loguru import logger
-import time
+from itertools import islice
+import argparse
+import asyncio
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,71 +26,129 @@ logger.remove()
 logger.add("logs/run.log", rotation="500 MB", retention="10 days", level="INFO")
 logger.add(lambda msg: print(msg, end=""), level="INFO")
 
+async def run_pipelines(pipelines, journal, data_path, limit, concurrency):
+    """Stream reviews through each pipeline, journaling results as they complete"""
+    for name, pipeline in pipelines:
+        done = set(journal.completed(name))
+        if done:
+            logger.info(f"Resuming {name}: skipping {len(done)} completed reviews")
+        logger.info(f"Running {name} pipeline...")
+        reviews = (r for r in islice(iter_reviews(data_path), limit) if r.review_id not in done)
+        with journal.writer(name) as writer:
+            count = await stream_process(pipeline, reviews, writer, concurrency=concurrency)
+        logger.info(f"{name}: {count} new results written to {journal.path(name)}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the AutoPrompt vs Baseline benchmark")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run, skipping reviews it already completed")
+    return parser.parse_args()
+
 def main():
-    # Secure API key loading
-    API_KEY = os.getenv("GEMINI_API_KEY")
-    if not API_KEY:
-        raise ValueError(
-            "❌ GEMINI_API_KEY not found!\n"
-            "   1. Create a .env file in project root\n"
-            "   2. Add: GEMINI_API_KEY=your_key_here\n"
-            "   3. Get your key from: https://aistudio.google.com/app/apikey"
-        )
+    args = parse_args()
     
-    # Load secure configuration
+    # Load secure configuration (raises if GEMINI_API_KEY is needed but missing)
     from src.config_loader import load_secure_config
     config = load_secure_config()
     
     DATA_PATH = "data/reviews.csv"
     GROUND_TRUTH_PATH = "data/ground_truth.json"
-    
-    logger.info("Starting AutoPrompt MVP Benchmark")
-    logger.info("⚠️  Free tier detected - using rate-limited processing")
-    
-   # Load data
-    reviews_df = load_reviews(DATA_PATH)
-    
     # LIMIT: Only process first 20 reviews for testing
-    reviews_df = reviews_df.head(20)
+    REVIEW_LIMIT = 20
     
-    reviews = [Review(review_id=str(row['review_id']), 
-                     review_text=row['review_text']) 
-              for _, row in reviews_df.iterrows()]
+    if args.resume:
+        journal = RunJournal.resume(args.resume)
+        meta = journal.load_meta()
+        DATA_PATH = meta.get("data_path", DATA_PATH)
+        REVIEW_LIMIT = meta.get("limit", REVIEW_LIMIT)
+        logger.info(f"Resuming run {journal.run_id}")
+    else:
+        journal = RunJournal()
+        journal.save_meta({"data_path": DATA_PATH, "limit": REVIEW_LIMIT})
+        logger.info(f"Starting run {journal.run_id} (resume with: python main.py --resume {journal.run_id})")
     
-    logger.info(f"Loaded {len(reviews)} reviews (limited to first 20 for testing)")
-    
-    # Initialize pipelines
-    baseline = BaselinePipeline(config)
-    autoprompt = AutoPromptEngine(config)
+    logger.info("Starting AutoPrompt MVP Benchmark")
+    rate_limiter = RateLimiter.from_config(config)
+    cache = ResponseCache.from_config(config)
+    logger.info(f"Rate limit: {rate_limiter.requests_per_minute} requests/min shared by both pipelines "
+                f"({len(config.get('api_keys') or [None])} API key(s))")
     
-    # 1. Run Baseline with rate limiting
-    logger.info("Running baseline pipeline...")
-    baseline_results = []
-    for i, review in enumerate(reviews):
-        if i > 0:
-            time.sleep(7)  # Free tier: 10 req/min = wait 6 seconds minimum
-        baseline_results.append(baseline.process(review))
-    save_results(baseline_results, "results/baseline_results.json")
+    logger.info(f"Streaming reviews from {DATA_PATH} (limited to first {REVIEW_LIMIT} for testing)")
     
-    logger.info("⏳ Waiting 60 seconds before AutoPrompt to reset rate limit...")
-    time.sleep(60)
+    # Initialize pipelines (sharing one rate limiter, response cache, connection pool, dedup index
+    # and adaptive concurrency limit)
+    provider = ClientProvider.shared(config)
+    dedup = DedupIndex.from_config(config)
+    resilience = AdaptiveConcurrency.from_config(config)
+    baseline = BaselinePipeline(config, rate_limiter=rate_limiter, cache=cache, provider=provider, dedup=dedup,
+                                resilience=resilience)
+    autoprompt = AutoPromptEngine(config, rate_limiter=rate_limiter, cache=cache, provider=provider, dedup=dedup,
+                                  resilience=resilience)
+    concurrency = config.get("concurrency", 1)
+    tracer = tracing.Tracer.from_config(config)
+    tracing.set_tracer(tracer)
+    metrics_config = config.get("metrics", {})
+    metrics_server = None
+    if metrics_config.get("port"):
+        metrics_server = metrics.REGISTRY.serve(metrics_config["port"])
+        logger.info(f"📈 Serving metrics at http://127.0.0.1:{metrics_config['port']}/metrics")
     
-    # 2. Run AutoPrompt with rate limiting
-    logger.info("Running AutoPrompt pipeline...")
-    logger.info(f"⏱️  Estimated time: ~{len(reviews) * 15} seconds (with rate limits)")
-    autoprompt_results = []
-    for i, review in enumerate(reviews):
-        if i > 0:
-            # Wait between reviews to avoid hitting rate limit
-            logger.info(f"⏳ Waiting 15 seconds before next review ({i+1}/{len(reviews)})...")
-            time.sleep(15)
-        autoprompt_results.append(autoprompt.process(review))
-    save_results(autoprompt_results, "results/autoprompt_results.json")
+    # 1 & 2. Run Baseline then AutoPrompt on one event loop
+    try:
+        asyncio.run(run_pipelines(
+            [("baseline", baseline), ("autoprompt", autoprompt)],
+            journal, DATA_PATH, REVIEW_LIMIT, concurrency
+        ))
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted - resume with: python main.py --resume {journal.run_id}")
+        raise
+    finally:
+        autoprompt.bandit.save()
+        if metrics_config.get("textfile"):
+            metrics.REGISTRY.write_textfile(metrics_config["textfile"])
+            logger.info(f"📈 Metrics written to {metrics_config['textfile']}")
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        tracer.close()
+        if tracer.enabled:
+            logger.info(f"🧵 Trace written to {tracer.path}")
+    logger.info(f"⏳ Total time spent waiting on rate limits: {rate_limiter.total_wait:.1f}s")
+    cache_stats = cache.stats()
+    logger.info(f"💾 Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%} hit rate)")
+    if dedup.enabled:
+        dedup_stats = dedup.stats()
+        logger.info(f"🪞 Near-duplicates: {dedup_stats['hits']} reused, {dedup_stats['misses']} extracted "
+                    f"({dedup_stats['hit_rate']:.0%} hit rate, {dedup_stats['entries']} indexed)")
+    if autoprompt.semantic_scorer:
+        scorer = autoprompt.semantic_scorer
+        logger.info(f"⚖️ Semantic scoring ({scorer.mode}): {scorer.items_scored} extractions "
+                    f"in {scorer.requests} scorer requests")
+    if resilience.enabled:
+        resilience_stats = resilience.stats()
+        errors = ", ".join(f"{count} {kind}" for kind, count in resilience_stats["errors"].items()) or "none"
+        logger.info(f"🚦 Adaptive concurrency: limit {resilience_stats['limit']:.1f} at the end, "
+                    f"{resilience_stats['decreases']} decreases, {resilience_stats['trips']} breaker trips "
+                    f"(congestion errors: {errors})")
+    pool_stats = provider.stats()
+    logger.info(f"🔌 Connections: {pool_stats['connections_opened']} opened for {pool_stats['calls']} calls "
+                f"({pool_stats['reuse_rate']:.0%} reused)")
+    if provider.key_pool:
+        for usage in provider.key_pool.utilization():
+            logger.info(f"🔑 Key {usage['key']}: {usage['calls']} calls, {usage['quota_errors']} quota errors, "
+                        f"{usage['rpm_utilization']:.0%} of its RPM, {usage['wait_seconds']:.1f}s waiting")
+    logger.info(f"🔧 JSON repairs: {repair_stats.repaired} recovered locally, {repair_stats.failed} unrecoverable")
     
     # 3. Evaluate
     logger.info("Running evaluation...")
     evaluator = Evaluator(GROUND_TRUTH_PATH)
-    report = evaluator.generate_report(baseline_results, autoprompt_results)
+    hedging = {name: pipeline.hedging.stats() for name, pipeline in
+               [("baseline", baseline), ("autoprompt", autoprompt)] if pipeline.hedging.enabled}
+    baseline_results, autoprompt_results = journal.results("baseline"), journal.results("autoprompt")
+    report = evaluator.generate_report(baseline_results, autoprompt_results, hedging)
+    # The analysis notebook and visualize_results.py read these rather than the run journal
+    save_results(baseline_results, "results/baseline_results.json")
+    save_results(autoprompt_results, "results/autoprompt_results.json")
     
     logger.info("✅ Benchmark complete! Check results/benchmark_report.json")
 
@@ -13,8 +13,38 @@ __version__ = "0.1.0"
 __author__ = "Your Name"
 __description__ = "Dynamic prompt optimization for LLM data pipelines"
 
-# Optional: Expose main classes for easier imports
-# from .baseline import BaselinePipeline
-# from .autoprompt import AutoPromptEngine
-# from .evaluator import Evaluator
-# from .utils import Review, ExtractedData
+import importlib
+
+# Public classes, imported from their modules on first access (see __getattr__),
+# so `import src` stays cheap and pulls in no heavy dependencies
+_EXPORTS = {
+    "BaselinePipeline": "src.baseline",
+    "AutoPromptEngine": "src.autoprompt",
+    "Evaluator": "src.evaluator",
+    "Review": "src.utils",
+    "ExtractedData": "src.utils",
+    "load_secure_config": "src.config_loader",
+    "RateLimiter": "src.rate_limiter",
+    "ResponseCache": "src.cache",
+    "ClientProvider": "src.client_pool",
+    "DedupIndex": "src.dedup",
+    "AdaptiveConcurrency": "src.resilience",
+    "HedgePolicy": "src.hedging",
+    "HeuristicScorer": "src.scoring",
+    "ExtractionService": "src.service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
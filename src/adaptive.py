@@ -0,0 +1,101 @@
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_CONTRAST_WORDS = ("but", "however", "although", "though", "yet", "except", "despite", "unfortunately")
+
+
+class AdaptiveBudget:
+    """Chooses each review's variant budget and early-stop threshold.
+
+    Difficulty comes from cheap features: long reviews and contrast words ("but",
+    "however", ...) each add a point, which buys one more variant and raises the
+    early-stop threshold. Reviews with the same features form a group; once a
+    group has enough history, groups where extra variants rarely improved on the
+    first score drop to a single call (with an occasional full-budget review to
+    keep that history fresh), and groups where they did get one more variant.
+    The raised threshold is capped at `max_threshold`, which should stay below
+    the best score the scorer can give (heuristic weights sum to just under 1.0
+    in floating point), or the hardest reviews could never stop early.
+    """
+
+    def __init__(self, max_prompts: int, base_threshold: float = 0.85, enabled: bool = True,
+                 min_prompts: int = 1, long_review_chars: int = 280,
+                 contrast_words: Iterable[str] = DEFAULT_CONTRAST_WORDS, threshold_step: float = 0.05,
+                 min_history: int = 5, min_gain: float = 0.05, explore_every: int = 20,
+                 max_threshold: float = 0.95):
+        self.max_prompts = max(1, max_prompts)
+        self.base_threshold = base_threshold
+        self.enabled = enabled
+        self.min_prompts = max(1, min(min_prompts, self.max_prompts))
+        self.long_review_chars = long_review_chars
+        self._contrast = re.compile(r"\b(?:" + "|".join(map(re.escape, contrast_words)) + r")\b", re.IGNORECASE)
+        self.threshold_step = threshold_step
+        self.max_threshold = max(max_threshold, base_threshold)
+        self.min_history = min_history
+        self.min_gain = min_gain
+        self.explore_every = explore_every
+        # Per feature group: [observations, summed score gain, reviews planned]
+        self._history: Dict[Tuple[int, int], list] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptiveBudget":
+        """Build from the `adaptive_budget` section (disabled, i.e. fixed budget, when absent)"""
+        settings = config.get("adaptive_budget", {})
+        return cls(
+            max_prompts=config.get("max_prompts_per_item", 2),
+            base_threshold=config.get("early_stop_threshold", 0.85),
+            enabled=settings.get("enabled", False),
+            min_prompts=settings.get("min_prompts", 1),
+            long_review_chars=settings.get("long_review_chars", 280),
+            contrast_words=settings.get("contrast_words", DEFAULT_CONTRAST_WORDS),
+            threshold_step=settings.get("threshold_step", 0.05),
+            max_threshold=settings.get("max_threshold", 0.95),
+            min_history=settings.get("min_history", 5),
+            min_gain=settings.get("min_gain", 0.05),
+            explore_every=settings.get("explore_every", 20),
+        )
+
+    def features(self, review_text: str) -> Tuple[int, int]:
+        """(is_long, contrast words capped at 2) - also the key grouping similar reviews"""
+        is_long = int(len(review_text) > self.long_review_chars)
+        contrasts = len(self._contrast.findall(review_text))
+        return is_long, min(contrasts, 2)
+
+    def threshold(self, review_text: str) -> float:
+        """Early-stop threshold from the review's features alone (leaves the history untouched)"""
+        if not self.enabled:
+            return self.base_threshold
+        return min(self.max_threshold, self.base_threshold + self.threshold_step * sum(self.features(review_text)))
+
+    def plan(self, review_text: str) -> Tuple[int, float]:
+        """Variant budget and early-stop threshold for one review"""
+        if not self.enabled:
+            return self.max_prompts, self.base_threshold
+
+        group = self.features(review_text)
+        difficulty = sum(group)
+        budget = min(self.max_prompts, self.min_prompts + difficulty)
+        threshold = self.threshold(review_text)
+
+        with self._lock:
+            history = self._history.setdefault(group, [0, 0.0, 0])
+            history[2] += 1
+            observations, gain_sum, planned = history
+        if observations >= self.min_history:
+            if gain_sum / observations < self.min_gain:
+                if not self.explore_every or planned % self.explore_every:
+                    return self.min_prompts, self.base_threshold
+            else:
+                budget = min(self.max_prompts, budget + 1)
+        return budget, threshold
+
+    def record(self, review_text: str, first_score: Optional[float], best_score: float, variants_tried: int):
+        """Learn how much trying more than one variant improved on the first score"""
+        if not self.enabled or first_score is None or variants_tried < 2:
+            return
+        with self._lock:
+            history = self._history.setdefault(self.features(review_text), [0, 0.0, 0])
+            history[0] += 1
+            history[1] += max(0.0, best_score - first_score)
@@ -1,177 +1,398 @@
-import random
-import google.generativeai as genai
 from src.utils import Review, ExtractedData
+from src import metrics, tracing
+from src.client_pool import ClientProvider
+from src.bandit import PromptBandit
+from src.semantic_scorer import SemanticScorer
+from src.scoring import HeuristicScorer
+from src.adaptive import AdaptiveBudget
+from src.rate_limiter import RateLimiter
+from src.cache import ResponseCache
+from src.dedup import DedupIndex
+from src.resilience import AdaptiveConcurrency
+from src.hedging import HedgePolicy
+from src.llm import LLMClient, count_calls
+from src.json_extract import extract_json
+from src.batching import pack_batches, build_batch_prompt, parse_batch_response, match_batch_items
 from loguru import logger
-from tenacity import retry, stop_after_attempt, wait_exponential
-import json
-import re
+from typing import List, Optional
+import asyncio
+import threading
 import time
 
 class AutoPromptEngine:
-    def __init__(self, config: dict):
-        # Secure API key from config
-        genai.configure(api_key=config["api_key"])
+    def __init__(self, config: dict, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None, provider: Optional[ClientProvider] = None,
+                 dedup: Optional[DedupIndex] = None, resilience: Optional[AdaptiveConcurrency] = None,
+                 hedging: Optional[HedgePolicy] = None):
+        # Model handles and connections come from a provider shared by every pipeline in the process
+        self.provider = provider or ClientProvider.shared(config)
         self.config = config
-        self.generator_model = genai.GenerativeModel(config["generator_model"])
-        self.scorer_model = genai.GenerativeModel(config["scoring_model"])
+        # Generator and scorer share one limiter and cache (and the caller may share them across pipelines)
+        self.rate_limiter = rate_limiter or RateLimiter.from_config(config)
+        self.cache = cache or ResponseCache.from_config(config)
+        # Near-duplicate reviews reuse an earlier extraction instead of a variant search
+        self.dedup = dedup or DedupIndex.from_config(config)
+        # AIMD in-flight limit, circuit breaker and retry policy (shareable like the limiter)
+        self.resilience = resilience or AdaptiveConcurrency.from_config(config)
+        # Duplicates slow variant calls once they pass a latency percentile (off unless configured)
+        self.hedging = hedging or HedgePolicy.from_config(config)
+        hedge_model = self.provider.get_model(self.hedging.model) if self.hedging.model else None
+        self.generator = LLMClient(self.provider.get_model(config["generator_model"]),
+                                   config["generator_model"], self.rate_limiter, self.cache, self.resilience,
+                                   self.hedging, hedge_model)
+        self.scorer = LLMClient(self.provider.get_model(config["scoring_model"]),
+                                config["scoring_model"], self.rate_limiter, self.cache, self.resilience)
+        # Heuristic rules from `scoring_rules`, compiled once
+        self.heuristic = HeuristicScorer.from_config(config)
         self.use_llm_scoring = config.get("use_llm_scoring", False)
+        # Batched LLM judge, inline or refining confidence in the background
+        self.semantic_scorer = SemanticScorer.from_config(config, self.scorer) if self.use_llm_scoring else None
+        self.concurrent_variants = config.get("concurrent_variants", False)
+        # Per-review variant budget and early-stop threshold (max_prompts_per_item and
+        # early_stop_threshold for every review unless adaptive_budget is enabled)
+        self.adaptive = AdaptiveBudget.from_config(config)
+        # Learns which instruction/target_info combination scores best
+        self.bandit = PromptBandit.from_config(config)
+        self.batching = config.get("batching", {})
+        # Event loop behind the sync process() wrapper (started on first use)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+    
+    def _render_prompt(self, arm: tuple, review_text: str) -> str:
+        instruction, target_info = arm
+        prompt = self.config["template"].format(
+            instruction=instruction,
+            target_info=target_info,
+            text=review_text
+        )
+        # Enforce JSON output
+        prompt += "\nRespond ONLY with JSON: {{\"product\": \"...\", \"sentiment\": \"...\", \"reason\": \"...\"}}"
+        return prompt
         
-    def _generate_prompt_variants(self, review_text: str) -> list:
-        """Generate prompt variants from candidate pools"""
-        variants = []
-        pool = self.config["candidates"]
+    def _generate_prompt_variants(self, review_text: str, budget: Optional[int] = None) -> list:
+        """Generate (arm, prompt) variants from candidate pools, most promising first"""
+        arms = self.bandit.select(budget or self.config["max_prompts_per_item"])
+        return [(arm, self._render_prompt(arm, review_text)) for arm in arms]
+    
+    async def _call_llm_async(self, prompt: str) -> dict:
+        """Generate content, retrying quota/503/timeout/connection errors with backoff"""
+        async def _attempt():
+            with tracing.span("llm_attempt"):
+                return await self.generator.generate_async(
+                    prompt,
+                    generation_config={"temperature": self.config["temperature"]},
+                    parse=extract_json
+                )
+        return await self.resilience.run_async(_attempt, "autoprompt")
+    
+    def _heuristic_score(self, response_data: dict) -> float:
+        """Score extraction quality (0-1) using the configured heuristic rules only"""
+        return self.heuristic.score(response_data)
+    
+    def _inline_scoring(self) -> bool:
+        return self.semantic_scorer is not None and self.semantic_scorer.mode == "inline"
+    
+    def _score_prompt(self, review_text: str, response_data: dict) -> float:
+        """Score prompt quality (0-1): heuristics, blended with the LLM judge in inline mode"""
+        with tracing.span("score"):
+            score = self._heuristic_score(response_data)
+            
+            # Optional LLM-based semantic scoring (disabled by default for free tier)
+            if self._inline_scoring():
+                try:
+                    llm_score = self.semantic_scorer.score_batch([(review_text, response_data)])[0]
+                except Exception as e:
+                    logger.warning(f"Scoring LLM failed: {e}")
+                    llm_score = None
+                score = self.semantic_scorer.blend(score, llm_score)
         
-        for _ in range(self.config["max_prompts_per_item"]):
-            instruction = random.choice(pool["instruction"])
-            target_info = random.choice(pool["target_info"])
+        return min(score, 1.0)
+    
+    async def _score_prompt_async(self, review_text: str, response_data: dict,
+                                  heuristic: Optional[float] = None) -> float:
+        """Async version of _score_prompt (concurrent reviews share scorer requests)"""
+        with tracing.span("score"):
+            score = self._heuristic_score(response_data) if heuristic is None else heuristic
             
-            prompt = self.config["template"].format(
-                instruction=instruction,
-                target_info=target_info,
-                text=review_text
+            if self._inline_scoring():
+                llm_score = await self.semantic_scorer.score_async(review_text, response_data)
+                score = self.semantic_scorer.blend(score, llm_score)
+        
+        return min(score, 1.0)
+    
+    def _build_result(self, review: Review, best_response, best_score: float,
+                      num_prompts: int) -> ExtractedData:
+        if best_response is None:
+            return ExtractedData(
+                review_id=review.review_id,
+                product="error",
+                sentiment="error",
+                reason="All variants failed",
+                confidence=0.0,
+                prompt_used="autoprompt_failed"
             )
-            # Enforce JSON output
-            prompt += "\nRespond ONLY with JSON: {{\"product\": \"...\", \"sentiment\": \"...\", \"reason\": \"...\"}}"
-            variants.append(prompt)
-        
-        return variants
-    
-    def _extract_json(self, text: str) -> dict:
-        """Extract JSON from response, handling markdown code blocks"""
-        text = text.strip()
-        
-        # Try to find JSON in markdown blocks
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(1)
-        
-        # Remove any leading/trailing text before/after JSON
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(0)
-        
-        return json.loads(text)
-    
-    @retry(
-        stop=stop_after_attempt(2),  # Reduced from 3 to save API calls
-        wait=wait_exponential(multiplier=2, min=3, max=15),
-        reraise=True
-    )
-    def _call_llm(self, prompt: str) -> dict:
-        """Generate content with retry logic and exponential backoff"""
-        response = self.generator_model.generate_content(
-            prompt,
-            generation_config={"temperature": self.config["temperature"]}
+        
+        result = ExtractedData(
+            review_id=review.review_id,
+            product=best_response.get("product", "unknown"),
+            sentiment=best_response.get("sentiment", "unknown"),
+            reason=best_response.get("reason", ""),
+            confidence=best_score,
+            prompt_used=f"autoprompt_best_of_{num_prompts}"
         )
-        return self._extract_json(response.text)
+        if self.semantic_scorer is not None and self.semantic_scorer.mode == "deferred":
+            # The heuristic picked this result; the LLM judge refines its confidence later
+            self.semantic_scorer.defer(result, review.review_text, best_response)
+        return result
     
-    def _score_prompt(self, review_text: str, response_data: dict) -> float:
-        """Score prompt quality (0-1) using heuristics only"""
-        score = 0.0
-        
-        # Heuristic checks (weighted more heavily now)
-        required_fields = ["product", "sentiment", "reason"]
-        if all(field in response_data for field in required_fields):
-            score += 0.4  # Increased from 0.3
-        
-        valid_sentiments = ["positive", "negative", "neutral", "mixed"]
-        if response_data.get("sentiment", "").lower() in valid_sentiments:
-            score += 0.3  # Increased from 0.2
+    def _run_sync(self, coro):
+        """Run coro on the engine's own event loop and wait for its result.
         
-        product = response_data.get("product", "")
-        if 2 < len(product) < 50:
-            score += 0.2  # Same
+        The loop lives in a background thread for the engine's lifetime, so async
+        clients stay bound to one loop and tasks a call leaves behind (such as
+        deferred scoring) keep running instead of being cancelled with the loop.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="autoprompt-loop", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    def process(self, review: Review) -> ExtractedData:
+        """Process review with dynamic prompt optimization"""
+        # The sync API runs the async pipeline on the engine's own loop, so there is one implementation
+        result = self._run_sync(self.process_async(review))
+        # Nothing would refine a sync caller's result later, so deferred scoring completes here
+        self.finish()
+        return result
+    
+    async def _evaluate_variant_async(self, review_text: str, arm: tuple, prompt: str, index: int = 0):
+        with tracing.span("variant", index=index):
+            response_data = await self._call_llm_async(prompt)
+            score = await self._score_prompt_async(review_text, response_data)
+        self.bandit.update(arm, score)
+        return score, response_data
+    
+    async def _process_variants_concurrently(self, review: Review, prompts: list, threshold: float):
+        """Launch all variants at once and cancel the rest on the first early stop.
         
-        reason = response_data.get("reason", "")
-        if len(reason) > 10:
-            score += 0.1  # Same
+        Returns (best score, best response, first variant's score, variants finished).
+        """
+        tasks = [
+            asyncio.create_task(self._evaluate_variant_async(review.review_text, arm, prompt, i))
+            for i, (arm, prompt) in enumerate(prompts)
+        ]
+        variant_ids = {task: i for i, task in enumerate(tasks)}
         
-        # Optional LLM-based semantic scoring (disabled by default for free tier)
-        if self.use_llm_scoring:
-            try:
-                time.sleep(2)  # Longer delay for rate limits
-                
-                check_prompt = f"""
-                Review: {review_text}
-                Extracted Data: {json.dumps(response_data)}
-                
-                Does this extraction correctly identify:
-                1. The main product/service? (yes/no)
-                2. The sentiment? (yes/no)
-                3. A specific reason? (yes/no)
-                
-                Respond with a single number 0-3.
-                """
-                
-                check_response = self.scorer_model.generate_content(
-                    check_prompt,
-                    generation_config={"temperature": 0}
-                )
-                
-                llm_score = int(check_response.text.strip()) / 3.0
-                score = score * 0.8 + llm_score * 0.2  # Blend heuristic and LLM
+        best_score = -1
+        best_response = None
+        first_score = None
+        finished = 0
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    i = variant_ids[task]
+                    finished += 1
+                    try:
+                        score, response_data = task.result()
+                    except Exception as e:
+                        logger.error(f"Variant {i} failed: {e}")
+                        continue
+                    
+                    logger.info(f"Variant {i}: score={score:.2f}")
+                    if i == 0:
+                        first_score = score
+                    if score > best_score:
+                        best_score = score
+                        best_response = response_data
                 
-            except Exception as e:
-                logger.warning(f"Scoring LLM failed: {e}")
+                if best_score >= threshold and pending:
+                    logger.info(f"Early stopping - cancelling {len(pending)} in-flight variants")
+                    metrics.EARLY_STOPS.inc(mode="concurrent")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
         
-        return min(score, 1.0)
+        return best_score, best_response, first_score, finished
     
-    def process(self, review: Review) -> ExtractedData:
-        """Process review with dynamic prompt optimization"""
+    async def process_async(self, review: Review) -> ExtractedData:
+        """Async version of process using the async Gemini client"""
+        with metrics.REVIEW_SECONDS.time(pipeline="autoprompt"), \
+                tracing.span("review", pipeline="autoprompt", review_id=review.review_id):
+            reused = self.dedup.reuse("autoprompt", review)
+            if reused is not None:
+                return reused
+            return await self._process_fresh_async(review)
+    
+    async def _process_fresh_async(self, review: Review) -> ExtractedData:
+        with count_calls() as calls:
+            result = await self._process_async(review)
+        result.llm_calls = calls.count
+        self.dedup.remember("autoprompt", review, result)
+        return result
+    
+    async def _process_async(self, review: Review) -> ExtractedData:
         logger.info(f"Processing review {review.review_id}")
         
-        prompts = self._generate_prompt_variants(review.review_text)
+        budget, threshold = self.adaptive.plan(review.review_text)
+        prompts = self._generate_prompt_variants(review.review_text, budget)
+        
+        if self.concurrent_variants:
+            best_score, best_response, first_score, finished = await self._process_variants_concurrently(
+                review, prompts, threshold)
+            self.adaptive.record(review.review_text, first_score, best_score, finished)
+            return self._build_result(review, best_response, best_score, len(prompts))
         
         best_score = -1
         best_response = None
-        best_prompt = ""
+        first_score = None
+        tried = 0
         
-        for i, prompt in enumerate(prompts):
+        for i, (arm, prompt) in enumerate(prompts):
+            tried += 1
             try:
-                # CRITICAL: Add delay between API calls to respect rate limits
-                # Free tier: 10 req/min = 1 request every 6 seconds
-                if i > 0:
-                    logger.debug("Waiting 7 seconds to respect rate limits...")
-                    time.sleep(7)
-                
-                response_data = self._call_llm(prompt)
-                score = self._score_prompt(review.review_text, response_data)
+                with tracing.span("variant", index=i):
+                    response_data = await self._call_llm_async(prompt)
+                    score = await self._score_prompt_async(review.review_text, response_data)
+                self.bandit.update(arm, score)
                 
                 logger.info(f"Variant {i}: score={score:.2f}")
+                if first_score is None and i == 0:
+                    first_score = score
                 
                 if score > best_score:
                     best_score = score
                     best_response = response_data
-                    best_prompt = prompt
                 
-                # Early stopping with lower threshold
-                if score >= 0.85:  # Lowered from 0.9
-                    logger.info(f"Early stopping - good score achieved")
+                if score >= threshold:
+                    logger.info("Early stopping - good score achieved")
+                    metrics.EARLY_STOPS.inc(mode="sequential")
                     break
                     
             except Exception as e:
                 logger.error(f"Variant {i} failed: {e}")
-                # If we've failed and have a result, use it
                 if best_response is not None:
-                    logger.warning(f"Using best result so far due to error")
+                    logger.warning("Using best result so far due to error")
                     break
                 continue
         
-        if best_response is None:
-            return ExtractedData(
-                review_id=review.review_id,
-                product="error",
-                sentiment="error",
-                reason="All variants failed",
-                confidence=0.0,
-                prompt_used="autoprompt_failed"
-            )
+        self.adaptive.record(review.review_text, first_score, best_score, tried)
+        return self._build_result(review, best_response, best_score, len(prompts))
+    
+    async def process_batch_async(self, reviews: List[Review]) -> List[ExtractedData]:
+        """Extract several reviews with one request using the best known prompt.
         
-        return ExtractedData(
-            review_id=review.review_id,
-            product=best_response.get("product", "unknown"),
-            sentiment=best_response.get("sentiment", "unknown"),
-            reason=best_response.get("reason", ""),
-            confidence=best_score,
-            prompt_used=f"autoprompt_best_of_{len(prompts)}"
-        )
\ No newline at end of file
+        Items missing from the response or scoring below their early-stop
+        threshold fall back to the full per-item variant search.
+        """
+        start = time.perf_counter()
+        with tracing.span("batch", pipeline="autoprompt", size=len(reviews)):
+            results = [self.dedup.reuse("autoprompt", review) for review in reviews]
+            fresh = [review for review, result in zip(reviews, results) if result is None]
+            if len(fresh) == 1:
+                extracted = iter([await self._process_fresh_async(fresh[0])])
+            else:
+                extracted = iter(await self._extract_batch_async(fresh) if fresh else [])
+            results = [result if result is not None else next(extracted) for result in results]
+        # Every review in the batch waited for the whole batch
+        elapsed = time.perf_counter() - start
+        for _ in results:
+            metrics.REVIEW_SECONDS.observe(elapsed, pipeline="autoprompt")
+        return results
+    
+    async def _extract_batch_async(self, reviews: List[Review]) -> List[ExtractedData]:
+        arm = self.bandit.best_arm()
+        instruction = self.config.get(
+            "batch_template", "{instruction} the {target_info} from each review."
+        ).format(instruction=arm[0], target_info=arm[1])
+        results = []
+        missing = []
+        with count_calls() as calls:
+            try:
+                extracted = await self.generator.generate_async(
+                    build_batch_prompt(instruction, reviews),
+                    generation_config={"temperature": self.config["temperature"]},
+                    parse=parse_batch_response
+                )
+            except Exception as e:
+                logger.warning(f"Batch of {len(reviews)} failed ({e}), falling back to per-item calls")
+                extracted = {}
+            
+            # Score every returned extraction in one vectorized pass
+            matched = match_batch_items(reviews, extracted)
+            found = [i for i, data in enumerate(matched) if data is not None]
+            heuristic = dict(zip(
+                found, self.heuristic.score_batch([matched[i] for i in found]).tolist()
+            )) if found else {}
+            
+            for i, (review, data) in enumerate(zip(reviews, matched)):
+                if data is not None:
+                    score = await self._score_prompt_async(review.review_text, data, heuristic[i])
+                    self.bandit.update(arm, score)
+                    if score >= self.adaptive.threshold(review.review_text):
+                        result = self._build_result(review, data, score, 1)
+                        result.prompt_used = f"autoprompt_batch_of_{len(reviews)}"
+                        metrics.EARLY_STOPS.inc(mode="batch")
+                        self.dedup.remember("autoprompt", review, result)
+                        results.append(result)
+                        continue
+                missing.append(review)
+                results.append(None)
+        
+        # Items the batch did not settle fall back to the variant loop, run concurrently rather than one
+        # by one (each counted separately by _process_fresh_async)
+        recovered = iter(await asyncio.gather(*(self._process_fresh_async(review) for review in missing)))
+        results = [result if result is not None else next(recovered) for result in results]
+        # Every item shares the cost of the batch request and its scoring calls
+        share = calls.count / len(reviews)
+        for result in results:
+            result.llm_calls += share
+        return results
+    
+    def drain_refined(self) -> List[ExtractedData]:
+        """Results whose confidence the deferred LLM judge has refined since the last call"""
+        return self.semantic_scorer.drain_refined() if self.semantic_scorer else []
+    
+    async def finish_async(self):
+        """Wait for deferred scoring so every result carries its final confidence"""
+        if self.semantic_scorer:
+            await self.semantic_scorer.finish_async()
+    
+    def finish(self):
+        """Synchronous finish_async (also scores results deferred on the engine's own loop)"""
+        if self.semantic_scorer is None:
+            return
+        if self._loop is not None:
+            self._run_sync(self.finish_async())
+        self.semantic_scorer.finish()
+    
+    async def process_many(self, reviews: List[Review], concurrency: int = 4) -> List[ExtractedData]:
+        """Process reviews concurrently, returning results in input order"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        if self.batching.get("enabled", False):
+            batches = pack_batches(reviews, self.batching.get("max_items", 10),
+                                   self.batching.get("max_tokens", 4000))
+            
+            async def _process_batch(batch: List[Review]) -> List[ExtractedData]:
+                async with semaphore:
+                    return await self.process_batch_async(batch)
+            
+            batch_results = await asyncio.gather(*(_process_batch(b) for b in batches))
+            await self.finish_async()
+            self.bandit.save()
+            return [result for batch in batch_results for result in batch]
+        
+        async def _process_one(review: Review) -> ExtractedData:
+            async with semaphore:
+                return await self.process_async(review)
+        
+        results = list(await asyncio.gather(*(_process_one(r) for r in reviews)))
+        await self.finish_async()
+        self.bandit.save()
+        return results
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Dict, Optional
+
+from src.lazy import lazy_import
+from src.rate_limiter import RateLimiter
+
+pd = lazy_import("pandas")
+google_exceptions = lazy_import("google.api_core.exceptions")
+
+
+class LLMBackend(ABC):
+    """Source of model handles exposing generate_content / generate_content_async"""
+
+    def open_connection(self, asynchronous: bool = False, api_key: Optional[str] = None):
+        """Open a transport that model handles can share (None if the backend has none)"""
+        return None
+
+    @abstractmethod
+    def get_model(self, model_name: str, connection=None):
+        """Model handle for model_name, using connection when the backend has one"""
+
+
+class GeminiBackend(LLMBackend):
+    """Real Gemini models through google.generativeai"""
+
+    def __init__(self, api_key: str):
+        import google.generativeai as genai
+        import google.ai.generativelanguage as glm
+        self._genai = genai
+        self._glm = glm
+        self.api_key = api_key
+        genai.configure(api_key=api_key)
+
+    def open_connection(self, asynchronous: bool = False, api_key: Optional[str] = None):
+        """A gRPC client (one channel) for api_key; async clients must be opened on their event loop"""
+        client_cls = self._glm.GenerativeServiceAsyncClient if asynchronous else self._glm.GenerativeServiceClient
+        return client_cls(client_options={"api_key": api_key or self.api_key})
+
+    def get_model(self, model_name: str, connection=None):
+        model = self._genai.GenerativeModel(model_name)
+        # Without a connection the model falls back to genai's default clients
+        if isinstance(connection, self._glm.GenerativeServiceAsyncClient):
+            model._async_client = connection
+        elif connection is not None:
+            model._client = connection
+        return model
+
+
+class FakeResponse:
+    """Mimics the parts of GenerateContentResponse the pipelines read"""
+
+    def __init__(self, text: str, prompt: str = ""):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=RateLimiter.estimate_tokens(prompt),
+            candidates_token_count=RateLimiter.estimate_tokens(text),
+        )
+
+
+class FakeModel:
+    """In-process stand-in for genai.GenerativeModel"""
+
+    def __init__(self, backend: "FakeBackend", model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, **kwargs):
+        delay, outcome = self.backend._plan_call()
+        time.sleep(delay)
+        return self.backend._respond(prompt, outcome)
+
+    async def generate_content_async(self, prompt: str, generation_config: Optional[dict] = None, **kwargs):
+        delay, outcome = self.backend._plan_call()
+        await asyncio.sleep(delay)
+        return self.backend._respond(prompt, outcome)
+
+
+class FakeBackend(LLMBackend):
+    """Offline Gemini substitute with latency and fault injection.
+
+    Extractions are derived deterministically from the labelled ground truth
+    (matched to prompts through the review text), so accuracy, throughput,
+    retry and limiter behaviour can be measured without network or quota.
+    All randomness comes from one seeded generator.
+    """
+
+    _SINGLE_REVIEW = re.compile(r"review: '(.*)'\s*(?:\n|$)", re.IGNORECASE | re.DOTALL)
+
+    def __init__(self, ground_truth_path: Optional[str] = None, reviews_path: Optional[str] = None,
+                 latency: Optional[dict] = None, rate_limit_error_rate: float = 0.0,
+                 unavailable_error_rate: float = 0.0, malformed_rate: float = 0.0, seed: int = 0):
+        self.latency = latency or {}
+        self.rate_limit_error_rate = rate_limit_error_rate
+        self.unavailable_error_rate = unavailable_error_rate
+        self.malformed_rate = malformed_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.injected = {"rate_limit": 0, "unavailable": 0, "malformed": 0}
+        self._labels_by_text: Dict[str, dict] = {}
+        if ground_truth_path and reviews_path:
+            self._load_labels(ground_truth_path, reviews_path)
+
+    @classmethod
+    def from_config(cls, settings: dict) -> "FakeBackend":
+        """Build from the `backend` config section"""
+        errors = settings.get("errors", {})
+        return cls(
+            ground_truth_path=settings.get("ground_truth_path", "data/ground_truth.json"),
+            reviews_path=settings.get("reviews_path", "data/reviews.csv"),
+            latency=settings.get("latency", {}),
+            rate_limit_error_rate=errors.get("rate_limit", 0.0),
+            unavailable_error_rate=errors.get("unavailable", 0.0),
+            malformed_rate=errors.get("malformed_json", 0.0),
+            seed=settings.get("seed", 0),
+        )
+
+    def _load_labels(self, ground_truth_path: str, reviews_path: str):
+        truth = pd.read_json(ground_truth_path, orient="records", dtype={"review_id": str})
+        truth["review_id"] = truth["review_id"].astype(str)
+        labels = truth.set_index("review_id").to_dict("index")
+        reviews = pd.read_csv(reviews_path, dtype={"review_id": str})
+        for review_id, text in zip(reviews["review_id"], reviews["review_text"]):
+            if review_id in labels:
+                self._labels_by_text[text.strip()] = {"review_id": review_id, **labels[review_id]}
+
+    def get_model(self, model_name: str, connection=None) -> FakeModel:
+        return FakeModel(self, model_name)
+
+    def _sample_latency(self) -> float:
+        distribution = self.latency.get("distribution", "constant")
+        mean = self.latency.get("mean_ms", 0.0) / 1000.0
+        if distribution == "lognormal":
+            sigma = self.latency.get("sigma", 0.5)
+            # Parameterised so the distribution mean equals mean_ms
+            delay = self._random.lognormvariate(0, sigma) * mean / math.exp(sigma ** 2 / 2)
+        elif distribution == "normal":
+            delay = self._random.gauss(mean, self.latency.get("stddev_ms", 0.0) / 1000.0)
+        elif distribution == "uniform":
+            delay = self._random.uniform(self.latency.get("min_ms", 0.0) / 1000.0,
+                                         self.latency.get("max_ms", 0.0) / 1000.0)
+        else:
+            delay = mean
+        return max(0.0, delay)
+
+    def _plan_call(self):
+        """Draw this call's latency and injected outcome under one lock (keeps runs reproducible)"""
+        with self._lock:
+            self.calls += 1
+            delay = self._sample_latency()
+            roll = self._random.random()
+            if roll < self.rate_limit_error_rate:
+                outcome = "rate_limit"
+            elif roll < self.rate_limit_error_rate + self.unavailable_error_rate:
+                outcome = "unavailable"
+            elif roll < self.rate_limit_error_rate + self.unavailable_error_rate + self.malformed_rate:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+            if outcome != "ok":
+                self.injected[outcome] += 1
+            return delay, outcome
+
+    def _extraction(self, text: str, review_id: Optional[str] = None) -> dict:
+        label = self._labels_by_text.get(text.strip())
+        if label is None:
+            extraction = {"product": "unknown", "sentiment": "neutral",
+                          "reason": "No labelled review matches this text"}
+        else:
+            extraction = {"product": label["product"], "sentiment": label["sentiment"],
+                          "reason": f"Labelled {label['sentiment']} in the ground truth"}
+        if review_id is not None:
+            extraction = {"review_id": review_id, **extraction}
+        return extraction
+
+    def _judge(self, review_text: str, extraction: dict) -> int:
+        """0-3 points, as the semantic scorer asks: product, sentiment, reason"""
+        label = self._labels_by_text.get(review_text.strip())
+        if label is None:
+            return 0
+        return (int(str(extraction.get("product", "")).lower() == str(label["product"]).lower())
+                + int(str(extraction.get("sentiment", "")).lower() == str(label["sentiment"]).lower())
+                + int(bool(extraction.get("reason"))))
+
+    def _answer(self, prompt: str) -> str:
+        if "Items: [" in prompt:
+            items = json.loads(prompt[prompt.index("Items: [") + len("Items: "):].strip())
+            return json.dumps([{"id": item["id"], "score": self._judge(item["review"], item["extraction"])}
+                               for item in items])
+        if "Reviews: [" in prompt:
+            items = json.loads(prompt[prompt.index("Reviews: [") + len("Reviews: "):].strip())
+            return json.dumps([self._extraction(item["text"], item["review_id"]) for item in items])
+        match = self._SINGLE_REVIEW.search(prompt)
+        return json.dumps(self._extraction(match.group(1) if match else ""))
+
+    def _respond(self, prompt: str, outcome: str) -> FakeResponse:
+        if outcome == "rate_limit":
+            raise google_exceptions.ResourceExhausted("Resource has been exhausted (e.g. check quota).")
+        if outcome == "unavailable":
+            raise google_exceptions.ServiceUnavailable("UNAVAILABLE: failed to connect to all addresses")
+        text = self._answer(prompt)
+        if outcome == "malformed":
+            # Truncate mid-response, as a cut-off generation would be
+            text = "```json\n" + text[:max(1, len(text) * 2 // 3)]
+        return FakeResponse(text, prompt)
+
+
+def create_backend(config: dict) -> LLMBackend:
+    """Build the backend selected by the `backend.type` config setting"""
+    settings = config.get("backend", {})
+    backend_type = settings.get("type", "gemini")
+    if backend_type == "fake":
+        return FakeBackend.from_config(settings)
+    if backend_type == "gemini":
+        return GeminiBackend(config["api_key"])
+    raise ValueError(f"Unknown backend type: {backend_type}")
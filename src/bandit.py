@@ -0,0 +1,131 @@
+import json
+import math
+import os
+import random
+import threading
+from itertools import product
+from typing import List, Optional, Tuple
+
+Arm = Tuple[str, str]
+
+
+class PromptBandit:
+    """Online UCB1 bandit over the instruction x target_info candidate combinations.
+
+    Each arm's reward is the score `_score_prompt` gave its extraction. Arms are
+    ranked by upper confidence bound, so untried combinations are explored first
+    and the search settles on the best-scoring prompt as evidence accumulates.
+    Ties (such as untried arms) go to the arm listed first in the candidate pools,
+    so the same statistics always yield the same selection. A `frozen` bandit
+    selects from its saved statistics without updating or saving them, so reruns
+    replay the same prompts (and are served from the response cache).
+    The `random` strategy keeps the original uniform sampling for comparison.
+    """
+
+    def __init__(self, instructions: List[str], target_infos: List[str], strategy: str = "ucb1",
+                 exploration: float = 1.0, state_path: Optional[str] = None, save_every: int = 20,
+                 frozen: bool = False):
+        if strategy not in ("ucb1", "random"):
+            raise ValueError(f"Unknown variant selection strategy: {strategy}")
+        self.instructions = list(instructions)
+        self.target_infos = list(target_infos)
+        self.arms: List[Arm] = list(product(self.instructions, self.target_infos))
+        self.strategy = strategy
+        self.exploration = exploration
+        self.state_path = state_path
+        self.save_every = save_every
+        self.frozen = frozen
+        self.pulls = {arm: 0 for arm in self.arms}
+        self.rewards = {arm: 0.0 for arm in self.arms}
+        self._updates_since_save = 0
+        self._lock = threading.Lock()
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "PromptBandit":
+        """Build a bandit from `candidates` and the `variant_selection` config section"""
+        settings = config.get("variant_selection", {})
+        pool = config["candidates"]
+        return cls(
+            pool["instruction"],
+            pool["target_info"],
+            strategy=settings.get("strategy", "ucb1"),
+            exploration=settings.get("exploration", 1.0),
+            state_path=settings.get("state_path"),
+            save_every=settings.get("save_every", 20),
+            frozen=settings.get("frozen", False),
+        )
+
+    @staticmethod
+    def _arm_id(arm: Arm) -> str:
+        return f"{arm[0]} || {arm[1]}"
+
+    @property
+    def total_pulls(self) -> int:
+        return sum(self.pulls.values())
+
+    def mean_reward(self, arm: Arm) -> float:
+        return self.rewards[arm] / self.pulls[arm] if self.pulls[arm] else 0.0
+
+    def _ucb(self, arm: Arm, total: int) -> float:
+        if self.pulls[arm] == 0:
+            return math.inf
+        bonus = self.exploration * math.sqrt(2 * math.log(total) / self.pulls[arm])
+        return self.mean_reward(arm) + bonus
+
+    def select(self, n: int) -> List[Arm]:
+        """Pick n arms to try, best upper confidence bound first"""
+        if self.strategy == "random":
+            return [(random.choice(self.instructions), random.choice(self.target_infos)) for _ in range(n)]
+
+        with self._lock:
+            total = max(1, self.total_pulls)
+            # The sort is stable, so ties keep candidate order
+            ranked = sorted(self.arms, key=lambda arm: self._ucb(arm, total), reverse=True)
+        return ranked[:n]
+
+    def best_arm(self) -> Arm:
+        """Arm with the highest observed mean reward"""
+        with self._lock:
+            return max(self.arms, key=self.mean_reward)
+
+    def update(self, arm: Arm, reward: float):
+        """Record the score obtained by a prompt built from arm"""
+        if self.frozen or arm not in self.pulls:
+            return
+        with self._lock:
+            self.pulls[arm] += 1
+            self.rewards[arm] += reward
+            self._updates_since_save += 1
+            should_save = self.state_path and self._updates_since_save >= self.save_every
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Persist arm statistics so learning carries over between runs"""
+        if not self.state_path or self.frozen:
+            return
+        with self._lock:
+            state = {
+                self._arm_id(arm): {"pulls": self.pulls[arm], "rewards": self.rewards[arm]}
+                for arm in self.arms
+            }
+            self._updates_since_save = 0
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def load(self):
+        """Load arm statistics, ignoring arms no longer in the candidate pools"""
+        with open(self.state_path, "r") as f:
+            state = json.load(f)
+        with self._lock:
+            for arm in self.arms:
+                stats = state.get(self._arm_id(arm))
+                if stats:
+                    self.pulls[arm] = stats["pulls"]
+                    self.rewards[arm] = stats["rewards"]
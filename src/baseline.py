@@ -1,15 +1,41 @@
-import google.generativeai as genai
 from src.utils import Review, ExtractedData
+from src import metrics, tracing
+from src.client_pool import ClientProvider
+from src.rate_limiter import RateLimiter
+from src.cache import ResponseCache
+from src.dedup import DedupIndex
+from src.resilience import AdaptiveConcurrency
+from src.hedging import HedgePolicy
+from src.llm import LLMClient, count_calls
+from src.json_extract import extract_json
+from src.batching import pack_batches, build_batch_prompt, parse_batch_response, match_batch_items
 from loguru import logger
-import json
-import re
+from typing import List, Optional
+import asyncio
 import time
 
 class BaselinePipeline:
-    def __init__(self, config: dict):
-        # Use API key from secure config
-        genai.configure(api_key=config["api_key"])
-        self.model = genai.GenerativeModel(config.get("generator_model", "gemini-2.0-flash-exp"))
+    def __init__(self, config: dict, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None, provider: Optional[ClientProvider] = None,
+                 dedup: Optional[DedupIndex] = None, resilience: Optional[AdaptiveConcurrency] = None,
+                 hedging: Optional[HedgePolicy] = None):
+        # Model handles and connections come from a provider shared by every pipeline in the process
+        self.provider = provider or ClientProvider.shared(config)
+        self.config = config
+        # Share one limiter across pipelines so they draw on the same quota
+        self.rate_limiter = rate_limiter or RateLimiter.from_config(config)
+        self.cache = cache or ResponseCache.from_config(config)
+        # Near-duplicate reviews reuse an earlier extraction instead of calling the model
+        self.dedup = dedup or DedupIndex.from_config(config)
+        # AIMD in-flight limit, circuit breaker and retry policy (shareable like the limiter)
+        self.resilience = resilience or AdaptiveConcurrency.from_config(config)
+        # Duplicates slow calls once they pass a latency percentile (off unless configured)
+        self.hedging = hedging or HedgePolicy.from_config(config)
+        model_name = config.get("generator_model", "gemini-2.0-flash-exp")
+        hedge_model = self.provider.get_model(self.hedging.model) if self.hedging.model else None
+        self.llm = LLMClient(self.provider.get_model(model_name), model_name, self.rate_limiter, self.cache,
+                             self.resilience, self.hedging, hedge_model)
+        self.batching = config.get("batching", {})
         
         # FIXED: Double curly braces to escape them in format string
         self.static_prompt = """
@@ -18,65 +44,157 @@ Respond ONLY with JSON format: {{"product": "...", "sentiment": "...", "reason":
 Review: '{text}'
 """
     
-    def _extract_json(self, text: str) -> dict:
-        """Extract JSON from response, handling markdown code blocks"""
-        # Remove markdown code blocks if present
-        text = text.strip()
-        
-        # Try to find JSON in markdown blocks
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(1)
-        
-        # Remove any leading/trailing text before/after JSON
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(0)
-        
-        return json.loads(text)
+    def _build_result(self, review: Review, data: dict) -> ExtractedData:
+        return ExtractedData(
+            review_id=review.review_id,
+            product=data.get("product", "unknown"),
+            sentiment=data.get("sentiment", "unknown"),
+            reason=data.get("reason", ""),
+            confidence=0.5,
+            prompt_used="static"
+        )
+    
+    def _build_failure(self, review: Review, error: Exception) -> ExtractedData:
+        logger.error(f"Baseline failed for {review.review_id}: {error}")
+        return ExtractedData(
+            review_id=review.review_id,
+            product="error",
+            sentiment="error",
+            reason=str(error)[:100],
+            confidence=0.0,
+            prompt_used="static_failed"
+        )
     
     def process(self, review: Review) -> ExtractedData:
         """Process a single review with static prompt"""
+        with metrics.REVIEW_SECONDS.time(pipeline="baseline"), \
+                tracing.span("review", pipeline="baseline", review_id=review.review_id):
+            reused = self.dedup.reuse("baseline", review)
+            if reused is not None:
+                return reused
+            with count_calls() as calls:
+                result = self._process(review)
+            result.llm_calls = calls.count
+            self.dedup.remember("baseline", review, result)
+            return result
+    
+    def _process(self, review: Review) -> ExtractedData:
         prompt = self.static_prompt.format(text=review.review_text)
         
-        # Retry logic for network errors
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(
+        def _attempt():
+            # Use the robust JSON extraction
+            with tracing.span("llm_attempt"):
+                return self.llm.generate(
+                    prompt,
+                    generation_config={"temperature": 0.1},
+                    parse=extract_json
+                )
+        
+        # Quota, 503, timeout and connection errors are retried with backoff
+        try:
+            return self._build_result(review, self.resilience.run(_attempt, "baseline"))
+        except Exception as e:
+            return self._build_failure(review, e)
+    
+    async def process_async(self, review: Review) -> ExtractedData:
+        """Async version of process using the async Gemini client"""
+        with metrics.REVIEW_SECONDS.time(pipeline="baseline"), \
+                tracing.span("review", pipeline="baseline", review_id=review.review_id):
+            reused = self.dedup.reuse("baseline", review)
+            if reused is not None:
+                return reused
+            return await self._process_fresh_async(review)
+    
+    async def _process_fresh_async(self, review: Review) -> ExtractedData:
+        with count_calls() as calls:
+            result = await self._process_async(review)
+        result.llm_calls = calls.count
+        self.dedup.remember("baseline", review, result)
+        return result
+    
+    async def _process_async(self, review: Review) -> ExtractedData:
+        prompt = self.static_prompt.format(text=review.review_text)
+        
+        async def _attempt():
+            with tracing.span("llm_attempt"):
+                return await self.llm.generate_async(
                     prompt,
-                    generation_config={"temperature": 0.1}
+                    generation_config={"temperature": 0.1},
+                    parse=extract_json
                 )
-                
-                # Use the robust JSON extraction
-                data = self._extract_json(response.text)
-                
-                return ExtractedData(
-                    review_id=review.review_id,
-                    product=data.get("product", "unknown"),
-                    sentiment=data.get("sentiment", "unknown"),
-                    reason=data.get("reason", ""),
-                    confidence=0.5,
-                    prompt_used="static"
+        
+        try:
+            return self._build_result(review, await self.resilience.run_async(_attempt, "baseline"))
+        except Exception as e:
+            return self._build_failure(review, e)
+    
+    async def process_batch_async(self, reviews: List[Review]) -> List[ExtractedData]:
+        """Extract several reviews with one request, falling back to per-item calls"""
+        start = time.perf_counter()
+        with tracing.span("batch", pipeline="baseline", size=len(reviews)):
+            results = [self.dedup.reuse("baseline", review) for review in reviews]
+            fresh = [review for review, result in zip(reviews, results) if result is None]
+            if len(fresh) == 1:
+                extracted = iter([await self._process_fresh_async(fresh[0])])
+            else:
+                extracted = iter(await self._extract_batch_async(fresh) if fresh else [])
+            results = [result if result is not None else next(extracted) for result in results]
+        # Every review in the batch waited for the whole batch
+        elapsed = time.perf_counter() - start
+        for _ in results:
+            metrics.REVIEW_SECONDS.observe(elapsed, pipeline="baseline")
+        return results
+    
+    async def _extract_batch_async(self, reviews: List[Review]) -> List[ExtractedData]:
+        prompt = build_batch_prompt("Extract the product name and sentiment from each review.", reviews)
+        with count_calls() as calls:
+            try:
+                extracted = await self.llm.generate_async(
+                    prompt,
+                    generation_config={"temperature": 0.1},
+                    parse=parse_batch_response
                 )
-                
             except Exception as e:
-                error_str = str(e).lower()
-                
-                # Check if it's a network error
-                if any(x in error_str for x in ['unavailable', 'connection', 'timeout', 'tcp']):
-                    if attempt < max_retries - 1:
-                        wait_time = 10 * (attempt + 1)  # 10s, 20s, 30s
-                        logger.warning(f"Network error for review {review.review_id}, retrying in {wait_time}s... (attempt {attempt+1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                
-                logger.error(f"Baseline failed for {review.review_id}: {e}")
-                return ExtractedData(
-                    review_id=review.review_id,
-                    product="error",
-                    sentiment="error",
-                    reason=str(e)[:100],
-                    confidence=0.0,
-                    prompt_used="static_failed"
-                )
\ No newline at end of file
+                logger.warning(f"Batch of {len(reviews)} failed ({e}), falling back to per-item calls")
+                extracted = {}
+        # Every item shares the cost of the batch request
+        share = calls.count / len(reviews)
+        
+        results = []
+        missing = []
+        for review, data in zip(reviews, match_batch_items(reviews, extracted)):
+            if data is None:
+                missing.append(review)
+                results.append(None)
+                continue
+            result = self._build_result(review, data)
+            result.prompt_used = "static_batch"
+            self.dedup.remember("baseline", review, result)
+            results.append(result)
+        # Items the batch did not cover fall back to single calls, run concurrently rather than one by one
+        recovered = iter(await asyncio.gather(*(self._process_fresh_async(review) for review in missing)))
+        results = [result if result is not None else next(recovered) for result in results]
+        for result in results:
+            result.llm_calls += share
+        return results
+    
+    async def process_many(self, reviews: List[Review], concurrency: int = 4) -> List[ExtractedData]:
+        """Process reviews concurrently, returning results in input order"""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        if self.batching.get("enabled", False):
+            batches = pack_batches(reviews, self.batching.get("max_items", 10),
+                                   self.batching.get("max_tokens", 4000))
+            
+            async def _process_batch(batch: List[Review]) -> List[ExtractedData]:
+                async with semaphore:
+                    return await self.process_batch_async(batch)
+            
+            batch_results = await asyncio.gather(*(_process_batch(b) for b in batches))
+            return [result for batch in batch_results for result in batch]
+        
+        async def _process_one(review: Review) -> ExtractedData:
+            async with semaphore:
+                return await self.process_async(review)
+        
+        return list(await asyncio.gather(*(_process_one(r) for r in reviews)))
@@ -0,0 +1,63 @@
+import json
+from src.utils import Review
+from src.json_extract import extract_json_array
+from src.rate_limiter import RateLimiter
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+def pack_batches(reviews: Iterable[Review], max_items: int, max_tokens: int) -> Iterator[List[Review]]:
+    """Group reviews in order into batches bounded by item count and estimated tokens"""
+    batch, batch_tokens = [], 0
+    for review in reviews:
+        tokens = RateLimiter.estimate_tokens(review.review_text)
+        if batch and (len(batch) >= max_items or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(review)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def batch_item_id(index: int) -> str:
+    """Id of the index-th review in a batch prompt"""
+    return f"item-{index}"
+
+
+def build_batch_prompt(instruction: str, reviews: List[Review]) -> str:
+    """Pack several reviews into one prompt asking for a JSON array keyed by item id.
+
+    Items are numbered by position rather than by review_id, so the same texts
+    always build the same prompt (and response cache key) whoever sends them.
+    """
+    items = json.dumps(
+        [{"review_id": batch_item_id(i), "text": r.review_text} for i, r in enumerate(reviews)],
+        ensure_ascii=False
+    )
+    return f"""
+{instruction}
+Each review below is a JSON object with "review_id" and "text".
+Respond ONLY with a JSON array containing one object per review, in the same order:
+[{{"review_id": "...", "product": "...", "sentiment": "...", "reason": "..."}}]
+Reviews: {items}
+"""
+
+
+def parse_batch_response(text: str) -> Dict[str, dict]:
+    """Parse a JSON array response into extractions keyed by item id.
+
+    Entries that are not objects or lack a review_id are dropped, so the caller
+    can fall back to per-item calls for whatever is missing.
+    """
+    items = extract_json_array(text)
+
+    extracted = {}
+    for item in items:
+        if isinstance(item, dict) and item.get("review_id") is not None:
+            extracted[str(item["review_id"])] = item
+    return extracted
+
+
+def match_batch_items(reviews: List[Review], extracted: Dict[str, dict]) -> List[Optional[dict]]:
+    """Extraction for each review of a batch prompt, in order (None where the response left it out)"""
+    return [extracted.get(batch_item_id(i)) for i in range(len(reviews))]
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class ResponseCache:
+    """Single-file SQLite cache of raw LLM responses with size-based LRU eviction.
+
+    Keys hash the backend type, model name, full prompt text and generation
+    config, so a rerun with unchanged prompts and settings is served entirely
+    from disk, and fake-backend answers are never replayed to a real backend.
+    """
+
+    def __init__(self, path: str = "results/llm_cache.sqlite", max_size_mb: float = 100,
+                 enabled: bool = True, bypass: bool = False, backend: str = "gemini"):
+        self.path = path
+        self.backend = backend
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        # Bypass skips lookups but still records fresh responses
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if enabled:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ResponseCache":
+        """Build a cache from the `cache` section of the config (disabled when absent)"""
+        settings = config.get("cache", {})
+        backend = config.get("backend", {}).get("type", "gemini")
+        # Other backends default to their own file, away from real responses
+        default_path = "results/llm_cache.sqlite" if backend == "gemini" else f"results/llm_cache_{backend}.sqlite"
+        return cls(
+            path=settings.get("path", default_path),
+            max_size_mb=settings.get("max_size_mb", 100),
+            enabled=settings.get("enabled", False),
+            bypass=settings.get("bypass", False),
+            backend=backend,
+        )
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, generation_config: Optional[dict] = None,
+                 backend: str = "gemini") -> str:
+        payload = json.dumps(
+            {"backend": backend, "model": model_name, "prompt": prompt, "config": generation_config or {}},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def key(self, model_name: str, prompt: str, generation_config: Optional[dict] = None) -> str:
+        """make_key for this cache's backend"""
+        return self.make_key(model_name, prompt, generation_config, self.backend)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss"""
+        if not self.enabled or self.bypass:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response and evict least recently used entries over the size limit"""
+        if not self.enabled:
+            return
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current cache size"""
+        entries, size = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,87 @@
+import json
+import os
+import time
+from src.utils import ExtractedData, JsonlResultWriter
+from loguru import logger
+from typing import Dict, List, Optional
+
+
+class RunJournal:
+    """Append-only, per-pipeline journal of completed reviews for crash-safe resume.
+    
+    Every result is appended (and fsynced) to `<root>/<run_id>/<pipeline>.jsonl`
+    as soon as it is produced. On resume the journal is replayed: the latest
+    record per review_id wins, and failed extractions are retried rather than
+    counted as done.
+    """
+    
+    def __init__(self, run_id: Optional[str] = None, root: str = "results/runs"):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.run_dir = os.path.join(root, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+    
+    @classmethod
+    def resume(cls, run_id: str, root: str = "results/runs") -> "RunJournal":
+        """Open an existing run, raising if it was never started"""
+        if not os.path.isdir(os.path.join(root, run_id)):
+            raise FileNotFoundError(f"No run journal found for run_id '{run_id}' in {root}")
+        return cls(run_id, root)
+    
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.run_dir, "run.json")
+    
+    def save_meta(self, meta: dict):
+        """Record the run settings so a resume processes the same inputs"""
+        with open(self.meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+    
+    def load_meta(self) -> dict:
+        if not os.path.exists(self.meta_path):
+            return {}
+        with open(self.meta_path, "r") as f:
+            return json.load(f)
+    
+    def path(self, pipeline: str) -> str:
+        return os.path.join(self.run_dir, f"{pipeline}.jsonl")
+    
+    def _replay(self, pipeline: str) -> Dict[str, ExtractedData]:
+        latest: Dict[str, ExtractedData] = {}
+        if not os.path.exists(self.path(pipeline)):
+            return latest
+        with open(self.path(pipeline), "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    result = ExtractedData.model_validate_json(line)
+                except ValueError:
+                    # A crash mid-write leaves at most one torn line at the end
+                    logger.warning(f"Skipping unreadable journal line {line_no} in {self.path(pipeline)}")
+                    continue
+                latest[result.review_id] = result
+        return latest
+    
+    def completed(self, pipeline: str) -> Dict[str, ExtractedData]:
+        """Successfully extracted results keyed by review_id"""
+        return {
+            review_id: result for review_id, result in self._replay(pipeline).items()
+            if result.product != "error"
+        }
+    
+    def results(self, pipeline: str) -> List[ExtractedData]:
+        """Latest result for every review the pipeline has attempted"""
+        return list(self._replay(pipeline).values())
+    
+    def writer(self, pipeline: str) -> JsonlResultWriter:
+        """Writer appending to the pipeline's journal"""
+        path = self.path(pipeline)
+        # Terminate a torn trailing line so the next record starts cleanly
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+            if needs_newline:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n")
+        return JsonlResultWriter(path, append=True, fsync=True)
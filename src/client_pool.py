@@ -0,0 +1,185 @@
+"""
+Shared model handles and connections for every pipeline in the process.
+
+Building a GenerativeModel per pipeline (and calling genai.configure, which
+drops the transports genai already opened) means each pipeline pays its own
+connection handshakes. A ClientProvider opens a fixed pool of connections per
+backend, hands out one model handle per model name, and spreads calls over the
+pool round-robin so concurrent requests reuse warm connections. With several
+API keys, each call is first routed to a key by the KeyPool and then served by
+one of that key's connections.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+from typing import Dict, Optional
+
+from src.backends import LLMBackend, create_backend
+from src.key_pool import ApiKeyState, KeyPool
+from src.lazy import lazy_import
+from src.rate_limiter import RateLimiter
+
+google_exceptions = lazy_import("google.api_core.exceptions")
+
+
+class PooledModel:
+    """Model handle whose calls are spread over the provider's connection pool.
+
+    With a key pool, callers may route a call ahead of time with reserve_key()
+    and pass the key as `api_key`; otherwise the call waits for a key itself.
+    """
+
+    def __init__(self, provider: "ClientProvider", model_name: str):
+        self.provider = provider
+        self.model_name = model_name
+
+    def reserve_key(self, tokens: int) -> Optional[ApiKeyState]:
+        """Wait for a key with quota for `tokens` (None without a key pool)"""
+        if self.provider.key_pool is None:
+            return None
+        return self.provider.key_pool.acquire(tokens)
+
+    async def reserve_key_async(self, tokens: int) -> Optional[ApiKeyState]:
+        """Async version of reserve_key"""
+        if self.provider.key_pool is None:
+            return None
+        return await self.provider.key_pool.acquire_async(tokens)
+
+    def generate_content(self, prompt, api_key: Optional[ApiKeyState] = None, **kwargs):
+        key = api_key or self.reserve_key(RateLimiter.estimate_tokens(prompt))
+        model = self.provider._checkout(self.model_name, key)
+        try:
+            return model.generate_content(prompt, **kwargs)
+        except google_exceptions.ResourceExhausted:
+            self.provider._quota_error(key)
+            raise
+
+    async def generate_content_async(self, prompt, api_key: Optional[ApiKeyState] = None, **kwargs):
+        key = api_key or await self.reserve_key_async(RateLimiter.estimate_tokens(prompt))
+        model = self.provider._checkout_async(self.model_name, key)
+        try:
+            return await model.generate_content_async(prompt, **kwargs)
+        except google_exceptions.ResourceExhausted:
+            self.provider._quota_error(key)
+            raise
+
+
+class ClientProvider:
+    """Pool of backend connections shared by all pipelines, threads and sessions.
+
+    Connections are opened lazily, up to pool_size for sync calls and pool_size
+    for async calls. Async connections are bound to the event loop they were
+    opened on and are reopened if used from a different loop.
+    """
+
+    _shared: Dict[str, "ClientProvider"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, backend: LLMBackend, pool_size: int = 1, key_pool: Optional[KeyPool] = None):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.backend = backend
+        self.pool_size = pool_size
+        self.key_pool = key_pool
+        self._lock = threading.Lock()
+        self._slots = itertools.count()
+        # Keyed by (api_key, slot); async entries hold (loop, connection)
+        self._connections = {}
+        self._async_connections = {}
+        self._handles = {}
+        self._models: Dict[str, PooledModel] = {}
+        self.connections_opened = 0
+        self.calls = 0
+        self.reused_calls = 0
+        self.model_requests = 0
+
+    @classmethod
+    def from_config(cls, config: dict, backend: Optional[LLMBackend] = None) -> "ClientProvider":
+        """Build a private provider from the `client_pool` config section"""
+        settings = config.get("client_pool", {})
+        return cls(backend or create_backend(config), pool_size=settings.get("size", 1),
+                   key_pool=KeyPool.from_config(config))
+
+    @classmethod
+    def shared(cls, config: dict) -> "ClientProvider":
+        """Process-wide provider for this backend configuration (created on first use)"""
+        key = cls._fingerprint(config)
+        with cls._shared_lock:
+            provider = cls._shared.get(key)
+            if provider is None:
+                provider = cls._shared[key] = cls.from_config(config)
+            return provider
+
+    @staticmethod
+    def _fingerprint(config: dict) -> str:
+        identity = {
+            "backend": config.get("backend", {}),
+            "client_pool": config.get("client_pool", {}),
+            "key_pool": config.get("key_pool", {}),
+            # Hashed so the key never holds the raw secrets
+            "api_keys": hashlib.sha256(str(config.get("api_keys") or config.get("api_key")).encode()).hexdigest(),
+        }
+        return json.dumps(identity, sort_keys=True, default=str)
+
+    def get_model(self, model_name: str) -> PooledModel:
+        """The shared handle for model_name (pipelines asking for the same name get the same one)"""
+        with self._lock:
+            self.model_requests += 1
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = PooledModel(self, model_name)
+            return model
+
+    def _handle(self, model_name: str, slot, connection):
+        key = (model_name, slot)
+        cached = self._handles.get(key)
+        if cached is None or cached[0] is not connection:
+            cached = self._handles[key] = (connection, self.backend.get_model(model_name, connection))
+        return cached[1]
+
+    def _checkout(self, model_name: str, key: Optional[ApiKeyState] = None):
+        api_key = key.api_key if key else None
+        slot = (api_key, next(self._slots) % self.pool_size)
+        with self._lock:
+            self.calls += 1
+            connection = self._connections.get(slot)
+            if connection is None:
+                connection = self._connections[slot] = self.backend.open_connection(api_key=api_key)
+                self.connections_opened += 1
+            else:
+                self.reused_calls += 1
+            return self._handle(model_name, slot, connection)
+
+    def _checkout_async(self, model_name: str, key: Optional[ApiKeyState] = None):
+        loop = asyncio.get_running_loop()
+        api_key = key.api_key if key else None
+        slot = (api_key, next(self._slots) % self.pool_size)
+        with self._lock:
+            self.calls += 1
+            entry = self._async_connections.get(slot)
+            if entry is None or entry[0] is not loop:
+                connection = self.backend.open_connection(asynchronous=True, api_key=api_key)
+                entry = self._async_connections[slot] = (loop, connection)
+                self.connections_opened += 1
+            else:
+                self.reused_calls += 1
+            return self._handle(model_name, ("async",) + slot, entry[1])
+
+    def _quota_error(self, key: Optional[ApiKeyState]):
+        if key is not None:
+            self.key_pool.report_quota_error(key)
+
+    def stats(self) -> dict:
+        """Connection and handle reuse counters"""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "connections_opened": self.connections_opened,
+                "calls": self.calls,
+                "reused_calls": self.reused_calls,
+                "reuse_rate": self.reused_calls / self.calls if self.calls else 0.0,
+                "models": len(self._models),
+                "model_requests": self.model_requests,
+            }
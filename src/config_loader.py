@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 import yaml
 from dotenv import load_dotenv
@@ -8,21 +10,36 @@ def load_secure_config(config_path: str = "config/prompt_config.yaml") -> Dict[s
     # Load .env file if it exists
     load_dotenv()
     
-    # Get API key (will raise error if not found)
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
+    # Load YAML config
+    with open(config_path, 'r') as f:
+        config = yaml.safe_load(f)
+    
+    # AUTOPROMPT_BACKEND=fake switches to the offline backend, which needs no key
+    backend = config.setdefault("backend", {})
+    backend["type"] = os.getenv("AUTOPROMPT_BACKEND", backend.get("type", "gemini"))
+    if backend["type"] != "gemini":
+        return config
+    
+    # Get API keys: GEMINI_API_KEYS (comma-separated pool) or GEMINI_API_KEY (will raise error if neither)
+    api_keys = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+    if not api_keys and os.getenv("GEMINI_API_KEY"):
+        api_keys = [os.getenv("GEMINI_API_KEY")]
+    if not api_keys:
         raise ValueError(
             "❌ GEMINI_API_KEY not found!\n"
             "   1. Create a .env file in project root\n"
-            "   2. Add: GEMINI_API_KEY=your_key_here\n"
+            "   2. Add: GEMINI_API_KEY=your_key_here (or GEMINI_API_KEYS=key1,key2 to pool several)\n"
             "   3. Get your key from: https://aistudio.google.com/app/apikey"
         )
     
-    # Load YAML config
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    
-    # Inject API key into config
-    config["api_key"] = api_key
+    # Inject API keys into config (api_key is the first, for single-key callers)
+    config["api_keys"] = api_keys
+    config["api_key"] = api_keys[0]
     
-    return config
\ No newline at end of file
+    return config
+
+
+def config_fingerprint(config: Dict[str, Any]) -> str:
+    """Stable hash of the settings that shape results (API keys excluded), for cache keys"""
+    settings = {key: value for key, value in config.items() if key not in ("api_key", "api_keys")}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
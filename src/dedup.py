@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Optional, Tuple
+
+from src.lazy import lazy_import
+from src.utils import Review, ExtractedData
+
+np = lazy_import("numpy")
+
+# Prime just above 2**32, so (a * x + b) with 32-bit a, x and b never overflows uint64
+_PRIME = 4294967311
+_WORD = re.compile(r"\w+")
+
+
+class DedupIndex:
+    """Persistent MinHash/LSH index of extracted reviews for near-duplicate reuse.
+
+    Each review's text is reduced to a MinHash signature over character
+    shingles. Signatures are split into bands; reviews sharing any band bucket
+    are candidates, and a candidate whose estimated Jaccard similarity reaches
+    `threshold` has its extraction reused instead of calling the LLM. Entries
+    are namespaced per pipeline so one pipeline never reuses another's output.
+    """
+
+    def __init__(self, path: str = "results/dedup_index.sqlite", threshold: float = 0.9,
+                 num_perm: int = 128, bands: int = 16, shingle_size: int = 5,
+                 enabled: bool = True, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if enabled:
+            # Hash permutations (a disabled index never imports NumPy)
+            rng = np.random.RandomState(seed)
+            self._a = rng.randint(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+            self._b = rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._init_schema(seed)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "DedupIndex":
+        """Build from the `dedup` config section (disabled when absent)"""
+        settings = config.get("dedup", {})
+        return cls(
+            path=settings.get("path", "results/dedup_index.sqlite"),
+            threshold=settings.get("threshold", 0.9),
+            num_perm=settings.get("num_perm", 128),
+            bands=settings.get("bands", 16),
+            shingle_size=settings.get("shingle_size", 5),
+            enabled=settings.get("enabled", False),
+        )
+
+    def _init_schema(self, seed: int):
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " review_id TEXT NOT NULL,"
+            " signature BLOB NOT NULL,"
+            " result TEXT NOT NULL,"
+            " UNIQUE (namespace, review_id))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT NOT NULL, entry_id INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bucket_key ON buckets(key)")
+        # Signatures from different hashing parameters are not comparable: start over
+        params = json.dumps({"num_perm": self.num_perm, "bands": self.bands,
+                             "shingle_size": self.shingle_size, "seed": seed})
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row is not None and row[0] != params:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM buckets")
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+        self._conn.commit()
+
+    def signature(self, text: str) -> Optional["np.ndarray"]:
+        """MinHash signature of the text's character shingles (None for empty text)"""
+        normalized = " ".join(_WORD.findall(text.lower()))
+        if not normalized:
+            return None
+        k = self.shingle_size
+        shingles = {normalized[i:i + k] for i in range(max(1, len(normalized) - k + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_PRIME)
+        return permuted.min(axis=1)
+
+    def _bucket_keys(self, namespace: str, signature: "np.ndarray"):
+        return [
+            f"{namespace}:{band}:"
+            + hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    def find(self, namespace: str, text: str) -> Optional[Tuple[str, float, ExtractedData]]:
+        """Most similar stored review at or above the threshold: (review_id, similarity, result)"""
+        if not self.enabled:
+            return None
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        keys = self._bucket_keys(namespace, signature)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT e.review_id, e.signature, e.result FROM buckets b"
+                " JOIN entries e ON e.id = b.entry_id"
+                f" WHERE b.key IN ({','.join('?' * len(keys))})",
+                keys
+            ).fetchall()
+        best = None
+        for review_id, blob, result in rows:
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (review_id, similarity, result)
+        if best is None:
+            return None
+        return best[0], best[1], ExtractedData.model_validate_json(best[2])
+
+    def reuse(self, namespace: str, review: Review) -> Optional[ExtractedData]:
+        """A copy of a near-duplicate's extraction for this review, or None on a miss"""
+        if not self.enabled:
+            return None
+        match = self.find(namespace, review.review_text)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        source_id, _, result = match
+        return result.model_copy(update={
+            "review_id": review.review_id,
+            "prompt_used": f"dedup_of_{source_id}",
+            "llm_calls": 0.0,
+        })
+
+    def remember(self, namespace: str, review: Review, result: ExtractedData):
+        """Index a successful extraction (failures and reused results are not stored)"""
+        if not self.enabled or result.product == "error" or result.prompt_used.startswith("dedup_of_"):
+            return
+        signature = self.signature(review.review_text)
+        if signature is None:
+            return
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (namespace, review_id, signature, result) VALUES (?, ?, ?, ?)",
+                (namespace, review.review_id, signature.tobytes(), result.model_dump_json())
+            )
+            if cursor.rowcount:
+                self._conn.executemany(
+                    "INSERT INTO buckets (key, entry_id) VALUES (?, ?)",
+                    [(key, cursor.lastrowid) for key in self._bucket_keys(namespace, signature)]
+                )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and number of indexed reviews"""
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,67 +1,142 @@
-import pandas as pd
+from src.lazy import lazy_import
 from src.utils import ExtractedData
-from typing import List
+from itertools import islice
+from typing import Callable, Iterable, List, Optional, Union
 import json
 import os
 
+pd = lazy_import("pandas")
+
+# Edge case performance (reviews 4, 6, 10 in our data)
+EDGE_CASE_IDS = ["4", "6", "10"]
+
+def _normalize(column: "pd.Series") -> "pd.Series":
+    return column.astype(str).str.lower().str.strip()
+
+class MetricsAccumulator:
+    """Running counters for one pipeline, updated chunk by chunk.
+
+    Only results whose review_id has ground truth are counted (the same rows an
+    inner merge would keep), so metrics() can be read at any point mid-run.
+    """
+
+    def __init__(self, truth: "pd.DataFrame"):
+        self._truth_index = truth.index
+        self._truth_products = truth["product"].values
+        self._truth_sentiments = truth["sentiment"].values
+        self.total = 0
+        self.correct_products = 0
+        self.correct_sentiments = 0
+        self.failures = 0
+        self.edge_total = 0
+        self.edge_correct = 0
+        self.confidence_sum = 0.0
+        self.calls_sum = 0.0
+
+    def update(self, results: Union[Iterable[ExtractedData], "pd.DataFrame"]):
+        """Fold a chunk of results (ExtractedData records or a DataFrame) into the counters"""
+        if isinstance(results, pd.DataFrame):
+            chunk = results
+        else:
+            records = [(r.review_id, r.product, r.sentiment, r.confidence, r.llm_calls) for r in results]
+            chunk = pd.DataFrame(records, columns=["review_id", "product", "sentiment", "confidence", "llm_calls"])
+        if chunk.empty:
+            return
+        
+        # Hash lookup into the indexed ground truth (-1 = no ground truth)
+        review_ids = chunk["review_id"].astype(str)
+        positions = self._truth_index.get_indexer(review_ids)
+        matched = positions >= 0
+        if not matched.any():
+            return
+        chunk = chunk[matched]
+        review_ids = review_ids[matched]
+        positions = positions[matched]
+        
+        # Handle case-insensitive comparison and strip whitespace
+        sentiment_ok = _normalize(chunk["sentiment"]).values == self._truth_sentiments[positions]
+        product_ok = _normalize(chunk["product"]).values == self._truth_products[positions]
+        edge = review_ids.isin(EDGE_CASE_IDS).values
+        
+        self.total += len(chunk)
+        self.correct_products += int(product_ok.sum())
+        self.correct_sentiments += int(sentiment_ok.sum())
+        # Failure rate (malformed outputs)
+        self.failures += int(chunk["product"].isin(["error", "unknown"]).sum())
+        self.edge_total += int(edge.sum())
+        self.edge_correct += int((sentiment_ok & edge).sum())
+        self.confidence_sum += float(chunk["confidence"].sum())
+        # Results written before calls were tracked have no llm_calls column
+        if "llm_calls" in chunk:
+            self.calls_sum += float(chunk["llm_calls"].fillna(0).sum())
+
+    def metrics(self) -> dict:
+        """Metrics over everything seen so far"""
+        total = self.total
+        if total == 0:
+            return {
+                "overall_accuracy": 0.0,
+                "product_accuracy": 0.0,
+                "sentiment_accuracy": 0.0,
+                "failure_rate": 0.0,
+                "edge_case_accuracy": 0.0,
+                "avg_confidence": 0.0,
+                "calls_per_review": 0.0
+            }
+        
+        return {
+            "overall_accuracy": (self.correct_products + self.correct_sentiments) / (2 * total) * 100,
+            "product_accuracy": self.correct_products / total * 100,
+            "sentiment_accuracy": self.correct_sentiments / total * 100,
+            "failure_rate": self.failures / total * 100,
+            "edge_case_accuracy": self.edge_correct / self.edge_total * 100 if self.edge_total else 0.0,
+            "avg_confidence": self.confidence_sum / total,
+            "calls_per_review": self.calls_sum / total
+        }
+
 class Evaluator:
     def __init__(self, ground_truth_path: str):
         """Load ground truth data"""
         self.ground_truth = pd.read_json(ground_truth_path, orient="records")
         # FIX: Convert review_id to string to match results
         self.ground_truth['review_id'] = self.ground_truth['review_id'].astype(str)
-    
-    def calculate_metrics(self, results: List[ExtractedData]) -> dict:
-        """Calculate performance metrics"""
-        results_df = pd.DataFrame([r.dict() for r in results])
         
-        # FIX: Ensure review_id is string in results too
-        results_df['review_id'] = results_df['review_id'].astype(str)
-        
-        merged = pd.merge(results_df, self.ground_truth, 
-                         on="review_id", suffixes=("_pred", "_true"))
-        
-        # Accuracy metrics
-        total = len(merged)
-        
-        # FIX: Handle case-insensitive comparison and strip whitespace
-        correct_products = (
-            merged['product_pred'].str.lower().str.strip() == 
-            merged['product_true'].str.lower().str.strip()
-        ).sum()
-        
-        correct_sentiments = (
-            merged['sentiment_pred'].str.lower().str.strip() == 
-            merged['sentiment_true'].str.lower().str.strip()
-        ).sum()
-        
-        # Failure rate (malformed outputs)
-        failure_rate = (merged['product_pred'].isin(['error', 'unknown'])).mean() * 100
-        
-        # Edge case performance (reviews 4, 6, 10 in our data)
-        edge_case_ids = ["4", "6", "10"]
-        edge_performance = merged[merged['review_id'].isin(edge_case_ids)]
-        
-        if len(edge_performance) > 0:
-            edge_accuracy = (
-                edge_performance['sentiment_pred'].str.lower().str.strip() == 
-                edge_performance['sentiment_true'].str.lower().str.strip()
-            ).mean() * 100
-        else:
-            edge_accuracy = 0.0
+        # Normalize and index the ground truth once, keyed by review_id
+        self._truth = pd.DataFrame({
+            "product": _normalize(self.ground_truth["product"]).values,
+            "sentiment": _normalize(self.ground_truth["sentiment"]).values,
+        }, index=self.ground_truth["review_id"].values)
+        self._truth = self._truth[~self._truth.index.duplicated(keep="first")]
+
+    def new_accumulator(self) -> MetricsAccumulator:
+        """Running metrics for one pipeline; feed it with update()"""
+        return MetricsAccumulator(self._truth)
+
+    def evaluate_stream(self, results: Iterable[ExtractedData], chunksize: int = 100000,
+                        on_chunk: Optional[Callable[[dict], None]] = None) -> dict:
+        """Evaluate a (possibly unbounded) stream of results in fixed-size chunks.
         
-        return {
-            "overall_accuracy": (correct_products + correct_sentiments) / (2 * total) * 100,
-            "product_accuracy": correct_products / total * 100,
-            "sentiment_accuracy": correct_sentiments / total * 100,
-            "failure_rate": failure_rate,
-            "edge_case_accuracy": edge_accuracy,
-            "avg_confidence": merged['confidence'].mean()
-        }
-    
-    def generate_report(self, baseline_results: List[ExtractedData], 
-                       autoprompt_results: List[ExtractedData]) -> dict:
-        """Generate comparison report"""
+        Memory is bounded by chunksize; on_chunk receives the running metrics
+        after each chunk.
+        """
+        accumulator = self.new_accumulator()
+        iterator = iter(results)
+        while True:
+            chunk = list(islice(iterator, chunksize))
+            if not chunk:
+                break
+            accumulator.update(chunk)
+            if on_chunk is not None:
+                on_chunk(accumulator.metrics())
+        return accumulator.metrics()
+
+    def calculate_metrics(self, results: List[ExtractedData]) -> dict:
+        """Calculate performance metrics"""
+        return self.evaluate_stream(results)
+
+    def generate_report(self, baseline_results: Iterable[ExtractedData],
+                       autoprompt_results: Iterable[ExtractedData], hedging: Optional[dict] = None) -> dict:
+        """Generate comparison report (with per-pipeline HedgePolicy.stats() when hedging ran)"""
         print("\n" + "="*60)
         print("🎯 AUTOPROMPT EVALUATION REPORT")
         print("="*60)
@@ -73,7 +148,7 @@ class Evaluator:
             "baseline": baseline_metrics,
             "autoprompt": autoprompt_metrics,
             "improvement": {
-                k: autoprompt_metrics[k] - baseline_metrics[k] 
+                k: autoprompt_metrics[k] - baseline_metrics[k]
                 for k in baseline_metrics
             }
         }
@@ -84,6 +159,9 @@ class Evaluator:
             for metric, value in metrics.items():
                 print(f"  {metric}: {value:.2f}")
         
+        if hedging:
+            report["hedging"] = hedging
+        
         # Save to file
         os.makedirs("results", exist_ok=True)
         with open("results/benchmark_report.json", "w") as f:
@@ -96,5 +174,13 @@ class Evaluator:
         print(f"✓ Accuracy Improvement: {report['improvement']['overall_accuracy']:+.1f}%")
         print(f"✓ Failure Rate Change: {report['improvement']['failure_rate']:+.1f}%")
         print(f"✓ Edge Case Boost: {report['improvement']['edge_case_accuracy']:+.1f}%")
+        print(f"✓ LLM Calls per Review: {baseline_metrics['calls_per_review']:.2f} baseline, "
+              f"{autoprompt_metrics['calls_per_review']:.2f} autoprompt")
+        for pipeline, stats in (hedging or {}).items():
+            if stats["p99_improvement"] is None:
+                continue
+            print(f"✓ {pipeline.capitalize()} p99 latency: {stats['control_p99']:.2f}s unhedged, "
+                  f"{stats['request_p99']:.2f}s hedged ({stats['p99_improvement']:.0%} lower, "
+                  f"+{stats['extra_call_rate']:.1%} calls)")
         
-        return report
\ No newline at end of file
+        return report
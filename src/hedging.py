@@ -0,0 +1,236 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from src import metrics
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies (seconds) with nearest-rank percentiles"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile (0-100) of the window, or None while it is empty"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, int(round(q / 100.0 * len(samples))) - 1))
+        return samples[rank]
+
+
+class HedgePolicy:
+    """Duplicates model requests that run longer than usual; the first valid response wins.
+
+    A request still running after the `percentile` of recently observed call
+    latency gets a second copy (the hedge), possibly to another model. Whichever
+    returns a valid response first is used and the other is cancelled; a failed
+    response keeps the race going until the other one ends. Hedges are capped at
+    `budget` extra calls per request, and nothing is hedged until `min_samples`
+    calls have been timed. With `timeout`, a request that has not finished by
+    then raises TimeoutError (so the retry policy treats it as a timeout).
+
+    A `holdout` share of requests is never hedged; their latency is the control
+    that the hedged requests' p99 is compared against in stats().
+
+    Async requests cancel the loser; sync requests run in worker threads, where
+    a request already in flight finishes in the background and is discarded.
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, min_delay: float = 0.05,
+                 budget: float = 0.1, window: int = 1000, model: Optional[str] = None,
+                 timeout: Optional[float] = None, holdout: float = 0.1, enabled: bool = True,
+                 max_workers: int = 32):
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.min_delay = min_delay
+        self.budget = budget
+        self.model = model
+        self.timeout = timeout
+        self.holdout = holdout
+        self.enabled = enabled
+        self.max_workers = max_workers
+        # Latency of single calls (drives the hedge delay), of requests that may be hedged
+        # and of the unhedged holdout
+        self.calls = LatencyTracker(window)
+        self.requests = LatencyTracker(window)
+        self.control = LatencyTracker(window)
+        self.total_requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "HedgePolicy":
+        """Build from the `hedging` config section (disabled when absent)"""
+        settings = config.get("hedging", {})
+        timeout_ms = settings.get("timeout_ms")
+        return cls(
+            percentile=settings.get("percentile", 95),
+            min_samples=settings.get("min_samples", 20),
+            min_delay=settings.get("min_delay_ms", 50) / 1000.0,
+            budget=settings.get("budget", 0.1),
+            window=settings.get("window", 1000),
+            model=settings.get("model"),
+            timeout=timeout_ms / 1000.0 if timeout_ms else None,
+            holdout=settings.get("holdout", 0.1),
+            enabled=settings.get("enabled", False),
+        )
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while too few calls have been timed"""
+        if len(self.calls) < self.min_samples:
+            return None
+        return max(self.min_delay, self.calls.percentile(self.percentile))
+
+    def _start(self) -> float:
+        with self._lock:
+            self.total_requests += 1
+        return time.perf_counter()
+
+    def _try_hedge(self, control: bool, model_name: str) -> bool:
+        if control:
+            return False
+        with self._lock:
+            if self.hedges >= self.budget * self.total_requests:
+                self.over_budget += 1
+                return False
+            self.hedges += 1
+        metrics.HEDGES.inc(model=model_name)
+        return True
+
+    def _finish(self, start: float, control: bool, hedge_won: bool, model_name: str):
+        (self.control if control else self.requests).observe(time.perf_counter() - start)
+        if hedge_won:
+            with self._lock:
+                self.hedge_wins += 1
+            metrics.HEDGE_WINS.inc(model=model_name)
+
+    def _remaining(self, start: float) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        return max(0.0, start + self.timeout - time.perf_counter())
+
+    def _wait_before_hedge(self, start: float) -> Optional[float]:
+        delay = self.delay()
+        remaining = self._remaining(start)
+        if delay is None:
+            return remaining
+        return delay if remaining is None else min(delay, remaining)
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = fn()
+        self.calls.observe(time.perf_counter() - start)
+        return result
+
+    async def _timed_async(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # A cancelled loser ran at least this long; dropping it would bias the percentile low
+            self.calls.observe(time.perf_counter() - start)
+            raise
+        self.calls.observe(time.perf_counter() - start)
+        return result
+
+    def _submit(self, fn: Callable[[], T]) -> concurrent.futures.Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="hedge")
+        # Each worker runs in a copy of the caller's context, so spans and call counters still apply
+        return self._executor.submit(contextvars.copy_context().run, self._timed, fn)
+
+    def call(self, primary: Callable[[], T], hedge: Callable[[], T], model_name: str = "") -> T:
+        """Run primary, racing it against hedge once it is slower than the hedge delay"""
+        start = self._start()
+        control = random.random() < self.holdout
+        first = self._submit(primary)
+        pending = {first}
+        error = None
+        try:
+            done, _ = concurrent.futures.wait(pending, timeout=self._wait_before_hedge(start))
+            if not done and self._remaining(start) != 0 and self._try_hedge(control, model_name):
+                pending.add(self._submit(hedge))
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=self._remaining(start),
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"Model request timed out after {self.timeout:.1f}s")
+                for future in done:
+                    if future.exception() is None:
+                        self._finish(start, control, future is not first, model_name)
+                        return future.result()
+                    error = error or future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def call_async(self, primary: Callable[[], Awaitable[T]], hedge: Callable[[], Awaitable[T]],
+                         model_name: str = "") -> T:
+        """Async version of call; the losing request is cancelled"""
+        start = self._start()
+        control = random.random() < self.holdout
+        first = asyncio.ensure_future(self._timed_async(primary))
+        pending = {first}
+        error = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self._wait_before_hedge(start))
+            if not done and self._remaining(start) != 0 and self._try_hedge(control, model_name):
+                pending.add(asyncio.ensure_future(self._timed_async(hedge)))
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=self._remaining(start),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError(f"Model request timed out after {self.timeout:.1f}s")
+                # Retrieve every exception, so a failed loser is never reported as unretrieved
+                errors = {task: task.exception() for task in done}
+                for task, task_error in errors.items():
+                    if task_error is None:
+                        self._finish(start, control, task is not first, model_name)
+                        return task.result()
+                error = error or next(iter(errors.values()))
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Hedges sent and won, and p50/p99 latency of hedged requests against the unhedged holdout"""
+        with self._lock:
+            total, hedges, wins, over_budget = self.total_requests, self.hedges, self.hedge_wins, self.over_budget
+        request_p99, control_p99 = self.requests.percentile(99), self.control.percentile(99)
+        return {
+            "requests": total,
+            "hedges": hedges,
+            "hedge_wins": wins,
+            "over_budget": over_budget,
+            "extra_call_rate": hedges / total if total else 0.0,
+            "hedge_delay": self.delay(),
+            "request_p50": self.requests.percentile(50),
+            "request_p99": request_p99,
+            "control_p50": self.control.percentile(50),
+            "control_p99": control_p99,
+            "p99_improvement": 1 - request_p99 / control_p99 if request_p99 and control_p99 else None,
+        }
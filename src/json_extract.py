@@ -0,0 +1,261 @@
+"""
+Shared JSON extraction for LLM responses.
+
+Responses often wrap the JSON in markdown fences or chatter, or contain more
+than one object. Instead of regex-matching the whole response, a brace- and
+string-aware scanner jumps between structural characters and stops at the end
+of the first balanced value, so the cost depends on where the JSON sits rather
+than on how much text follows it. Candidates that fail to parse (braces in
+prose, deep nesting) are found in the same pass rather than by rescanning.
+"""
+import json
+import re
+import threading
+from typing import Iterator, Optional, Tuple
+
+try:
+    # Optional fast backend; its decode errors subclass json.JSONDecodeError
+    from orjson import loads as _loads
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+# Tokens that can change the scanner state: a whole string literal (so braces
+# inside strings are skipped in one step), a bracket, or a lone unterminated quote
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"', re.DOTALL)
+
+# What may follow an opener in valid JSON; spans failing this are prose and never sliced or parsed
+_VALUE_START = {"{": re.compile(r'\s*["}]'), "[": re.compile(r'\s*[]\["{0-9tfn-]')}
+
+
+def find_balanced(text: str, begin: int) -> Optional[int]:
+    """Return the index just past the value opened at text[begin], or None if unterminated"""
+    depth = 0
+    for match in _TOKEN.finditer(text, begin):
+        start, end = match.span()
+        char = text[start]
+        if char == '"':
+            if end - start == 1:
+                return None
+        elif char in "{[":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return end
+    return None
+
+
+def find_json_span(text: str, opener: str = "{", start: int = 0) -> Optional[Tuple[int, int]]:
+    """Locate the first balanced object (or array, with opener='[') at or after start"""
+    begin = text.find(opener, start)
+    if begin == -1:
+        return None
+    end = find_balanced(text, begin)
+    if end is None:
+        return None
+    return begin, end
+
+
+def iter_json_spans(text: str, opener: str = "{") -> Iterator[Tuple[int, int]]:
+    """Yield the balanced values opened by `opener`, by start position, in one pass.
+
+    The spans of one top-level value (it and the values nested in it) are yielded
+    once it closes, so a caller stopping at the first usable span never scans past
+    that value. Spans nested in a value that never closes are yielded at the end.
+    """
+    stack = []
+    closed = []
+    pos = 0
+    while True:
+        if not stack:
+            closed.sort()
+            yield from closed
+            closed = []
+            # Prose between values (quotes included) is skipped, not tokenized
+            pos = text.find(opener, pos)
+            if pos == -1:
+                return
+        match = _TOKEN.search(text, pos)
+        if match is None:
+            break
+        start, pos = match.span()
+        char = text[start]
+        if char == '"':
+            if pos - start == 1:
+                # Unterminated string: nothing after it can close
+                break
+        elif char in "{[":
+            stack.append(start)
+        else:
+            begin = stack.pop()
+            if text[begin] == opener:
+                closed.append((begin, pos))
+    closed.sort()
+    yield from closed
+
+
+class RepairStats:
+    """Counters for local repairs of malformed LLM JSON"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.attempts = 0
+        self.repaired = 0
+        self.failed = 0
+
+    def record(self, success: bool):
+        with self._lock:
+            self.attempts += 1
+            if success:
+                self.repaired += 1
+            else:
+                self.failed += 1
+
+    def as_dict(self) -> dict:
+        return {"attempts": self.attempts, "repaired": self.repaired, "failed": self.failed}
+
+
+repair_stats = RepairStats()
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _drop_trailing_comma(out: list):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(fragment: str) -> str:
+    """Best-effort repair of a JSON value starting at fragment[0].
+
+    Fixes trailing commas, single-quoted strings, unterminated strings and
+    values truncated mid-way (a member cut off before its value is dropped and
+    open brackets are closed). Text after the value is complete is dropped.
+    """
+    out = []
+    # One [bracket, state, member_start] frame per open container; state tracks
+    # what an object expects next, member_start where its current member began
+    stack = []
+    quote = None
+    escape = False
+
+    def _value_done():
+        if stack:
+            stack[-1][1] = "after"
+
+    for char in fragment:
+        if quote:
+            if escape:
+                escape = False
+                if char == "'":
+                    # \' is not a valid JSON escape
+                    out.pop()
+                out.append(char)
+            elif char == "\\":
+                escape = True
+                out.append(char)
+            elif char == quote:
+                quote = None
+                out.append('"')
+                if stack and stack[-1][0] == "{" and stack[-1][1] == "key":
+                    stack[-1][1] = "colon"
+                else:
+                    _value_done()
+            elif char == '"':
+                # A double quote inside a single-quoted string
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            else:
+                out.append(char)
+        elif char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            out.append(char)
+            stack.append([char, "key" if char == "{" else "value", len(out)])
+        elif char in "}]":
+            if not stack:
+                break
+            _drop_trailing_comma(out)
+            out.append(_CLOSERS[stack.pop()[0]])
+            if not stack:
+                return "".join(out)
+            _value_done()
+        elif char == ":":
+            if stack:
+                stack[-1][1] = "value"
+            out.append(char)
+        elif char == ",":
+            out.append(char)
+            if stack:
+                stack[-1][1] = "key" if stack[-1][0] == "{" else "value"
+                stack[-1][2] = len(out)
+        else:
+            if not char.isspace() and stack and stack[-1][1] == "value":
+                stack[-1][1] = "after"
+            out.append(char)
+
+    # Truncated: finish the open string, fill a missing value, then close brackets
+    if quote:
+        if escape:
+            out.pop()
+        out.append('"')
+        if stack and stack[-1][0] == "{" and stack[-1][1] == "key":
+            stack[-1][1] = "colon"
+    while out and out[-1].isspace():
+        out.pop()
+    if stack and stack[-1][0] == "{" and (
+            stack[-1][1] == "colon" or (stack[-1][1] == "value" and out and out[-1] == ":")):
+        del out[stack[-1][2]:]
+    while stack:
+        _drop_trailing_comma(out)
+        out.append(_CLOSERS[stack.pop()[0]])
+    return "".join(out)
+
+
+def _repair(text: str, opener: str, max_candidates: int = 3):
+    begin = text.find(opener)
+    for _ in range(max_candidates):
+        if begin == -1:
+            break
+        try:
+            value = _loads(repair_json(text[begin:]))
+            repair_stats.record(True)
+            return value
+        except ValueError:
+            begin = text.find(opener, begin + 1)
+    repair_stats.record(False)
+    raise json.JSONDecodeError(f"No valid or repairable JSON value starting with '{opener}'", text, 0)
+
+
+def _extract(text: str, opener: str, repair: bool):
+    value_start = _VALUE_START[opener]
+    for begin, end in iter_json_spans(text, opener):
+        if not value_start.match(text, begin + 1):
+            continue
+        try:
+            return _loads(text[begin:end])
+        except ValueError:
+            # Braces in prose (e.g. "{note}") - try the next candidate
+            continue
+
+    if repair and opener in text:
+        # Fix the response locally instead of paying for another LLM call
+        return _repair(text, opener)
+    raise json.JSONDecodeError(f"No complete JSON value starting with '{opener}'", text, 0)
+
+
+def extract_json(text: str, repair: bool = True) -> dict:
+    """Parse the first balanced JSON object in an LLM response, repairing it if needed"""
+    return _extract(text, "{", repair)
+
+
+def extract_json_array(text: str, repair: bool = True) -> list:
+    """Parse the first balanced JSON array in an LLM response, repairing it if needed"""
+    return _extract(text, "[", repair)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from typing import Callable, List, Optional
+
+from src.rate_limiter import RateLimiter, key_limits
+
+
+class ApiKeyState:
+    """Quota accounting and health for one API key"""
+
+    def __init__(self, api_key: str, limiter: RateLimiter):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.tokens = 0
+        self.quota_errors = 0
+
+    @property
+    def label(self) -> str:
+        """Masked key for logs and reports"""
+        return f"...{self.api_key[-4:]}" if self.api_key else "default"
+
+
+class KeyPool:
+    """Routes each call to the API key with the most quota headroom.
+
+    Every key has its own limiter; a key that returns a quota error is skipped
+    until its cooldown expires. Aggregate throughput is the sum of the keys'
+    quotas. When every key is cooling down, callers wait for the first to recover.
+    """
+
+    def __init__(self, api_keys: List[str], limiters: List[RateLimiter], cooldown_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if not api_keys or len(api_keys) != len(limiters):
+            raise ValueError("KeyPool needs one limiter per API key")
+        self.keys = [ApiKeyState(key, limiter) for key, limiter in zip(api_keys, limiters)]
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["KeyPool"]:
+        """Build from `api_keys` and the `key_pool` section; None unless several keys are configured"""
+        api_keys = config.get("api_keys") or []
+        if len(api_keys) < 2:
+            return None
+        limiters = [RateLimiter.from_limits(limits) for limits in key_limits(config)]
+        return cls(api_keys, limiters, config.get("key_pool", {}).get("cooldown_seconds", 60.0))
+
+    def _choose(self, tokens: int):
+        """Pick a key and reserve its quota, or return the seconds until one recovers"""
+        with self._lock:
+            now = self._clock()
+            healthy = [key for key in self.keys if key.cooldown_until <= now]
+            if not healthy:
+                return None, min(key.cooldown_until for key in self.keys) - now
+            best = min(healthy, key=lambda key: key.limiter.wait_estimate(tokens))
+            best.calls += 1
+            best.tokens += tokens
+            return best, best.limiter._reserve(tokens)
+
+    def acquire(self, tokens: int = 0) -> ApiKeyState:
+        """Block until some key can take a request of `tokens` tokens and return it"""
+        while True:
+            key, wait = self._choose(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            if key is not None:
+                return key
+
+    async def acquire_async(self, tokens: int = 0) -> ApiKeyState:
+        """Async version of acquire"""
+        while True:
+            key, wait = self._choose(tokens)
+            if wait > 0:
+                try:
+                    await asyncio.sleep(wait)
+                except asyncio.CancelledError:
+                    if key is not None:
+                        key.limiter._refund(tokens)
+                    raise
+            if key is not None:
+                return key
+
+    def report_quota_error(self, key: ApiKeyState):
+        """Take a key out of rotation for cooldown_seconds after a quota (429) error"""
+        with self._lock:
+            key.quota_errors += 1
+            key.cooldown_until = self._clock() + self.cooldown_seconds
+
+    def utilization(self) -> List[dict]:
+        """Per-key calls, quota errors, limiter waits and share of the key's RPM used so far"""
+        with self._lock:
+            now = self._clock()
+            minutes = max(now - self._started, 1e-9) / 60.0
+            return [{
+                "key": key.label,
+                "calls": key.calls,
+                "tokens": key.tokens,
+                "quota_errors": key.quota_errors,
+                "healthy": key.cooldown_until <= now,
+                "wait_seconds": key.limiter.total_wait,
+                "rpm_utilization": min(1.0, key.calls / (key.limiter.requests_per_minute * minutes)),
+            } for key in self.keys]
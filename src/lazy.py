@@ -0,0 +1,38 @@
+"""
+Deferred imports for heavy dependencies.
+
+pandas, NumPy and the Google client libraries each add a noticeable fraction
+of a second to startup, yet many runs (one review, a chart, a health check)
+never touch the code paths that need them. Modules bind them with
+lazy_import() and the real import happens on first attribute access.
+"""
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is first read"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        # Cached on the instance, so later reads skip __getattr__
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """A placeholder for `import name` that imports on first use"""
+    return LazyModule(name)
@@ -0,0 +1,215 @@
+from src import metrics, tracing
+from src.cache import ResponseCache
+from src.hedging import HedgePolicy
+from src.resilience import AdaptiveConcurrency
+from src.rate_limiter import RateLimiter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+
+class CallCounter:
+    """Model requests made while a count_calls() block is active"""
+
+    def __init__(self):
+        self.count = 0
+
+
+_active_counter: ContextVar[Optional[CallCounter]] = ContextVar("llm_call_counter", default=None)
+
+
+@contextmanager
+def count_calls():
+    """Count model requests (cache hits excluded) made in this block, including tasks it spawns"""
+    counter = CallCounter()
+    token = _active_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _active_counter.reset(token)
+
+
+def _record_call():
+    counter = _active_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+class LLMClient:
+    """A model handle bundled with the shared rate limiter and response cache.
+
+    Cache hits never touch the limiter, so a fully cached rerun costs no quota.
+    Calls, latency, limiter waits, tokens and parse failures go to src.metrics;
+    limiter waits, requests and parsing are traced as spans.
+    When `parse` is given, only responses that parse successfully are cached;
+    otherwise a retry would just replay the same malformed output.
+    With an enabled `hedging` policy, slow requests are duplicated (to
+    `hedge_model` when given) and the first response that parses wins.
+    """
+
+    def __init__(self, model, model_name: str, rate_limiter: RateLimiter,
+                 cache: Optional[ResponseCache] = None, concurrency: Optional[AdaptiveConcurrency] = None,
+                 hedging: Optional[HedgePolicy] = None, hedge_model=None):
+        self.model = model
+        self.model_name = model_name
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        # Optional AIMD slot held for the duration of each request
+        self.concurrency = concurrency
+        self.hedging = hedging
+        self.hedge_model = hedge_model
+
+    def _lookup(self, key: Optional[str], parse: Optional[Callable[[str], Any]]):
+        if key is None:
+            return None
+        text = self.cache.get(key)
+        if text is None:
+            return None
+        metrics.CACHE_HITS.inc(model=self.model_name)
+        return (parse(text) if parse else text,)
+
+    def _parse(self, text: str, parse: Optional[Callable[[str], Any]]):
+        if parse is None:
+            return text
+        try:
+            with tracing.span("parse"):
+                return parse(text)
+        except Exception:
+            metrics.JSON_PARSE_FAILURES.inc(model=self.model_name)
+            raise
+
+    def _store(self, key: Optional[str], text: str, parse: Optional[Callable[[str], Any]]):
+        result = self._parse(text, parse)
+        if key is not None:
+            self.cache.put(key, text)
+        return result
+
+    def _store_hedged(self, key: Optional[str], text: str, result, model):
+        # Cache keys name the primary model, so answers from a different hedge model are not stored
+        if key is not None and model is self.model:
+            self.cache.put(key, text)
+        return result
+
+    def _before_call(self, tokens: int, waited: Optional[float]):
+        metrics.RATE_LIMIT_WAIT.observe(waited or 0.0, model=self.model_name)
+        metrics.LLM_CALLS.inc(model=self.model_name)
+        metrics.LLM_TOKENS.inc(tokens, model=self.model_name, direction="in")
+        _record_call()
+
+    def _after_call(self, response) -> str:
+        text = response.text
+        metrics.LLM_TOKENS.inc(RateLimiter.estimate_tokens(text), model=self.model_name, direction="out")
+        return text
+
+    @contextmanager
+    def _timed_call(self):
+        try:
+            with metrics.LLM_CALL_SECONDS.time(model=self.model_name), tracing.span("request", model=self.model_name):
+                yield
+        except Exception as e:
+            metrics.LLM_ERRORS.inc(model=self.model_name, error=type(e).__name__)
+            raise
+
+    def _cache_key(self, prompt: str, generation_config: Optional[dict]) -> Optional[str]:
+        if self.cache is None or not self.cache.enabled:
+            return None
+        return self.cache.key(self.model_name, prompt, generation_config)
+
+    def _hedging_enabled(self) -> bool:
+        return self.hedging is not None and self.hedging.enabled
+
+    @staticmethod
+    def _route(model, tokens: int) -> dict:
+        # Wait for a pooled API key up front, so that wait never counts as
+        # request latency (AIMD signal, call histogram, hedge delay)
+        reserve = getattr(model, "reserve_key", None)
+        key = reserve(tokens) if reserve else None
+        return {"api_key": key} if key is not None else {}
+
+    @staticmethod
+    async def _route_async(model, tokens: int) -> dict:
+        reserve = getattr(model, "reserve_key_async", None)
+        key = await reserve(tokens) if reserve else None
+        return {"api_key": key} if key is not None else {}
+
+    def _request(self, model, prompt: str, generation_config: Optional[dict], tokens: int,
+                 waited: Optional[float], route: dict) -> str:
+        self._before_call(tokens, waited)
+        slot = self.concurrency.slot() if self.concurrency else nullcontext()
+        with slot, self._timed_call():
+            response = model.generate_content(prompt, generation_config=generation_config, **route)
+        return self._after_call(response)
+
+    async def _request_async(self, model, prompt: str, generation_config: Optional[dict], tokens: int,
+                             waited: Optional[float], route: dict) -> str:
+        self._before_call(tokens, waited)
+        slot = self.concurrency.slot_async() if self.concurrency else nullcontext()
+        async with slot:
+            with self._timed_call():
+                response = await model.generate_content_async(prompt, generation_config=generation_config, **route)
+        return self._after_call(response)
+
+    def generate(self, prompt: str, generation_config: Optional[dict] = None,
+                 parse: Optional[Callable[[str], Any]] = None):
+        """Return the (optionally parsed) response text for prompt"""
+        key = self._cache_key(prompt, generation_config)
+        cached = self._lookup(key, parse)
+        if cached is not None:
+            return cached[0]
+
+        tokens = RateLimiter.estimate_tokens(prompt)
+        with tracing.span("rate_limit_wait"):
+            waited = self.rate_limiter.acquire(tokens)
+            route = self._route(self.model, tokens)
+        if not self._hedging_enabled():
+            text = self._request(self.model, prompt, generation_config, tokens, waited, route)
+            return self._store(key, text, parse)
+
+        def _primary():
+            text = self._request(self.model, prompt, generation_config, tokens, waited, route)
+            return text, self._parse(text, parse), self.model
+
+        def _hedge():
+            model = self.hedge_model or self.model
+            with tracing.span("hedge"):
+                with tracing.span("rate_limit_wait"):
+                    hedge_waited = self.rate_limiter.acquire(tokens)
+                    hedge_route = self._route(model, tokens)
+                text = self._request(model, prompt, generation_config, tokens, hedge_waited, hedge_route)
+                return text, self._parse(text, parse), model
+
+        text, result, model = self.hedging.call(_primary, _hedge, self.model_name)
+        return self._store_hedged(key, text, result, model)
+
+    async def generate_async(self, prompt: str, generation_config: Optional[dict] = None,
+                             parse: Optional[Callable[[str], Any]] = None):
+        """Async version of generate"""
+        key = self._cache_key(prompt, generation_config)
+        cached = self._lookup(key, parse)
+        if cached is not None:
+            return cached[0]
+
+        tokens = RateLimiter.estimate_tokens(prompt)
+        with tracing.span("rate_limit_wait"):
+            waited = await self.rate_limiter.acquire_async(tokens)
+            route = await self._route_async(self.model, tokens)
+        if not self._hedging_enabled():
+            text = await self._request_async(self.model, prompt, generation_config, tokens, waited, route)
+            return self._store(key, text, parse)
+
+        async def _primary():
+            text = await self._request_async(self.model, prompt, generation_config, tokens, waited, route)
+            return text, self._parse(text, parse), self.model
+
+        async def _hedge():
+            model = self.hedge_model or self.model
+            with tracing.span("hedge"):
+                with tracing.span("rate_limit_wait"):
+                    hedge_waited = await self.rate_limiter.acquire_async(tokens)
+                    hedge_route = await self._route_async(model, tokens)
+                text = await self._request_async(model, prompt, generation_config, tokens, hedge_waited,
+                                                 hedge_route)
+                return text, self._parse(text, parse), model
+
+        text, result, model = await self.hedging.call_async(_primary, _hedge, self.model_name)
+        return self._store_hedged(key, text, result, model)
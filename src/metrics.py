@@ -0,0 +1,215 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Seconds; spans cache-speed calls through rate-limit waits and slow retries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together in the OpenMetrics text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Every metric in OpenMetrics text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Write render() to path atomically (for textfile collectors)"""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics from a daemon thread; call shutdown() on the result to stop it"""
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def reset(self):
+        """Zero every metric (keeps registrations)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 registry: Optional[MetricsRegistry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def _header(self) -> List[str]:
+        return [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.documentation}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total per label combination (exposed as <name>_total)"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Observation counts per upper bound, plus count and sum, per label combination"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, registry: Optional[MetricsRegistry] = REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock seconds spent in the block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels) -> Tuple[int, float]:
+        """(observation count, sum) for one label combination"""
+        with self._lock:
+            counts, total = self._values.get(self._key(labels), ([0], 0.0))
+            return sum(counts), total
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        return lines
+
+
+# LLM calls (recorded by LLMClient)
+LLM_CALLS = Counter("autoprompt_llm_calls", "Model requests sent (cache hits excluded)", ["model"])
+LLM_CALL_SECONDS = Histogram("autoprompt_llm_call_seconds", "Latency of model requests", ["model"])
+LLM_ERRORS = Counter("autoprompt_llm_errors", "Model requests that raised, by exception type", ["model", "error"])
+LLM_TOKENS = Counter("autoprompt_llm_tokens", "Estimated tokens sent (in) and received (out)", ["model", "direction"])
+CACHE_HITS = Counter("autoprompt_llm_cache_hits", "Calls answered from the response cache", ["model"])
+RATE_LIMIT_WAIT = Histogram("autoprompt_rate_limit_wait_seconds", "Time spent waiting on the rate limiter", ["model"])
+HEDGES = Counter("autoprompt_llm_hedges", "Duplicate requests sent for slow calls", ["model"])
+HEDGE_WINS = Counter("autoprompt_llm_hedge_wins", "Hedged calls answered by the duplicate first", ["model"])
+JSON_PARSE_FAILURES = Counter("autoprompt_json_parse_failures", "Responses that could not be parsed", ["model"])
+
+# Pipeline stages
+RETRIES = Counter("autoprompt_retries", "Model calls retried after an error", ["pipeline"])
+RETRY_BACKOFF = Histogram("autoprompt_retry_backoff_seconds", "Backoff sleeps before retries", ["pipeline"])
+EARLY_STOPS = Counter("autoprompt_early_stops", "Variant searches stopped at the early-stop threshold", ["mode"])
+REVIEW_SECONDS = Histogram("autoprompt_review_seconds", "End-to-end time per review", ["pipeline"])
+
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+def key_limits(config: dict) -> List[dict]:
+    """Limits for each configured API key: `rate_limits` merged with that key's `key_pool.limits` entry"""
+    base = config.get("rate_limits", {})
+    overrides = config.get("key_pool", {}).get("limits") or []
+    keys = config.get("api_keys") or [config.get("api_key")]
+    return [dict(base, **(overrides[i] if i < len(overrides) else {})) for i in range(len(keys))]
+
+
+class RateLimiter:
+    """Token-bucket limiter enforcing requests-per-minute and tokens-per-minute quotas.
+
+    One instance is meant to be shared by every model handle and pipeline that
+    draws on the same API quota. Callers reserve capacity up front, so concurrent
+    callers queue in arrival order instead of racing for the next free slot.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_capacity = float(max(1, burst))
+        self._token_capacity = float(tokens_per_minute) if tokens_per_minute else 0.0
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._clock = clock
+        self._last_refill = clock()
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    @classmethod
+    def from_limits(cls, limits: dict) -> "RateLimiter":
+        """Build a limiter from one `rate_limits`-style mapping"""
+        return cls(
+            requests_per_minute=limits.get("requests_per_minute", 10),
+            tokens_per_minute=limits.get("tokens_per_minute"),
+            burst=limits.get("burst", 1),
+        )
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        """Build a limiter from the `rate_limits` section, covering the combined quota of every API key"""
+        per_key = key_limits(config)
+        if len(per_key) == 1:
+            return cls.from_limits(per_key[0])
+        token_limits = [limits.get("tokens_per_minute") for limits in per_key]
+        return cls(
+            requests_per_minute=sum(limits.get("requests_per_minute", 10) for limits in per_key),
+            tokens_per_minute=sum(token_limits) if all(token_limits) else None,
+            burst=sum(limits.get("burst", 1) for limits in per_key),
+        )
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token estimate (~4 characters per token)"""
+        return len(text) // 4 + 1
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._requests = min(self._request_capacity,
+                             self._requests + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._tokens = min(self._token_capacity,
+                               self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def _reserve(self, tokens: int) -> float:
+        """Debit one request and `tokens` tokens, returning the seconds to wait"""
+        with self._lock:
+            self._refill(self._clock())
+            self._requests -= 1
+            wait = max(0.0, -self._requests * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+                wait = max(wait, -self._tokens * 60.0 / self.tokens_per_minute)
+            self.total_wait += wait
+            return wait
+
+    def _refund(self, tokens: int):
+        """Return an unused reservation (e.g. when the waiting caller was cancelled)"""
+        with self._lock:
+            self._requests += 1
+            if self.tokens_per_minute:
+                self._tokens += tokens
+
+    def headroom(self) -> float:
+        """Fraction of the request bucket currently available (can be negative when queued)"""
+        with self._lock:
+            self._refill(self._clock())
+            return self._requests / self._request_capacity
+
+    def wait_estimate(self, tokens: int = 0) -> float:
+        """Seconds a request of `tokens` tokens would wait if reserved now"""
+        with self._lock:
+            self._refill(self._clock())
+            wait = max(0.0, (1 - self._requests) * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                wait = max(wait, (tokens - self._tokens) * 60.0 / self.tokens_per_minute)
+            return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request of `tokens` tokens fits the quota"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Async version of acquire"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(tokens)
+                raise
+        return wait
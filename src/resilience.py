@@ -0,0 +1,269 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from loguru import logger
+
+from src import metrics, tracing
+from src.lazy import lazy_import
+
+# Only needed once a request fails
+google_exceptions = lazy_import("google.api_core.exceptions")
+
+T = TypeVar("T")
+
+QUOTA = "quota"
+UNAVAILABLE = "unavailable"
+TIMEOUT = "timeout"
+NETWORK = "network"
+OTHER = "other"
+CANCELLED = "cancelled"
+
+# Signs the backend is overloaded or unreachable: shrink concurrency and retry
+CONGESTION = (QUOTA, UNAVAILABLE, TIMEOUT, NETWORK)
+
+_STATUS_KINDS = {429: QUOTA, 500: UNAVAILABLE, 502: UNAVAILABLE, 503: UNAVAILABLE, 504: TIMEOUT}
+
+
+def classify(error: BaseException) -> str:
+    """Error kind by exception type (or HTTP status code): quota, unavailable, timeout, network or other"""
+    if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+        return QUOTA
+    if isinstance(error, (google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError,
+                          google_exceptions.BadGateway)):
+        return UNAVAILABLE
+    if isinstance(error, (google_exceptions.DeadlineExceeded, google_exceptions.GatewayTimeout,
+                          TimeoutError, asyncio.TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, ConnectionError):
+        return NETWORK
+    code = getattr(error, "code", None)
+    return _STATUS_KINDS.get(code, OTHER) if isinstance(code, int) else OTHER
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight model requests, with a circuit breaker and a retry policy.
+
+    Every request holds a slot. Each success grows the limit by about one
+    slot per round of `limit` requests (additive increase). A congestion error
+    (429, 503, timeout, connection failure) multiplies it by `backoff_factor`,
+    at most once per round: requests that started before the last cut do not
+    cut again. After `failure_threshold` consecutive congestion errors the
+    breaker opens and no request starts for `open_seconds`. Then a single
+    probe runs (half-open): success closes the breaker, failure reopens it.
+    Other errors (bad requests, for instance) leave the limit alone.
+    """
+
+    def __init__(self, initial_limit: float = 4, min_limit: int = 1, max_limit: int = 64,
+                 backoff_factor: float = 0.5, failure_threshold: int = 5, open_seconds: float = 30,
+                 max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 enabled: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff_factor = backoff_factor
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.enabled = enabled
+        self.clock = clock
+        self.state = "closed"
+        self.in_flight = 0
+        self.trips = 0
+        self.decreases = 0
+        self.errors: Dict[str, int] = {}
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters = []
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptiveConcurrency":
+        """Build from the `resilience` config section"""
+        settings = config.get("resilience", {})
+        return cls(
+            initial_limit=settings.get("initial_limit", 4),
+            min_limit=settings.get("min_limit", 1),
+            max_limit=settings.get("max_limit", 64),
+            backoff_factor=settings.get("backoff_factor", 0.5),
+            failure_threshold=settings.get("failure_threshold", 5),
+            open_seconds=settings.get("open_seconds", 30),
+            max_attempts=settings.get("max_attempts", 3),
+            base_delay=settings.get("base_delay", 1.0),
+            max_delay=settings.get("max_delay", 30.0),
+            enabled=settings.get("enabled", True),
+        )
+
+    def _try_enter(self):
+        """(True, start time) when a slot was taken, else (False, seconds until the breaker half-opens or None)"""
+        now = self.clock()
+        if self.state == "open":
+            remaining = self._opened_at + self.open_seconds - now
+            if remaining > 0:
+                return False, remaining
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self.in_flight:
+                return False, None
+        elif self.in_flight >= int(self.limit):
+            return False, None
+        self.in_flight += 1
+        return True, now
+
+    def _exit(self, started: float, kind: Optional[str]):
+        with self._lock:
+            self.in_flight -= 1
+            if kind is None:
+                self._consecutive_failures = 0
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                if self.state == "half_open":
+                    self._close()
+            elif kind in CONGESTION:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+                self._consecutive_failures += 1
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                    self._last_decrease = self.clock()
+                    self.decreases += 1
+                if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                    self._open(kind)
+            elif kind != CANCELLED and self.state == "half_open":
+                # The backend answered (just not usefully): it is reachable again
+                self._close()
+            self._wake()
+
+    def _open(self, kind: str):
+        if self.state != "open":
+            self.trips += 1
+            logger.warning(f"Circuit breaker open for {self.open_seconds:.0f}s after "
+                           f"{self._consecutive_failures} consecutive {kind} errors")
+        self.state = "open"
+        self._opened_at = self.clock()
+
+    def _close(self):
+        self.state = "closed"
+        logger.info(f"Circuit breaker closed (limit {self.limit:.1f})")
+
+    def _wake(self):
+        # Waiters re-check for themselves, so waking all of them is always safe
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def _acquire(self) -> float:
+        with self._cond:
+            while True:
+                entered, value = self._try_enter()
+                if entered:
+                    return value
+                self._cond.wait(timeout=value)
+
+    async def _acquire_async(self) -> float:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                entered, value = self._try_enter()
+                if entered:
+                    return value
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, value)
+            except asyncio.TimeoutError:
+                pass
+
+    def _release_on(self, started: float, error: Optional[BaseException]):
+        if error is None:
+            self._exit(started, None)
+        elif isinstance(error, Exception):
+            self._exit(started, classify(error))
+        else:
+            # Cancelled (e.g. a hedged request that lost): says nothing about the backend
+            self._exit(started, CANCELLED)
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot for the block, recording how it ended"""
+        if not self.enabled:
+            yield
+            return
+        with tracing.span("concurrency_wait"):
+            started = self._acquire()
+        try:
+            yield
+        except BaseException as e:
+            self._release_on(started, e)
+            raise
+        self._release_on(started, None)
+
+    @asynccontextmanager
+    async def slot_async(self):
+        """Async version of slot"""
+        if not self.enabled:
+            yield
+            return
+        with tracing.span("concurrency_wait"):
+            started = await self._acquire_async()
+        try:
+            yield
+        except BaseException as e:
+            self._release_on(started, e)
+            raise
+        self._release_on(started, None)
+
+    def retry_delay(self, kind: str, attempt: int) -> float:
+        """Backoff before retry number `attempt`: exponential with jitter, longer for quota errors"""
+        delay = min(self.max_delay, self.base_delay * (4 if kind == QUOTA else 1) * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _should_retry(self, error: Exception, attempt: int, pipeline: str) -> Optional[float]:
+        kind = classify(error)
+        if kind not in CONGESTION or attempt >= self.max_attempts:
+            return None
+        delay = self.retry_delay(kind, attempt)
+        logger.warning(f"{pipeline}: {kind} error ({error}), retrying in {delay:.1f}s "
+                       f"(attempt {attempt}/{self.max_attempts})")
+        metrics.RETRIES.inc(pipeline=pipeline)
+        metrics.RETRY_BACKOFF.observe(delay, pipeline=pipeline)
+        return delay
+
+    def run(self, fn: Callable[[], T], pipeline: str) -> T:
+        """Call fn, retrying congestion errors up to max_attempts with backoff (other errors raise at once)"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._should_retry(e, attempt, pipeline)
+                if delay is None:
+                    raise
+                tracing.sleep(delay)
+
+    async def run_async(self, fn: Callable[[], Awaitable[T]], pipeline: str) -> T:
+        """Async version of run"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._should_retry(e, attempt, pipeline)
+                if delay is None:
+                    raise
+                await tracing.sleep_async(delay)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "state": self.state,
+                "trips": self.trips,
+                "decreases": self.decreases,
+                "errors": dict(self.errors),
+            }
@@ -0,0 +1,219 @@
+"""
+Config-defined heuristic scoring of extractions.
+
+Rules are declared under `scoring_rules` in prompt_config.yaml and compiled
+once. Each rule adds its weight when it passes; the total is capped at 1.0.
+A single extraction is scored with plain Python; batches are scored with
+pandas/NumPy column operations over the whole batch.
+
+Rule types:
+- required: every field in `fields` is present (and not null)
+- one_of:   `field` is one of `values` (case-insensitive unless case_sensitive)
+- length:   len(`field`) is within [`min`, `max`] (either bound optional)
+- regex:    `field` matches `pattern` somewhere (re.search)
+"""
+import math
+import re
+from typing import Iterable, List, Union
+
+from src.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# The original hand-written heuristic, used when the config declares no rules
+DEFAULT_RULES = [
+    {"name": "required_fields", "type": "required", "fields": ["product", "sentiment", "reason"], "weight": 0.4},
+    {"name": "valid_sentiment", "type": "one_of", "field": "sentiment",
+     "values": ["positive", "negative", "neutral", "mixed"], "weight": 0.3},
+    {"name": "product_length", "type": "length", "field": "product", "min": 3, "max": 49, "weight": 0.2},
+    {"name": "specific_reason", "type": "length", "field": "reason", "min": 11, "weight": 0.1},
+]
+
+
+def _missing(value) -> bool:
+    # NaN is how pandas records a missing field
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _text(value) -> str:
+    return "" if _missing(value) else str(value)
+
+
+class _Columns:
+    """Per-batch cache of each field's factorized and text forms.
+
+    Extraction fields usually repeat a small set of values, so a rule is
+    checked once per distinct value and broadcast through the factorize
+    codes. Mostly-unique fields fall back to vectorized string operations.
+    """
+
+    def __init__(self, frame: "pd.DataFrame"):
+        self.frame = frame
+        self._factorized = {}
+        self._text = {}
+
+    def factorize(self, field: str):
+        """(codes, distinct values) with -1 for missing, or None when most values are distinct"""
+        if field not in self._factorized:
+            if field not in self.frame:
+                factorized = (np.full(len(self.frame), -1), [])
+            else:
+                try:
+                    codes, uniques = pd.factorize(self.frame[field])
+                    factorized = (codes, uniques) if len(uniques) <= len(self.frame) // 2 else None
+                except TypeError:
+                    # Unhashable values (lists, dicts)
+                    factorized = None
+            self._factorized[field] = factorized
+        return self._factorized[field]
+
+    def text(self, field: str) -> "pd.Series":
+        """The field as strings, with missing values as empty strings"""
+        if field not in self._text:
+            if field not in self.frame:
+                self._text[field] = pd.Series("", index=self.frame.index)
+            else:
+                column = self.frame[field]
+                self._text[field] = column.where(column.notna(), "").astype(str)
+        return self._text[field]
+
+
+class _Rule:
+    def __init__(self, spec: dict):
+        self.name = spec.get("name", spec["type"])
+        self.weight = float(spec.get("weight", 0.0))
+
+    def check(self, extraction: dict) -> bool:
+        raise NotImplementedError
+
+    def check_frame(self, columns: _Columns) -> "np.ndarray":
+        raise NotImplementedError
+
+
+class _Required(_Rule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.fields = list(spec["fields"])
+
+    def check(self, extraction: dict) -> bool:
+        return all(not _missing(extraction.get(field)) for field in self.fields)
+
+    def check_frame(self, columns: _Columns) -> "np.ndarray":
+        passed = np.ones(len(columns.frame), dtype=bool)
+        for field in self.fields:
+            factorized = columns.factorize(field)
+            if factorized is not None:
+                passed &= factorized[0] >= 0
+            else:
+                passed &= columns.frame[field].notna().to_numpy()
+        return passed
+
+
+class _FieldRule(_Rule):
+    """A rule on one field: check_value for single values, check_text for string columns"""
+
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.field = spec["field"]
+
+    def check_value(self, value) -> bool:
+        raise NotImplementedError
+
+    def check_text(self, column: "pd.Series") -> "np.ndarray":
+        raise NotImplementedError
+
+    def check(self, extraction: dict) -> bool:
+        return self.check_value(extraction.get(self.field))
+
+    def check_frame(self, columns: _Columns) -> "np.ndarray":
+        factorized = columns.factorize(self.field)
+        if factorized is None:
+            return self.check_text(columns.text(self.field))
+        codes, uniques = factorized
+        # Code -1 (missing) picks the trailing entry
+        lookup = np.array([self.check_value(value) for value in uniques] + [self.check_value(None)], dtype=bool)
+        return lookup[codes]
+
+
+class _OneOf(_FieldRule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.case_sensitive = spec.get("case_sensitive", False)
+        self.values = {_text(v) if self.case_sensitive else _text(v).lower() for v in spec["values"]}
+
+    def check_value(self, value) -> bool:
+        value = _text(value)
+        return (value if self.case_sensitive else value.lower()) in self.values
+
+    def check_text(self, column: "pd.Series") -> "np.ndarray":
+        if not self.case_sensitive:
+            column = column.str.lower()
+        return column.isin(self.values).to_numpy()
+
+
+class _Length(_FieldRule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.min = spec.get("min", 0)
+        self.max = spec.get("max")
+
+    def check_value(self, value) -> bool:
+        length = len(_text(value))
+        return length >= self.min and (self.max is None or length <= self.max)
+
+    def check_text(self, column: "pd.Series") -> "np.ndarray":
+        lengths = column.str.len().to_numpy()
+        passed = lengths >= self.min
+        if self.max is not None:
+            passed &= lengths <= self.max
+        return passed
+
+
+class _Regex(_FieldRule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.pattern = re.compile(spec["pattern"], 0 if spec.get("case_sensitive", False) else re.IGNORECASE)
+
+    def check_value(self, value) -> bool:
+        return self.pattern.search(_text(value)) is not None
+
+    def check_text(self, column: "pd.Series") -> "np.ndarray":
+        return column.str.contains(self.pattern, regex=True).to_numpy(dtype=bool)
+
+
+_RULE_TYPES = {"required": _Required, "one_of": _OneOf, "length": _Length, "regex": _Regex}
+
+
+class HeuristicScorer:
+    """Weighted rule set compiled from config, scoring one extraction or a whole batch"""
+
+    def __init__(self, rules: List[dict]):
+        self.rules = []
+        for spec in rules:
+            rule_cls = _RULE_TYPES.get(spec.get("type"))
+            if rule_cls is None:
+                raise ValueError(f"Unknown scoring rule type: {spec.get('type')!r}")
+            self.rules.append(rule_cls(spec))
+
+    @classmethod
+    def from_config(cls, config: dict) -> "HeuristicScorer":
+        """Compile the `scoring_rules` list (the original four rules when absent)"""
+        return cls(config.get("scoring_rules") or DEFAULT_RULES)
+
+    def score(self, extraction: dict) -> float:
+        """Score one extraction (0-1)"""
+        return min(sum(rule.weight for rule in self.rules if rule.check(extraction)), 1.0)
+
+    def score_batch(self, extractions: Union[Iterable[dict], "pd.DataFrame"]) -> "np.ndarray":
+        """Score many extractions at once; accepts dicts or a DataFrame with one column per field"""
+        frame = extractions if isinstance(extractions, pd.DataFrame) else pd.DataFrame.from_records(list(extractions))
+        columns = _Columns(frame)
+        scores = np.zeros(len(frame))
+        for rule in self.rules:
+            scores += rule.weight * rule.check_frame(columns)
+        return np.minimum(scores, 1.0)
+
+    def explain(self, extraction: dict) -> dict:
+        """Which rules an extraction passed, by rule name"""
+        return {rule.name: rule.check(extraction) for rule in self.rules}
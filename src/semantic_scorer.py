@@ -0,0 +1,218 @@
+import asyncio
+import contextvars
+import json
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from src.json_extract import extract_json_array
+from src.llm import LLMClient
+from src.utils import ExtractedData
+
+# (review text, extraction) pairs to be judged
+Pair = Tuple[str, dict]
+
+
+def build_scoring_prompt(pairs: List[Pair]) -> str:
+    """One scorer request judging several extractions, answered as a JSON array keyed by id"""
+    items = json.dumps(
+        [{"id": i, "review": review_text, "extraction": extraction}
+         for i, (review_text, extraction) in enumerate(pairs)],
+        ensure_ascii=False
+    )
+    return f"""
+For each item below, judge whether the extraction correctly identifies:
+1. The main product/service
+2. The sentiment
+3. A specific reason
+Score each item 0-3, one point per correct aspect.
+Respond ONLY with a JSON array containing one object per item: [{{"id": 0, "score": 0}}]
+Items: {items}
+"""
+
+
+def parse_scores(text: str, count: int) -> List[Optional[float]]:
+    """Scores normalised to 0-1 by item position (None where the response has no usable score)"""
+    scores: List[Optional[float]] = [None] * count
+    for item in extract_json_array(text):
+        if not isinstance(item, dict):
+            continue
+        try:
+            i, score = int(item["id"]), float(item["score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < count:
+            scores[i] = min(max(score, 0.0), 3.0) / 3.0
+    return scores
+
+
+class SemanticScorer:
+    """LLM judge that scores many extractions per request.
+
+    Two modes:
+    - "inline": concurrent score_async() calls are coalesced into one request
+      (flushed at batch_size items or after max_wait_ms), so variant selection
+      still sees the blended score.
+    - "deferred": the heuristic score picks the variant; defer() queues the
+      result, and full batches are scored in the background, refining each
+      result's confidence in place. Refined results are also collected for
+      drain_refined() so streamed output can be rewritten.
+
+    Scorer requests run outside the per-review call counters; `requests` and
+    `items_scored` track their cost instead.
+    """
+
+    def __init__(self, client: LLMClient, mode: str = "deferred", batch_size: int = 20,
+                 max_wait_ms: float = 50, weight: float = 0.2):
+        if mode not in ("inline", "deferred"):
+            raise ValueError(f"Unknown semantic scoring mode: {mode}")
+        self.client = client
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.weight = weight
+        self.requests = 0
+        self.items_scored = 0
+        self._waiting = []
+        self._timer = None
+        self._deferred: List[Tuple[ExtractedData, str, dict]] = []
+        self._refined: List[ExtractedData] = []
+        self._tasks = set()
+
+    @classmethod
+    def from_config(cls, config: dict, client: LLMClient) -> "SemanticScorer":
+        """Build from the `semantic_scoring` config section"""
+        settings = config.get("semantic_scoring", {})
+        return cls(
+            client,
+            mode=settings.get("mode", "deferred"),
+            batch_size=settings.get("batch_size", 20),
+            max_wait_ms=settings.get("max_wait_ms", 50),
+            weight=settings.get("weight", 0.2),
+        )
+
+    def blend(self, heuristic: float, llm_score: Optional[float]) -> float:
+        """Mix the heuristic and LLM scores (the heuristic alone when the LLM gave none)"""
+        if llm_score is None:
+            return heuristic
+        return min(heuristic * (1 - self.weight) + llm_score * self.weight, 1.0)
+
+    def score_batch(self, pairs: List[Pair]) -> List[Optional[float]]:
+        """Score pairs with one request per batch_size items"""
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            chunk = pairs[start:start + self.batch_size]
+            self.requests += 1
+            self.items_scored += len(chunk)
+            scores.extend(self.client.generate(
+                build_scoring_prompt(chunk),
+                generation_config={"temperature": 0},
+                parse=lambda text, n=len(chunk): parse_scores(text, n)
+            ))
+        return scores
+
+    async def score_batch_async(self, pairs: List[Pair]) -> List[Optional[float]]:
+        """Async version of score_batch (chunks are scored concurrently)"""
+        chunks = [pairs[start:start + self.batch_size] for start in range(0, len(pairs), self.batch_size)]
+        self.requests += len(chunks)
+        self.items_scored += len(pairs)
+        results = await asyncio.gather(*(
+            self.client.generate_async(
+                build_scoring_prompt(chunk),
+                generation_config={"temperature": 0},
+                parse=lambda text, n=len(chunk): parse_scores(text, n)
+            )
+            for chunk in chunks
+        ))
+        return [score for chunk_scores in results for score in chunk_scores]
+
+    def _spawn(self, coro):
+        # A fresh context keeps shared scorer requests out of whichever review's counter is active
+        # (create_task copies the current context; its context= argument needs Python 3.11)
+        task = contextvars.Context().run(asyncio.get_running_loop().create_task, coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def score_async(self, review_text: str, extraction: dict) -> Optional[float]:
+        """LLM score for one pair, batched with other concurrent callers"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((review_text, extraction, future))
+        if len(self._waiting) >= self.batch_size:
+            self._flush_waiting()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush_waiting)
+        return await future
+
+    def _flush_waiting(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._waiting = self._waiting, []
+        if items:
+            self._spawn(self._resolve(items))
+
+    async def _resolve(self, items):
+        try:
+            scores = await self.score_batch_async([(text, extraction) for text, extraction, _ in items])
+        except Exception as e:
+            logger.warning(f"Semantic scoring of {len(items)} items failed: {e}")
+            scores = [None] * len(items)
+        for (_, _, future), score in zip(items, scores):
+            if not future.done():
+                future.set_result(score)
+
+    def defer(self, result: ExtractedData, review_text: str, extraction: dict):
+        """Queue a finished result for background confidence refinement"""
+        self._deferred.append((result, review_text, extraction))
+        if len(self._deferred) < self.batch_size:
+            return
+        batch, self._deferred = self._deferred, []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Synchronous caller: refine the full batch now
+            self._apply(batch, self._safe_score(batch))
+            return
+        self._spawn(self._refine_async(batch))
+
+    def _safe_score(self, batch) -> List[Optional[float]]:
+        try:
+            return self.score_batch([(text, extraction) for _, text, extraction in batch])
+        except Exception as e:
+            logger.warning(f"Semantic scoring of {len(batch)} results failed: {e}")
+            return [None] * len(batch)
+
+    async def _refine_async(self, batch):
+        try:
+            scores = await self.score_batch_async([(text, extraction) for _, text, extraction in batch])
+        except Exception as e:
+            logger.warning(f"Semantic scoring of {len(batch)} results failed: {e}")
+            return
+        self._apply(batch, scores)
+
+    def _apply(self, batch, scores: List[Optional[float]]):
+        for (result, _, _), score in zip(batch, scores):
+            if score is not None:
+                result.confidence = self.blend(result.confidence, score)
+                self._refined.append(result)
+
+    async def finish_async(self):
+        """Score everything still queued and wait for background refinements"""
+        self._flush_waiting()
+        batch, self._deferred = self._deferred, []
+        if batch:
+            await self._refine_async(batch)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def finish(self):
+        """Synchronous finish_async for callers without an event loop"""
+        batch, self._deferred = self._deferred, []
+        if batch:
+            self._apply(batch, self._safe_score(batch))
+
+    def drain_refined(self) -> List[ExtractedData]:
+        """Results whose confidence changed since the last drain"""
+        refined, self._refined = self._refined, []
+        return refined
@@ -0,0 +1,275 @@
+"""
+Local HTTP extraction service.
+
+POST /extract runs one review through AutoPrompt or the baseline. Concurrent
+requests are micro-batched: each pipeline's MicroBatcher collects reviews for
+up to `max_wait_ms` or `max_items` and sends them as one batched LLM call.
+
+Run with: python -m src.service [--host 127.0.0.1] [--port 8000]
+(needs the optional fastapi and uvicorn packages)
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.autoprompt import AutoPromptEngine
+from src.baseline import BaselinePipeline
+from src.batching import pack_batches
+from src.cache import ResponseCache
+from src.client_pool import ClientProvider
+from src.dedup import DedupIndex
+from src.rate_limiter import RateLimiter
+from src.resilience import AdaptiveConcurrency
+from src.utils import Review, ExtractedData
+
+
+class Overloaded(Exception):
+    """The service already holds as many requests as it accepts (reject, retry later)"""
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-review requests into batched pipeline calls.
+
+    The first waiting review opens a window; the batch is sent when it holds
+    `max_items` reviews (or `max_tokens` of review text) or `max_wait_ms` has
+    passed, whichever comes first. At most `max_concurrent_batches` batches run
+    at once. Backpressure: beyond `max_pending` queued or in-flight reviews,
+    submit() raises Overloaded instead of queueing without bound.
+    """
+
+    def __init__(self, handler: Callable[[List[Review]], Awaitable[List[ExtractedData]]],
+                 max_items: int = 10, max_tokens: int = 4000, max_wait_ms: float = 5,
+                 max_pending: int = 1000, max_concurrent_batches: int = 4):
+        self.handler = handler
+        self.max_items = max(1, max_items)
+        self.max_tokens = max_tokens
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._loop = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    def _start(self):
+        # The queue, semaphore and collector belong to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._collector.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._collector = loop.create_task(self._collect())
+            self._tasks = set()
+
+    async def submit(self, review: Review, timeout: Optional[float] = None) -> ExtractedData:
+        """Extract one review as part of the next batch (asyncio.TimeoutError after `timeout` seconds)"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(f"{self.pending} requests already pending")
+        self._start()
+        future = self._loop.create_future()
+        # A random internal id keeps callers' review_ids from colliding inside one batch, and keeps
+        # this run's ids apart from the dedup/journal entries of earlier runs (batch prompts number
+        # their items by position, so the id does not reach the prompt or its cache key)
+        internal = Review(review_id=f"req-{uuid.uuid4().hex}", review_text=review.review_text)
+        self.pending += 1
+        self._queue.put_nowait((internal, future))
+        try:
+            # On timeout wait_for cancels the future, so a still-queued review is never sent
+            result = await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending -= 1
+        return result.model_copy(update={"review_id": review.review_id})
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            window = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(window) < self.max_items:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    window.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Requests that timed out while queued are dropped before they cost a call
+            window = [(review, future) for review, future in window if not future.done()]
+            futures = {review.review_id: future for review, future in window}
+            for batch in pack_batches((review for review, _ in window), self.max_items, self.max_tokens):
+                await self._slots.acquire()
+                task = loop.create_task(self._run([(review, futures[review.review_id]) for review in batch]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await self.handler([review for review, _ in batch])
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Stop collecting and wait for batches already sent"""
+        if self._loop is asyncio.get_running_loop():
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            while self._tasks:
+                await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        self._collector = self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+class ExtractionService:
+    """Both pipelines behind per-pipeline micro-batchers, sharing limiter, cache, pool, dedup index
+    and adaptive concurrency limit"""
+
+    def __init__(self, config: dict, pipelines: Optional[Dict[str, object]] = None):
+        settings = config.get("service", {})
+        self.default_timeout = settings.get("timeout_ms", 30000) / 1000.0
+        if pipelines is None:
+            rate_limiter = RateLimiter.from_config(config)
+            cache = ResponseCache.from_config(config)
+            provider = ClientProvider.shared(config)
+            dedup = DedupIndex.from_config(config)
+            resilience = AdaptiveConcurrency.from_config(config)
+            pipelines = {
+                "autoprompt": AutoPromptEngine(config, rate_limiter=rate_limiter, cache=cache,
+                                               provider=provider, dedup=dedup, resilience=resilience),
+                "baseline": BaselinePipeline(config, rate_limiter=rate_limiter, cache=cache,
+                                             provider=provider, dedup=dedup, resilience=resilience),
+            }
+        self.pipelines = pipelines
+        self.batchers = {
+            name: MicroBatcher(
+                self._handler(pipeline),
+                max_items=settings.get("max_batch_items", 10),
+                max_tokens=settings.get("max_batch_tokens", 4000),
+                max_wait_ms=settings.get("max_wait_ms", 5),
+                max_pending=settings.get("max_pending", 1000),
+                max_concurrent_batches=settings.get("max_concurrent_batches", 4),
+            )
+            for name, pipeline in pipelines.items()
+        }
+
+    @staticmethod
+    def _handler(pipeline) -> Callable[[List[Review]], Awaitable[List[ExtractedData]]]:
+        async def handle(reviews: List[Review]) -> List[ExtractedData]:
+            results = await pipeline.process_batch_async(reviews)
+            # Responses go out with the confidence they have now; nothing reads later
+            # refinements, so they are dropped instead of accumulating
+            getattr(pipeline, "drain_refined", list)()
+            return results
+        return handle
+
+    async def extract(self, review: Review, pipeline: str = "autoprompt",
+                      timeout: Optional[float] = None) -> ExtractedData:
+        """Extract one review (KeyError for an unknown pipeline, Overloaded, asyncio.TimeoutError)"""
+        return await self.batchers[pipeline].submit(review, timeout or self.default_timeout)
+
+    async def close(self):
+        """Drain batchers, finish background scoring and persist learned prompt statistics"""
+        for batcher in self.batchers.values():
+            await batcher.close()
+        for pipeline in self.pipelines.values():
+            finish = getattr(pipeline, "finish_async", None)
+            if finish is not None:
+                await finish()
+            bandit = getattr(pipeline, "bandit", None)
+            if bandit is not None:
+                bandit.save()
+
+    def stats(self) -> dict:
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+
+class ExtractRequest(BaseModel):
+    review_text: str
+    review_id: str = "request"
+    pipeline: str = "autoprompt"
+    timeout_ms: Optional[float] = None
+
+
+def create_app(service: ExtractionService):
+    """FastAPI app exposing POST /extract and GET /health"""
+    try:
+        from fastapi import FastAPI, HTTPException
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("The HTTP service needs FastAPI: pip install fastapi uvicorn") from e
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await service.close()
+
+    app = FastAPI(title="AutoPrompt extraction service", lifespan=lifespan)
+
+    @app.post("/extract", response_model=ExtractedData)
+    async def extract(request: ExtractRequest):
+        if request.pipeline not in service.batchers:
+            raise HTTPException(404, f"Unknown pipeline: {request.pipeline}")
+        review = Review(review_id=request.review_id, review_text=request.review_text)
+        timeout = request.timeout_ms / 1000.0 if request.timeout_ms else None
+        start = time.perf_counter()
+        try:
+            return await service.extract(review, request.pipeline, timeout)
+        except Overloaded as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            raise HTTPException(504, f"Timed out after {time.perf_counter() - start:.1f}s")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "batchers": service.stats()}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve AutoPrompt extraction over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("The HTTP service needs uvicorn: pip install fastapi uvicorn") from e
+
+    from src.config_loader import load_secure_config
+    app = create_app(ExtractionService(load_secure_config()))
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+from src.batching import pack_batches
+from src.utils import Review, ExtractedData, JsonlResultWriter
+from loguru import logger
+from typing import Iterable, Iterator, List
+
+
+def _review_batches(pipeline, reviews: Iterable[Review]) -> Iterator[List[Review]]:
+    """Group the stream the way the pipeline's batching settings ask for"""
+    batching = getattr(pipeline, "batching", {})
+    if batching.get("enabled", False):
+        return pack_batches(reviews, batching.get("max_items", 10), batching.get("max_tokens", 4000))
+    return ([review] for review in reviews)
+
+
+async def stream_process(pipeline, reviews: Iterable[Review], writer: JsonlResultWriter,
+                         concurrency: int = 4, max_pending: int = 100) -> int:
+    """Run a pipeline over a review stream, writing each result as it completes.
+    
+    At most `max_pending` batches are buffered between the reader and the
+    workers, so memory stays flat however large the input is. Results are
+    written in completion order, not input order. Results a pipeline refines
+    later (see drain_refined) are written again; readers keep the latest
+    record per review_id. Returns the number of reviews processed.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+    workers_count = max(1, concurrency)
+    processed = 0
+    
+    def _write_refined():
+        for result in getattr(pipeline, "drain_refined", list)():
+            writer.write(result)
+    
+    async def _produce():
+        for batch in _review_batches(pipeline, reviews):
+            await queue.put(batch)
+        for _ in range(workers_count):
+            await queue.put(None)
+    
+    async def _consume():
+        nonlocal processed
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            results: List[ExtractedData] = await pipeline.process_batch_async(batch)
+            for result in results:
+                writer.write(result)
+            _write_refined()
+            processed += len(results)
+            if processed % 100 == 0:
+                logger.info(f"{processed} results written to {writer.output_path}")
+    
+    await asyncio.gather(_produce(), *(_consume() for _ in range(workers_count)))
+    finish = getattr(pipeline, "finish_async", None)
+    if finish is not None:
+        await finish()
+        _write_refined()
+    return processed
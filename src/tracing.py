@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    """One timed operation; spans opened inside it (including in spawned tasks) are its children"""
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attrs")
+
+    def __init__(self, name: str, trace_id: int, span_id: int, parent_id: Optional[int], attrs: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = 0.0
+        self.duration = 0.0
+        self.attrs = attrs
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """Records nested timing spans and writes them to a local file.
+
+    Spans nest through a context variable, so variants running as separate
+    tasks still hang off their review's span. Every top-level span (a review,
+    a batch) starts a trace shared by all spans under it. A path ending in
+    .json gets the Chrome trace-event format (chrome://tracing, Perfetto),
+    written on close() with one row per trace; any other path gets one JSON
+    object per line, streamed as each span finishes.
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.chrome = bool(path) and path.endswith(".json")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+        self._file = None
+        # Wall-clock anchor for perf_counter timestamps
+        self._origin_wall = time.time()
+        self._origin_perf = time.perf_counter()
+        if enabled and path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not self.chrome:
+                self._file = open(path, "w", encoding="utf-8")
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Tracer":
+        """Build from the `tracing` config section (disabled when absent)"""
+        settings = config.get("tracing", {})
+        return cls(
+            path=settings.get("path", "results/trace.jsonl"),
+            enabled=settings.get("enabled", False),
+        )
+
+    def _now(self) -> float:
+        return self._origin_wall + (time.perf_counter() - self._origin_perf)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the block as a child of the current span (a new trace at top level)"""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current_span.get()
+        span_id = next(self._ids)
+        span = Span(name, parent.trace_id if parent else span_id, span_id,
+                    parent.span_id if parent else None, attrs)
+        token = _current_span.set(span)
+        span.start = self._now()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = self._now() - span.start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(span.as_dict(), default=str) + "\n")
+                self._file.flush()
+            else:
+                self._spans.append(span)
+
+    def spans(self) -> List[dict]:
+        """Finished spans held in memory (Chrome format or no path), in completion order"""
+        with self._lock:
+            return [span.as_dict() for span in self._spans]
+
+    def chrome_trace(self) -> dict:
+        """Finished spans as Chrome trace events, one thread row per trace"""
+        with self._lock:
+            spans = list(self._spans)
+        rows: Dict[int, int] = {}
+        events = []
+        for span in sorted(spans, key=lambda s: s.start):
+            row = rows.setdefault(span.trace_id, len(rows) + 1)
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": (span.start - self._origin_wall) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 1,
+                "tid": row,
+                "args": {**span.attrs, "span_id": span.span_id, "parent_id": span.parent_id},
+            })
+            if span.parent_id is None:
+                label = " ".join(str(v) for v in span.attrs.values())
+                events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": row,
+                               "args": {"name": f"{span.name} {label}".strip()}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def close(self):
+        """Write the Chrome trace (if that is the format) and release the file"""
+        if self.enabled and self.chrome:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.chrome_trace(), f, default=str)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_tracer = Tracer(enabled=False)
+
+
+def set_tracer(tracer: Tracer):
+    """Install the process-wide tracer used by span()"""
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attrs):
+    """A span on the process-wide tracer (a no-op until set_tracer installs an enabled one)"""
+    return _tracer.span(name, **attrs)
+
+
+def sleep(seconds: float):
+    """time.sleep recorded as a span (retry backoff)"""
+    with span("sleep", seconds=round(seconds, 3)):
+        time.sleep(seconds)
+
+
+async def sleep_async(seconds: float):
+    """asyncio.sleep recorded as a span"""
+    with span("sleep", seconds=round(seconds, 3)):
+        await asyncio.sleep(seconds)
+
+
+def load_spans(path: str) -> List[dict]:
+    """Read spans back from a JSONL or Chrome trace file"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            spans = []
+            for event in json.load(f)["traceEvents"]:
+                if event.get("ph") != "X":
+                    continue
+                attrs = dict(event.get("args", {}))
+                spans.append({"name": event["name"], "trace_id": event["tid"],
+                              "span_id": attrs.pop("span_id", None), "parent_id": attrs.pop("parent_id", None),
+                              "start": event["ts"] / 1e6, "duration": event["dur"] / 1e6, "attrs": attrs})
+            return spans
+        return [json.loads(line) for line in f if line.strip()]
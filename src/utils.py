@@ -1,8 +1,11 @@
-import pandas as pd
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
+from src.lazy import lazy_import
+import json
 import os
 
+pd = lazy_import("pandas")
+
 class Review(BaseModel):
     review_id: str
     review_text: str
@@ -14,14 +17,68 @@ class ExtractedData(BaseModel):
     reason: str
     confidence: float = 0.0
     prompt_used: str = ""
+    # Model requests spent on this review (a batch request is split across its items)
+    llm_calls: float = 0.0
 
-def load_reviews(csv_path: str) -> pd.DataFrame:
+def load_reviews(csv_path: str) -> "pd.DataFrame":
     """Load reviews from CSV and force review_id to string"""
     # ✅ FIXED: Specify dtype to prevent integer conversion
     return pd.read_csv(csv_path, dtype={'review_id': str})
 
+def iter_reviews(path: str, chunksize: int = 10000) -> Iterator[Review]:
+    """Stream Review objects from a CSV or JSONL file without loading it whole"""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield Review(review_id=str(row["review_id"]), review_text=row["review_text"])
+        return
+    
+    for chunk in pd.read_csv(path, dtype={'review_id': str}, chunksize=chunksize,
+                             usecols=['review_id', 'review_text']):
+        for review_id, review_text in zip(chunk['review_id'], chunk['review_text']):
+            # Empty cells come back as NaN
+            yield Review(review_id=review_id,
+                         review_text=review_text if isinstance(review_text, str) else "")
+
 def save_results(results: list, output_path: str):
     """Save results to JSON"""
     df = pd.DataFrame([r.dict() for r in results])
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df.to_json(output_path, orient="records", indent=2)
\ No newline at end of file
+    df.to_json(output_path, orient="records", indent=2)
+
+class JsonlResultWriter:
+    """Append each ExtractedData to a JSONL file as soon as it is produced"""
+    
+    def __init__(self, output_path: str, append: bool = False, fsync: bool = False):
+        self.output_path = output_path
+        # fsync survives OS crashes too, at the cost of a disk sync per record
+        self.fsync = fsync
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        self._file = open(output_path, "a" if append else "w", encoding="utf-8")
+        self.count = 0
+    
+    def write(self, result: ExtractedData):
+        self._file.write(result.model_dump_json() + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.count += 1
+    
+    def close(self):
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_results(jsonl_path: str) -> Iterator[ExtractedData]:
+    """Stream ExtractedData records back from a JSONL results file"""
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield ExtractedData.model_validate_json(line)
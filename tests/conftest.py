@@ -0,0 +1,23 @@
+"""
+Shared fixtures for the unit tests
+"""
+import pytest
+
+
+@pytest.fixture
+def pipeline_config():
+    """Minimal pipeline config: a placeholder key, one prompt candidate and a limiter that never waits.
+
+    Tests copy it with their own overrides ({**pipeline_config, ...}); the response
+    cache stays off because the config has no cache section.
+    """
+    return {
+        "api_key": "test_key",
+        "generator_model": "gemini-1.5-flash",
+        "scoring_model": "gemini-1.5-flash",
+        "temperature": 0.1,
+        "max_prompts_per_item": 2,
+        "rate_limits": {"requests_per_minute": 600000},
+        "template": "{instruction} the {target_info} from this review: '{text}'",
+        "candidates": {"instruction": ["Extract"], "target_info": ["product name and sentiment"]},
+    }
@@ -0,0 +1,62 @@
+"""
+Unit tests for adaptive module
+"""
+import pytest
+from src.adaptive import AdaptiveBudget
+
+
+@pytest.fixture
+def policy():
+    return AdaptiveBudget(max_prompts=3, base_threshold=0.8, long_review_chars=50,
+                          threshold_step=0.05, min_history=3, min_gain=0.05, explore_every=4)
+
+
+class TestAdaptiveBudget:
+    def test_disabled_uses_fixed_budget(self):
+        """Test that a missing adaptive_budget section keeps the global settings"""
+        policy = AdaptiveBudget.from_config({"max_prompts_per_item": 4, "early_stop_threshold": 0.9})
+        assert policy.plan("Great kettle, but it is loud and however slow") == (4, 0.9)
+    
+    def test_easy_review_gets_one_call(self, policy):
+        """Test that a short review without contrast words gets a single variant"""
+        assert policy.plan("Great kettle") == (1, pytest.approx(0.8))
+    
+    def test_hard_review_gets_more_variants(self, policy):
+        """Test that contrast words and length raise budget and threshold"""
+        assert policy.features("Good screen but the battery is weak") == (0, 1)
+        assert policy.plan("Good screen but the battery is weak") == (2, pytest.approx(0.85))
+        
+        long_mixed = "The camera is great, however the battery is weak but charging is fast"
+        assert policy.plan(long_mixed) == (3, pytest.approx(0.95))
+    
+    def test_threshold_capped_below_best_score(self):
+        """Test that the hardest reviews keep a threshold the scorer can actually reach"""
+        policy = AdaptiveBudget(max_prompts=3, base_threshold=0.85, long_review_chars=10)
+        assert policy.threshold("Long review, but however slow") == pytest.approx(0.95)
+    
+    def test_contrast_words_match_whole_words(self, policy):
+        """Test that 'butter' is not a contrast word"""
+        assert policy.features("Butter dish, nice") == (0, 0)
+    
+    def test_history_without_gain_drops_to_one_call(self, policy):
+        """Test that similar reviews whose extra variants never helped stop at one call"""
+        text = "Fine but small"
+        for _ in range(3):
+            policy.record(text, first_score=0.7, best_score=0.7, variants_tried=2)
+        
+        plans = [policy.plan(text)[0] for _ in range(4)]
+        # Every explore_every-th review still gets its full budget
+        assert plans == [1, 1, 1, 2]
+    
+    def test_history_with_gain_adds_a_variant(self, policy):
+        """Test that similar reviews where extra variants helped get one more"""
+        text = "Fine but small"
+        for _ in range(3):
+            policy.record(text, first_score=0.5, best_score=0.9, variants_tried=2)
+        assert policy.plan(text)[0] == 3
+    
+    def test_single_variant_runs_are_not_recorded(self, policy):
+        """Test that reviews that stopped after one variant teach nothing about extra variants"""
+        for _ in range(5):
+            policy.record("Fine but small", first_score=0.9, best_score=0.9, variants_tried=1)
+        assert policy.plan("Fine but small")[0] == 2
@@ -0,0 +1,234 @@
+"""
+Unit tests for autoprompt module
+"""
+import pytest
+import asyncio
+import json
+from src import metrics, tracing
+from src.backends import FakeResponse
+from src.autoprompt import AutoPromptEngine
+from src.utils import Review
+
+
+class _StubModel:
+    """Return a well-formed extraction naming the review in the prompt"""
+    def __init__(self):
+        self.calls = 0
+    
+    def _respond(self, prompt):
+        self.calls += 1
+        text = prompt.split("review: '")[1].split("'")[0]
+        return FakeResponse(json.dumps({
+            "product": text,
+            "sentiment": "positive",
+            "reason": "because it works well"
+        }))
+    
+    def generate_content(self, prompt, generation_config=None):
+        return self._respond(prompt)
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        return self._respond(prompt)
+
+
+class TestAutoPromptEngine:
+    @pytest.fixture
+    def engine(self, pipeline_config):
+        engine = AutoPromptEngine(pipeline_config)
+        engine.generator.model = _StubModel()
+        return engine
+    
+    def test_score_prompt_complete_extraction(self, engine):
+        """Test heuristic score for a complete extraction"""
+        data = {"product": "coffee maker", "sentiment": "positive", "reason": "brews fast and hot"}
+        assert engine._score_prompt("text", data) == pytest.approx(1.0)
+    
+    def test_process_early_stops(self, engine):
+        """Test that a high-scoring first variant stops the search"""
+        result = engine.process(Review(review_id="1", review_text="kettle"))
+        
+        assert result.product == "kettle"
+        assert engine.generator.model.calls == 1
+        assert result.llm_calls == 1
+    
+    def test_process_records_stage_metrics(self, engine):
+        """Test that early stops and per-review time are exported as metrics"""
+        stops = metrics.EARLY_STOPS.value(mode="sequential")
+        reviews, _ = metrics.REVIEW_SECONDS.snapshot(pipeline="autoprompt")
+        engine.process(Review(review_id="1", review_text="kettle"))
+        
+        assert metrics.EARLY_STOPS.value(mode="sequential") == stops + 1
+        assert metrics.REVIEW_SECONDS.snapshot(pipeline="autoprompt")[0] == reviews + 1
+    
+    def test_process_traces_spans(self, engine):
+        """Test that a review is traced as review > variant > llm_attempt > request"""
+        tracer = tracing.Tracer()
+        tracing.set_tracer(tracer)
+        try:
+            engine.process(Review(review_id="1", review_text="kettle"))
+        finally:
+            tracing.set_tracer(tracing.Tracer(enabled=False))
+        
+        spans = {span["name"]: span for span in tracer.spans()}
+        assert spans["review"]["attrs"] == {"pipeline": "autoprompt", "review_id": "1"}
+        for child, parent in [("variant", "review"), ("llm_attempt", "variant"), ("request", "llm_attempt"),
+                              ("rate_limit_wait", "llm_attempt"), ("score", "variant")]:
+            assert spans[child]["parent_id"] == spans[parent]["span_id"]
+    
+    def test_process_many_preserves_order(self, engine):
+        """Test that concurrent results come back in input order"""
+        reviews = [Review(review_id=str(i), review_text=f"item{i}") for i in range(5)]
+        
+        results = asyncio.run(engine.process_many(reviews, concurrency=2))
+        
+        assert [r.review_id for r in results] == [r.review_id for r in reviews]
+        assert [r.product for r in results] == [f"item{i}" for i in range(5)]
+
+
+class _SlowVariantModel:
+    """First variant answers well and fast; the others hang until cancelled"""
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.started += 1
+        if self.started == 1:
+            return FakeResponse(json.dumps({
+                "product": "kettle", "sentiment": "positive", "reason": "boils water quickly"
+            }))
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return FakeResponse("{}")
+
+
+class TestConcurrentVariants:
+    @pytest.fixture
+    def engine(self, pipeline_config):
+        engine = AutoPromptEngine({
+            **pipeline_config,
+            "max_prompts_per_item": 3,
+            "concurrent_variants": True,
+            "rate_limits": {"requests_per_minute": 600000, "burst": 10},
+            "candidates": {
+                "instruction": ["Extract", "Identify", "List"],
+                "target_info": ["product name and sentiment"]
+            }
+        })
+        engine.generator.model = _SlowVariantModel()
+        return engine
+    
+    def test_early_stop_cancels_siblings(self, engine):
+        """Test that in-flight variants are cancelled once one clears the threshold"""
+        result = asyncio.run(asyncio.wait_for(
+            engine.process_async(Review(review_id="1", review_text="kettle")), timeout=5
+        ))
+        
+        assert result.product == "kettle"
+        assert engine.generator.model.started == 3
+        assert engine.generator.model.cancelled == 2
+    
+    def test_all_variants_fail(self, engine):
+        """Test the failure result when every concurrent variant errors"""
+        class _FailingModel:
+            async def generate_content_async(self, prompt, generation_config=None):
+                raise RuntimeError("boom")
+        
+        engine.generator.model = _FailingModel()
+        result = engine.process(Review(review_id="1", review_text="kettle"))
+        assert result.prompt_used == "autoprompt_failed"
+    
+    def test_sync_process_reuses_one_loop(self, engine):
+        """Test that repeated process() calls run on the same event loop"""
+        loops = []
+        
+        class _LoopRecordingModel(_StubModel):
+            async def generate_content_async(self, prompt, generation_config=None):
+                loops.append(asyncio.get_running_loop())
+                return self._respond(prompt)
+        
+        engine.generator.model = _LoopRecordingModel()
+        for i in range(3):
+            engine.process(Review(review_id=str(i), review_text="kettle"))
+        
+        assert len(loops) >= 3 and len(set(loops)) == 1
+
+
+class TestBanditSelection:
+    def test_scores_update_bandit(self, pipeline_config):
+        """Test that each scored variant is fed back to the bandit"""
+        engine = AutoPromptEngine({
+            **pipeline_config,
+            "max_prompts_per_item": 1,
+            "candidates": {"instruction": ["Extract", "Identify"], "target_info": ["product"]}
+        })
+        engine.generator.model = _StubModel()
+        
+        for i in range(4):
+            engine.process(Review(review_id=str(i), review_text="kettle"))
+        
+        assert engine.bandit.total_pulls == 4
+        assert all(pulls == 2 for pulls in engine.bandit.pulls.values())
+
+
+class _WeakFirstModel(_StubModel):
+    """Every answer lacks a reason, so no variant clears the early-stop threshold"""
+    def _respond(self, prompt):
+        self.calls += 1
+        return FakeResponse(json.dumps({"product": "phone", "sentiment": "mixed"}))
+
+
+class _PerfectModel(_StubModel):
+    """Every answer passes every heuristic rule"""
+    def _respond(self, prompt):
+        self.calls += 1
+        return FakeResponse(json.dumps({"product": "phone", "sentiment": "mixed", "reason": "battery is weak"}))
+
+
+class TestAdaptiveBudget:
+    @pytest.fixture
+    def engine(self, pipeline_config):
+        engine = AutoPromptEngine({
+            **pipeline_config,
+            "max_prompts_per_item": 3,
+            "adaptive_budget": {"enabled": True},
+            "candidates": {"instruction": ["Extract", "Identify", "List"], "target_info": ["product"]}
+        })
+        engine.generator.model = _WeakFirstModel()
+        return engine
+    
+    def test_easy_review_stops_at_one_call(self, engine):
+        """Test that a plain review gets a single variant even when it scores low"""
+        result = engine.process(Review(review_id="1", review_text="Nice phone"))
+        assert engine.generator.model.calls == 1
+        assert result.llm_calls == 1
+        assert result.prompt_used == "autoprompt_best_of_1"
+    
+    def test_contrast_review_gets_more_calls(self, engine):
+        """Test that a review with contrast words is given extra variants"""
+        result = asyncio.run(engine.process_async(
+            Review(review_id="1", review_text="Nice screen but the battery is poor")
+        ))
+        assert engine.generator.model.calls == 2
+        assert result.llm_calls == 2
+    
+    def test_hardest_review_stops_on_perfect_first_variant(self, engine):
+        """Test that a difficulty-3 review still early-stops when the first answer is perfect"""
+        text = "The camera is great but the battery is weak, however it charges fast. " * 5
+        assert sum(engine.adaptive.features(text)) == 3
+        engine.generator.model = _PerfectModel()
+        
+        result = engine.process(Review(review_id="1", review_text=text))
+        
+        assert engine.generator.model.calls == 1
+        assert result.prompt_used == "autoprompt_best_of_3"
+    
+    def test_concurrent_variants_record_history(self, engine):
+        """Test that concurrently evaluated variants still teach the budget policy"""
+        engine.concurrent_variants = True
+        text = "Nice screen but the battery is poor"
+        engine.process(Review(review_id="1", review_text=text))
+        assert engine.adaptive._history[engine.adaptive.features(text)][0] == 1
@@ -0,0 +1,110 @@
+"""
+Unit tests for backends module
+"""
+import pytest
+import asyncio
+import json
+from google.api_core import exceptions as google_exceptions
+from src.backends import FakeBackend, GeminiBackend, LLMBackend, create_backend
+from src.baseline import BaselinePipeline
+from src.utils import iter_reviews
+
+
+@pytest.fixture
+def fake_backend():
+    return FakeBackend("data/ground_truth.json", "data/reviews.csv", seed=1)
+
+
+@pytest.fixture
+def first_review():
+    return next(iter_reviews("data/reviews.csv"))
+
+
+class TestFakeBackend:
+    def test_responses_follow_ground_truth(self, fake_backend, first_review):
+        """Test that single-review prompts are answered from the labels"""
+        model = fake_backend.get_model("fake-model")
+        response = model.generate_content(f"Extract the product from this review: '{first_review.review_text}'\nRespond ONLY with JSON")
+        assert json.loads(response.text)["product"] == "Pixel 9"
+        assert response.usage_metadata.prompt_token_count > 0
+    
+    def test_batch_prompts(self, fake_backend, first_review):
+        """Test that batch prompts get a JSON array keyed by review_id"""
+        items = json.dumps([{"review_id": "a", "text": first_review.review_text}])
+        response = fake_backend.get_model("m").generate_content(f"Extract.\nReviews: {items}\n")
+        assert json.loads(response.text) == [{
+            "review_id": "a", "product": "Pixel 9", "sentiment": "positive",
+            "reason": "Labelled positive in the ground truth"
+        }]
+    
+    def test_error_injection(self):
+        """Test 429 and 503 injection with the real google exception types"""
+        model = FakeBackend(rate_limit_error_rate=1.0).get_model("m")
+        with pytest.raises(google_exceptions.ResourceExhausted):
+            model.generate_content("x")
+        
+        model = FakeBackend(unavailable_error_rate=1.0).get_model("m")
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            asyncio.run(model.generate_content_async("x"))
+    
+    def test_malformed_injection(self, first_review):
+        """Test that malformed responses are not valid JSON"""
+        backend = FakeBackend("data/ground_truth.json", "data/reviews.csv", malformed_rate=1.0)
+        response = backend.get_model("m").generate_content(f"Review: '{first_review.review_text}'\n")
+        with pytest.raises(ValueError):
+            json.loads(response.text)
+        assert backend.injected["malformed"] == 1
+    
+    def test_seeded_runs_are_reproducible(self):
+        """Test that the same seed yields the same latencies and faults"""
+        def run():
+            backend = FakeBackend(latency={"distribution": "lognormal", "mean_ms": 100},
+                                  rate_limit_error_rate=0.3, seed=7)
+            return [backend._plan_call() for _ in range(20)]
+        
+        assert run() == run()
+    
+    def test_latency_distribution_mean(self):
+        """Test that the lognormal latency is centred on mean_ms"""
+        backend = FakeBackend(latency={"distribution": "lognormal", "mean_ms": 200, "sigma": 0.5}, seed=3)
+        delays = [backend._sample_latency() for _ in range(5000)]
+        assert sum(delays) / len(delays) == pytest.approx(0.2, rel=0.05)
+
+
+class TestGeminiBackend:
+    def test_models_bind_to_pooled_connections(self):
+        """Test that model handles use the connection they are given"""
+        backend = GeminiBackend("test_key")
+        connection = backend.open_connection()
+        model = backend.get_model("test-model", connection)
+        assert model._client is connection
+
+
+class TestCreateBackend:
+    def test_selects_fake(self):
+        """Test that backend.type selects the fake backend"""
+        assert isinstance(create_backend({"backend": {"type": "fake"}}), FakeBackend)
+    
+    def test_defaults_to_gemini(self):
+        """Test that Gemini is the default backend"""
+        assert isinstance(create_backend({"api_key": "test_key"}), GeminiBackend)
+    
+    def test_unknown_type(self):
+        """Test that an unknown backend type is rejected"""
+        with pytest.raises(ValueError):
+            create_backend({"backend": {"type": "other"}})
+    
+    def test_backend_must_provide_models(self):
+        """Test that a backend without get_model fails when created, not on its first call"""
+        class _NoModels(LLMBackend):
+            pass
+        
+        with pytest.raises(TypeError):
+            _NoModels()
+    
+    def test_pipeline_runs_offline(self, first_review, pipeline_config):
+        """Test a pipeline end to end on the fake backend"""
+        baseline = BaselinePipeline({**pipeline_config, "backend": {"type": "fake", "seed": 0}})
+        result = baseline.process(first_review)
+        assert result.product == "Pixel 9"
+        assert result.sentiment == "positive"
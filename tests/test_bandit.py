@@ -0,0 +1,77 @@
+"""
+Unit tests for bandit module
+"""
+import pytest
+from src.bandit import PromptBandit
+
+
+class TestPromptBandit:
+    @pytest.fixture
+    def bandit(self):
+        return PromptBandit(["Extract", "Identify"], ["sentiment", "product"])
+    
+    def test_arms_cover_all_combinations(self, bandit):
+        """Test that every instruction x target_info pair is an arm"""
+        assert len(bandit.arms) == 4
+        assert ("Identify", "product") in bandit.arms
+    
+    def test_untried_arms_explored_first(self, bandit):
+        """Test that UCB1 tries every arm before repeating one"""
+        seen = set()
+        for _ in range(4):
+            arm = bandit.select(1)[0]
+            seen.add(arm)
+            bandit.update(arm, 0.5)
+        assert seen == set(bandit.arms)
+    
+    def test_converges_to_best_arm(self, bandit):
+        """Test that the highest-reward arm dominates selection"""
+        best = ("Identify", "product")
+        for _ in range(200):
+            arm = bandit.select(1)[0]
+            bandit.update(arm, 1.0 if arm == best else 0.3)
+        
+        assert bandit.best_arm() == best
+        assert bandit.pulls[best] > 150
+    
+    def test_select_returns_distinct_arms(self, bandit):
+        """Test that a multi-variant selection does not repeat arms"""
+        arms = bandit.select(3)
+        assert len(set(arms)) == 3
+    
+    def test_ties_broken_in_candidate_order(self, bandit):
+        """Test that the same statistics always select the same arms"""
+        assert bandit.select(4) == bandit.arms
+        bandit.update(("Identify", "sentiment"), 0.5)
+        assert bandit.select(2) == [("Extract", "sentiment"), ("Extract", "product")]
+    
+    def test_frozen_replays_saved_state(self, tmp_path):
+        """Test that a frozen bandit neither learns nor overwrites its saved statistics"""
+        path = str(tmp_path / "bandit.json")
+        learner = PromptBandit(["Extract", "Identify"], ["product"], state_path=path)
+        learner.update(("Identify", "product"), 0.9)
+        learner.update(("Extract", "product"), 0.2)
+        learner.save()
+        
+        frozen = PromptBandit(["Extract", "Identify"], ["product"], state_path=path, frozen=True)
+        first = frozen.select(2)
+        frozen.update(first[0], 0.0)
+        frozen.save()
+        assert frozen.select(2) == first
+        assert PromptBandit(["Extract", "Identify"], ["product"], state_path=path).pulls == learner.pulls
+    
+    def test_state_persists(self, tmp_path):
+        """Test that arm statistics survive a save/load round trip"""
+        path = str(tmp_path / "bandit.json")
+        first = PromptBandit(["Extract"], ["sentiment"], state_path=path)
+        first.update(("Extract", "sentiment"), 0.9)
+        first.save()
+        
+        second = PromptBandit(["Extract"], ["sentiment"], state_path=path)
+        assert second.pulls[("Extract", "sentiment")] == 1
+        assert second.mean_reward(("Extract", "sentiment")) == pytest.approx(0.9)
+    
+    def test_unknown_strategy(self):
+        """Test that an unknown strategy is rejected"""
+        with pytest.raises(ValueError):
+            PromptBandit(["Extract"], ["sentiment"], strategy="greedy")
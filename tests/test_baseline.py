@@ -2,6 +2,9 @@
 Unit tests for baseline module
 """
 import pytest
+import asyncio
+import json
+from src.backends import FakeResponse
 from src.baseline import BaselinePipeline
 from src.utils import Review
 
@@ -35,3 +38,24 @@ class TestBaselinePipeline:
         assert hasattr(BaselinePipeline, 'process')
         sig = inspect.signature(BaselinePipeline.process)
         assert 'review' in sig.parameters
+
+
+class _StubModel:
+    """Echo the review text back as the product name"""
+    async def generate_content_async(self, prompt, generation_config=None):
+        text = prompt.split("Review: '")[1].rstrip("'\n")
+        await asyncio.sleep(0.01 * (len(text) % 3))
+        return FakeResponse(json.dumps({"product": text, "sentiment": "positive", "reason": "stub"}))
+
+
+class TestBaselineProcessMany:
+    def test_process_many_preserves_order(self, pipeline_config):
+        """Test that concurrent results come back in input order"""
+        baseline = BaselinePipeline(pipeline_config)
+        baseline.llm.model = _StubModel()
+        reviews = [Review(review_id=str(i), review_text=f"item{i}" + "x" * i) for i in range(6)]
+        
+        results = asyncio.run(baseline.process_many(reviews, concurrency=3))
+        
+        assert [r.review_id for r in results] == [r.review_id for r in reviews]
+        assert all(r.product.startswith(f"item{r.review_id}") for r in results)
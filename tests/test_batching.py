@@ -0,0 +1,135 @@
+"""
+Unit tests for batching module
+"""
+import pytest
+import asyncio
+import json
+import time
+from src.backends import FakeResponse
+from src.batching import pack_batches, build_batch_prompt, parse_batch_response, match_batch_items
+from src.baseline import BaselinePipeline
+from src.utils import Review
+
+
+class _BatchModel:
+    """Answer batch prompts for every review except "item2", and single prompts normally"""
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        if "Reviews: " in prompt:
+            items = json.loads(prompt.split("Reviews: ")[1])
+            answer = [
+                {"review_id": item["review_id"], "product": item["text"], "sentiment": "positive", "reason": "batch"}
+                for item in items if item["text"] != "item2"
+            ]
+            return FakeResponse("Here you go:\n" + json.dumps(answer))
+        text = prompt.split("Review: '")[1].rstrip("'\n")
+        return FakeResponse(json.dumps({"product": text, "sentiment": "negative", "reason": "single"}))
+
+
+class _SlowSingleModel:
+    """Answer batch prompts with an empty array and single prompts after a delay, tracking overlap"""
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        if "Reviews: " in prompt:
+            return FakeResponse("[]")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        text = prompt.split("Review: '")[1].rstrip("'\n")
+        return FakeResponse(json.dumps({"product": text, "sentiment": "negative", "reason": "single"}))
+
+
+class TestPackBatches:
+    def test_respects_max_items(self):
+        """Test that batches never exceed max_items"""
+        reviews = [Review(review_id=str(i), review_text="short") for i in range(7)]
+        batches = list(pack_batches(reviews, max_items=3, max_tokens=10000))
+        assert [len(b) for b in batches] == [3, 3, 1]
+    
+    def test_respects_token_budget(self):
+        """Test that a long review starts a new batch"""
+        reviews = [
+            Review(review_id="1", review_text="x" * 40),
+            Review(review_id="2", review_text="x" * 40),
+            Review(review_id="3", review_text="x" * 400),
+        ]
+        batches = list(pack_batches(reviews, max_items=10, max_tokens=50))
+        assert [[r.review_id for r in b] for b in batches] == [["1", "2"], ["3"]]
+
+
+class TestParseBatchResponse:
+    def test_keyed_by_review_id(self):
+        """Test that array entries are keyed by string review_id"""
+        text = '```json\n[{"review_id": 1, "product": "a"}, {"review_id": "2", "product": "b"}]\n```'
+        parsed = parse_batch_response(text)
+        assert parsed["1"]["product"] == "a"
+        assert parsed["2"]["product"] == "b"
+    
+    def test_drops_malformed_entries(self):
+        """Test that entries without review_id are ignored"""
+        parsed = parse_batch_response('[{"product": "a"}, "junk", {"review_id": "3"}]')
+        assert list(parsed) == ["3"]
+    
+    def test_no_array(self):
+        """Test that a response without an array raises"""
+        with pytest.raises(ValueError):
+            parse_batch_response('{"product": "a"}')
+    
+    def test_prompt_numbers_reviews_by_position(self):
+        """Test that the batch prompt lists every review under a positional id, not its review_id"""
+        reviews = [Review(review_id="a1", review_text="x"), Review(review_id="b2", review_text="y")]
+        prompt = build_batch_prompt("Extract.", reviews)
+        assert '"item-0"' in prompt and '"item-1"' in prompt
+        assert '"a1"' not in prompt
+        renamed = [Review(review_id="other", review_text="x"), Review(review_id="ids", review_text="y")]
+        assert build_batch_prompt("Extract.", renamed) == prompt
+    
+    def test_match_batch_items(self):
+        """Test that extractions are mapped back to reviews by position"""
+        reviews = [Review(review_id="a1", review_text="x"), Review(review_id="b2", review_text="y")]
+        assert match_batch_items(reviews, {"item-1": {"product": "b"}}) == [None, {"product": "b"}]
+
+
+class TestBaselineBatching:
+    def test_batch_with_per_item_fallback(self, pipeline_config):
+        """Test that one request covers the batch and missing items fall back"""
+        baseline = BaselinePipeline({
+            **pipeline_config,
+            "batching": {"enabled": True, "max_items": 5, "max_tokens": 1000}
+        })
+        baseline.llm.model = _BatchModel()
+        reviews = [Review(review_id=str(i), review_text=f"item{i}") for i in range(1, 5)]
+        
+        results = asyncio.run(baseline.process_many(reviews, concurrency=2))
+        
+        assert [r.review_id for r in results] == ["1", "2", "3", "4"]
+        assert [r.prompt_used for r in results] == ["static_batch", "static", "static_batch", "static_batch"]
+        assert results[1].reason == "single"
+        assert baseline.llm.model.calls == 2
+        # The batch request is split across its items; the fallback adds its own call
+        assert [r.llm_calls for r in results] == [0.25, 1.25, 0.25, 0.25]
+    
+    def test_fallbacks_run_concurrently(self, pipeline_config):
+        """Test that items a batch misses are retried together, not one round trip at a time"""
+        baseline = BaselinePipeline({
+            **pipeline_config,
+            "batching": {"enabled": True, "max_items": 5, "max_tokens": 1000}
+        })
+        baseline.llm.model = _SlowSingleModel()
+        reviews = [Review(review_id=str(i), review_text=f"item{i}") for i in range(1, 6)]
+        
+        start = time.perf_counter()
+        results = asyncio.run(baseline.process_many(reviews, concurrency=1))
+        
+        assert [r.prompt_used for r in results] == ["static"] * 5
+        # The shared concurrency limit still applies, but the fallbacks overlap
+        assert baseline.llm.model.max_in_flight > 1
+        assert time.perf_counter() - start < 0.4
@@ -0,0 +1,133 @@
+"""
+Unit tests for cache module
+"""
+import pytest
+from src.backends import FakeResponse
+from src.cache import ResponseCache
+from src.llm import LLMClient
+from src.rate_limiter import RateLimiter
+
+
+class _CountingModel:
+    def __init__(self, text='{"product": "kettle"}'):
+        self.text = text
+        self.calls = 0
+    
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return FakeResponse(self.text)
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+        yield cache
+        cache.close()
+    
+    def test_key_depends_on_model_prompt_and_config(self):
+        """Test that every key component changes the hash"""
+        key = ResponseCache.make_key("m", "p", {"temperature": 0.1})
+        assert key == ResponseCache.make_key("m", "p", {"temperature": 0.1})
+        assert key != ResponseCache.make_key("other", "p", {"temperature": 0.1})
+        assert key != ResponseCache.make_key("m", "other", {"temperature": 0.1})
+        assert key != ResponseCache.make_key("m", "p", {"temperature": 0.2})
+        assert key != ResponseCache.make_key("m", "p", {"temperature": 0.1}, backend="fake")
+    
+    def test_hit_and_miss_counters(self, cache):
+        """Test get/put round trip and counters"""
+        assert cache.get("k") is None
+        cache.put("k", "value")
+        assert cache.get("k") == "value"
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+    
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry is evicted over the size limit"""
+        cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_size_mb=25 / (1024 * 1024))
+        cache.put("a", "x" * 10)
+        cache.put("b", "x" * 10)
+        cache.get("a")
+        cache.put("c", "x" * 10)
+        
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        cache.close()
+    
+    def test_bypass_skips_lookup(self, cache):
+        """Test that bypass ignores stored responses but still records new ones"""
+        cache.put("k", "old")
+        cache.bypass = True
+        assert cache.get("k") is None
+        cache.put("k", "new")
+        cache.bypass = False
+        assert cache.get("k") == "new"
+    
+    def test_persists_across_instances(self, tmp_path):
+        """Test that responses survive reopening the cache file"""
+        path = str(tmp_path / "cache.sqlite")
+        first = ResponseCache(path=path)
+        first.put("k", "value")
+        first.close()
+        
+        second = ResponseCache(path=path)
+        assert second.get("k") == "value"
+        second.close()
+    
+    def test_backends_do_not_share_entries(self, tmp_path):
+        """Test that responses recorded with the fake backend are never served to Gemini"""
+        path = str(tmp_path / "cache.sqlite")
+        fake = ResponseCache(path=path, backend="fake")
+        fake.put(fake.key("m", "p"), "fake answer")
+        gemini = ResponseCache(path=path)
+        assert gemini.get(gemini.key("m", "p")) is None
+        assert fake.get(fake.key("m", "p")) == "fake answer"
+        fake.close()
+        gemini.close()
+    
+    def test_fake_backend_default_path(self):
+        """Test that the fake backend defaults to its own cache file"""
+        config = {"backend": {"type": "fake"}, "cache": {"enabled": False}}
+        assert ResponseCache.from_config(config).path == "results/llm_cache_fake.sqlite"
+        assert ResponseCache.from_config({"cache": {"enabled": False}}).path == "results/llm_cache.sqlite"
+    
+    def test_disabled_without_config_section(self, tmp_path, monkeypatch):
+        """Test that a config without a cache section creates no cache file"""
+        monkeypatch.chdir(tmp_path)
+        cache = ResponseCache.from_config({})
+        assert not cache.enabled
+        assert not (tmp_path / "results").exists()
+
+
+class TestLLMClientCaching:
+    def test_rerun_costs_zero_calls(self, tmp_path):
+        """Test that an identical second call is served from the cache"""
+        cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+        model = _CountingModel()
+        client = LLMClient(model, "m", RateLimiter(requests_per_minute=600000), cache)
+        
+        first = client.generate("prompt", {"temperature": 0.1})
+        second = client.generate("prompt", {"temperature": 0.1})
+        
+        assert first == second
+        assert model.calls == 1
+        cache.close()
+    
+    def test_unparseable_response_not_cached(self, tmp_path):
+        """Test that responses failing parse are not stored"""
+        cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+        model = _CountingModel(text="not json")
+        client = LLMClient(model, "m", RateLimiter(requests_per_minute=600000), cache)
+        
+        def parse(text):
+            raise ValueError("bad")
+        
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                client.generate("prompt", parse=parse)
+        assert model.calls == 2
+        cache.close()
@@ -0,0 +1,56 @@
+"""
+Unit tests for checkpoint module
+"""
+import pytest
+from src.checkpoint import RunJournal
+from src.utils import ExtractedData
+
+
+def _result(review_id, product="kettle"):
+    return ExtractedData(review_id=review_id, product=product, sentiment="positive", reason="")
+
+
+class TestRunJournal:
+    def test_completed_tracks_written_results(self, tmp_path):
+        """Test that journaled results are reported as completed"""
+        journal = RunJournal("run1", root=str(tmp_path))
+        with journal.writer("baseline") as writer:
+            writer.write(_result("1"))
+            writer.write(_result("2"))
+        
+        assert set(RunJournal.resume("run1", root=str(tmp_path)).completed("baseline")) == {"1", "2"}
+        assert journal.completed("autoprompt") == {}
+    
+    def test_failed_results_are_retried(self, tmp_path):
+        """Test that error results are not completed until a later success"""
+        journal = RunJournal("run1", root=str(tmp_path))
+        with journal.writer("baseline") as writer:
+            writer.write(_result("1", product="error"))
+        assert journal.completed("baseline") == {}
+        
+        with journal.writer("baseline") as writer:
+            writer.write(_result("1"))
+        assert journal.completed("baseline")["1"].product == "kettle"
+        assert len(journal.results("baseline")) == 1
+    
+    def test_torn_last_line_is_skipped(self, tmp_path):
+        """Test that a partially written record from a crash is ignored"""
+        journal = RunJournal("run1", root=str(tmp_path))
+        with journal.writer("baseline") as writer:
+            writer.write(_result("1"))
+        with open(journal.path("baseline"), "a") as f:
+            f.write('{"review_id": "2", "prod')
+        
+        with journal.writer("baseline") as writer:
+            writer.write(_result("3"))
+        assert set(journal.completed("baseline")) == {"1", "3"}
+    
+    def test_meta_round_trip(self, tmp_path):
+        """Test that run settings are restored on resume"""
+        RunJournal("run1", root=str(tmp_path)).save_meta({"data_path": "x.csv", "limit": 5})
+        assert RunJournal.resume("run1", root=str(tmp_path)).load_meta()["limit"] == 5
+    
+    def test_resume_unknown_run(self, tmp_path):
+        """Test that resuming a missing run raises"""
+        with pytest.raises(FileNotFoundError):
+            RunJournal.resume("missing", root=str(tmp_path))
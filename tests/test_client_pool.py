@@ -0,0 +1,91 @@
+"""
+Unit tests for client_pool module
+"""
+import pytest
+import asyncio
+from src.backends import FakeBackend
+from src.client_pool import ClientProvider
+from src.baseline import BaselinePipeline
+from src.autoprompt import AutoPromptEngine
+
+
+class CountingBackend(FakeBackend):
+    """Fake backend that hands out numbered connections"""
+    
+    def __init__(self):
+        super().__init__()
+        self.opened = []
+    
+    def open_connection(self, asynchronous=False, api_key=None):
+        connection = ("async" if asynchronous else "sync", len(self.opened))
+        self.opened.append(connection)
+        return connection
+
+
+@pytest.fixture
+def config(pipeline_config):
+    return {
+        **pipeline_config,
+        "backend": {"type": "fake"},
+        "client_pool": {"size": 2},
+        "generator_model": "test-model",
+        "scoring_model": "test-model",
+    }
+
+
+class TestClientProvider:
+    def test_connections_are_reused(self):
+        """Test that calls beyond the pool size reuse open connections"""
+        backend = CountingBackend()
+        provider = ClientProvider(backend, pool_size=2)
+        model = provider.get_model("m")
+        for _ in range(10):
+            model.generate_content("x")
+        
+        assert len(backend.opened) == 2
+        stats = provider.stats()
+        assert stats["calls"] == 10
+        assert stats["reused_calls"] == 8
+        assert stats["reuse_rate"] == pytest.approx(0.8)
+    
+    def test_async_connections_follow_the_event_loop(self):
+        """Test that async connections are reused within a loop and reopened on a new one"""
+        backend = CountingBackend()
+        provider = ClientProvider(backend, pool_size=1)
+        model = provider.get_model("m")
+        
+        async def run():
+            await asyncio.gather(*(model.generate_content_async("x") for _ in range(5)))
+        
+        asyncio.run(run())
+        assert backend.opened == [("async", 0)]
+        asyncio.run(run())
+        assert backend.opened == [("async", 0), ("async", 1)]
+        assert provider.stats()["reused_calls"] == 8
+    
+    def test_same_model_name_shares_handle(self):
+        """Test that identical model names map to one handle"""
+        provider = ClientProvider(FakeBackend())
+        assert provider.get_model("a") is provider.get_model("a")
+        assert provider.get_model("a") is not provider.get_model("b")
+        assert provider.stats()["models"] == 2
+    
+    def test_invalid_pool_size(self):
+        """Test that an empty pool is rejected"""
+        with pytest.raises(ValueError):
+            ClientProvider(FakeBackend(), pool_size=0)
+    
+    def test_shared_provider_per_configuration(self, config):
+        """Test that equal configurations share one provider"""
+        assert ClientProvider.shared(config) is ClientProvider.shared(dict(config))
+        other = dict(config, client_pool={"size": 3})
+        assert ClientProvider.shared(other) is not ClientProvider.shared(config)
+    
+    def test_pipelines_share_provider(self, config):
+        """Test that both pipelines (and generator/scorer) draw from one provider"""
+        baseline = BaselinePipeline(config)
+        autoprompt = AutoPromptEngine(config)
+        
+        assert baseline.provider is autoprompt.provider
+        assert baseline.llm.model is autoprompt.generator.model
+        assert autoprompt.generator.model is autoprompt.scorer.model
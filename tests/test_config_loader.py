@@ -0,0 +1,19 @@
+"""
+Unit tests for config_loader module
+"""
+from src.config_loader import config_fingerprint
+
+
+class TestConfigFingerprint:
+    def test_stable_across_key_order(self):
+        """Test that equal settings give the same fingerprint regardless of order"""
+        assert config_fingerprint({"a": 1, "b": {"c": 2}}) == config_fingerprint({"b": {"c": 2}, "a": 1})
+    
+    def test_changes_with_settings(self):
+        """Test that a changed setting changes the fingerprint"""
+        assert config_fingerprint({"temperature": 0.1}) != config_fingerprint({"temperature": 0.2})
+    
+    def test_ignores_api_keys(self):
+        """Test that rotating API keys does not invalidate cached results"""
+        config = {"temperature": 0.1}
+        assert config_fingerprint({**config, "api_key": "a", "api_keys": ["a"]}) == config_fingerprint(config)
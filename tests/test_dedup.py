@@ -0,0 +1,111 @@
+"""
+Unit tests for dedup module
+"""
+import pytest
+import asyncio
+from src.dedup import DedupIndex
+from src.baseline import BaselinePipeline
+from src.utils import Review, ExtractedData
+
+ORIGINAL = "The Pixel 9 camera is amazing and the battery easily lasts all day long. Highly recommend it!"
+REPOST = "The Pixel 9 camera is amazing and the battery easily lasts all day long. Highly recommend it!!! Five stars"
+OTHER = "My blender broke after one week and support never answered my emails."
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DedupIndex(path=str(tmp_path / "dedup.sqlite"), threshold=0.7)
+    yield index
+    index.close()
+
+
+def _result(review_id, product="Pixel 9"):
+    return ExtractedData(review_id=review_id, product=product, sentiment="positive",
+                         reason="great camera", confidence=0.9, prompt_used="static", llm_calls=1)
+
+
+class TestDedupIndex:
+    def test_signature_similarity(self, index):
+        """Test that MinHash agreement tracks text similarity"""
+        original, repost, other = (index.signature(t) for t in (ORIGINAL, REPOST, OTHER))
+        assert (original == repost).mean() > 0.7
+        assert (original == other).mean() < 0.2
+        assert index.signature("   ") is None
+    
+    def test_reuses_near_duplicate(self, index):
+        """Test that a repost reuses the stored extraction with provenance"""
+        index.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1"))
+        
+        reused = index.reuse("baseline", Review(review_id="2", review_text=REPOST))
+        assert reused.review_id == "2"
+        assert reused.product == "Pixel 9"
+        assert reused.prompt_used == "dedup_of_1"
+        assert reused.llm_calls == 0
+        assert index.reuse("baseline", Review(review_id="3", review_text=OTHER)) is None
+        assert index.stats()["hit_rate"] == pytest.approx(0.5)
+    
+    def test_namespaces_are_separate(self, index):
+        """Test that one pipeline never reuses another's extraction"""
+        index.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1"))
+        assert index.reuse("autoprompt", Review(review_id="2", review_text=ORIGINAL)) is None
+    
+    def test_failures_are_not_indexed(self, index):
+        """Test that error results are never reused"""
+        index.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1", product="error"))
+        assert index.stats()["entries"] == 0
+    
+    def test_persists_across_runs(self, tmp_path):
+        """Test that a reopened index still finds earlier extractions"""
+        path = str(tmp_path / "dedup.sqlite")
+        first = DedupIndex(path=path, threshold=0.7)
+        first.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1"))
+        first.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1"))
+        first.close()
+        
+        second = DedupIndex(path=path, threshold=0.7)
+        assert second.stats()["entries"] == 1
+        assert second.reuse("baseline", Review(review_id="2", review_text=REPOST)) is not None
+        second.close()
+    
+    def test_parameter_change_resets_index(self, tmp_path):
+        """Test that signatures from other hashing parameters are discarded"""
+        path = str(tmp_path / "dedup.sqlite")
+        first = DedupIndex(path=path)
+        first.remember("baseline", Review(review_id="1", review_text=ORIGINAL), _result("1"))
+        first.close()
+        
+        assert DedupIndex(path=path, num_perm=64).stats()["entries"] == 0
+    
+    def test_disabled_by_default(self):
+        """Test that a missing dedup section turns the index off"""
+        index = DedupIndex.from_config({})
+        assert not index.enabled
+        assert index.reuse("baseline", Review(review_id="1", review_text=ORIGINAL)) is None
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        return type("Response", (), {"text": '{"product": "Pixel 9", "sentiment": "positive", "reason": "camera"}'})()
+
+
+class TestPipelineDedup:
+    def test_baseline_skips_llm_for_reposts(self, tmp_path, pipeline_config):
+        """Test that only the first of several near-identical reviews calls the model"""
+        baseline = BaselinePipeline({
+            **pipeline_config,
+            "dedup": {"enabled": True, "threshold": 0.7, "path": str(tmp_path / "dedup.sqlite")}
+        })
+        baseline.llm.model = _CountingModel()
+        reviews = [Review(review_id="1", review_text=ORIGINAL),
+                   Review(review_id="2", review_text=REPOST),
+                   Review(review_id="3", review_text=ORIGINAL)]
+        
+        results = [asyncio.run(baseline.process_async(review)) for review in reviews]
+        
+        assert baseline.llm.model.calls == 1
+        assert [r.prompt_used for r in results] == ["static", "dedup_of_1", "dedup_of_1"]
+        assert [r.llm_calls for r in results] == [1, 0, 0]
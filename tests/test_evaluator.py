@@ -106,3 +106,51 @@ class TestEvaluator:
         assert 'baseline' in report
         assert 'autoprompt' in report
         assert 'improvement' in report
+    
+    def test_chunked_stream_matches_single_pass(self, sample_ground_truth):
+        """Test that chunk size does not change the metrics"""
+        evaluator = Evaluator(sample_ground_truth)
+        results = [
+            ExtractedData(review_id=str(i % 3 + 1), product="Coffee Maker " if i % 2 else "blender",
+                          sentiment="POSITIVE", reason="", confidence=0.5)
+            for i in range(10)
+        ]
+        
+        assert evaluator.evaluate_stream(iter(results), chunksize=3) == evaluator.calculate_metrics(results)
+    
+    def test_running_metrics_mid_stream(self, sample_ground_truth, sample_results):
+        """Test that metrics are available after every chunk"""
+        evaluator = Evaluator(sample_ground_truth)
+        snapshots = []
+        
+        evaluator.evaluate_stream(iter(sample_results), chunksize=1, on_chunk=snapshots.append)
+        
+        assert len(snapshots) == 2
+        assert snapshots[0]['overall_accuracy'] == 100.0
+        assert snapshots[1]['avg_confidence'] == pytest.approx(0.925)
+    
+    def test_calls_per_review(self, sample_ground_truth):
+        """Test the average number of LLM calls spent per review"""
+        evaluator = Evaluator(sample_ground_truth)
+        results = [
+            ExtractedData(review_id="1", product="coffee maker", sentiment="positive", reason="", llm_calls=1),
+            ExtractedData(review_id="2", product="blender", sentiment="negative", reason="", llm_calls=2.5)
+        ]
+        assert evaluator.calculate_metrics(results)['calls_per_review'] == pytest.approx(1.75)
+    
+    def test_accumulator_accepts_dataframe_chunks(self, sample_ground_truth):
+        """Test feeding DataFrame chunks and ignoring ids without ground truth"""
+        import pandas as pd
+        evaluator = Evaluator(sample_ground_truth)
+        accumulator = evaluator.new_accumulator()
+        accumulator.update(pd.DataFrame({
+            "review_id": ["1", "99"],
+            "product": ["coffee maker", "x"],
+            "sentiment": ["negative", "x"],
+            "confidence": [1.0, 1.0],
+        }))
+        
+        metrics = accumulator.metrics()
+        assert accumulator.total == 1
+        assert metrics['product_accuracy'] == 100.0
+        assert metrics['sentiment_accuracy'] == 0.0
@@ -0,0 +1,159 @@
+"""
+Unit tests for hedging module
+"""
+import asyncio
+import time
+import pytest
+from src.backends import FakeResponse
+from src.hedging import HedgePolicy, LatencyTracker
+from src.json_extract import extract_json
+from src.llm import LLMClient
+from src.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def policy():
+    """A warmed-up policy that hedges after 20ms, with no holdout"""
+    policy = HedgePolicy(min_samples=5, min_delay=0.02, budget=1.0, holdout=0)
+    for _ in range(5):
+        policy.calls.observe(0.001)
+    return policy
+
+
+def _sleeper(seconds, value):
+    async def _call():
+        await asyncio.sleep(seconds)
+        return value
+    return _call
+
+
+class TestLatencyTracker:
+    def test_percentiles(self):
+        """Test nearest-rank percentiles over the sliding window"""
+        tracker = LatencyTracker(window=100)
+        assert tracker.percentile(99) is None
+        for ms in range(1, 201):
+            tracker.observe(ms / 1000.0)
+        # Only the last 100 observations (101-200ms) remain
+        assert len(tracker) == 100
+        assert tracker.percentile(50) == pytest.approx(0.150)
+        assert tracker.percentile(99) == pytest.approx(0.199)
+        assert tracker.percentile(100) == pytest.approx(0.200)
+
+
+class TestHedgePolicy:
+    def test_no_hedging_until_warm(self):
+        """Test that no hedge delay exists before min_samples calls were timed"""
+        policy = HedgePolicy(min_samples=3, min_delay=0.01)
+        policy.calls.observe(0.5)
+        assert policy.delay() is None
+        policy.calls.observe(0.5)
+        policy.calls.observe(0.5)
+        assert policy.delay() == pytest.approx(0.5)
+
+    def test_hedge_wins_and_primary_is_cancelled(self, policy):
+        """Test that a slow primary loses to the hedge and gets cancelled"""
+        cancelled = []
+
+        async def primary():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        start = time.perf_counter()
+        result = asyncio.run(policy.call_async(primary, _sleeper(0.01, "hedge"), "test-model"))
+        assert result == "hedge"
+        assert time.perf_counter() - start < 1
+        assert cancelled == [True]
+        stats = policy.stats()
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+    def test_fast_primary_sends_no_hedge(self, policy):
+        """Test that calls finishing before the delay cost nothing extra"""
+        assert asyncio.run(policy.call_async(_sleeper(0, "primary"), _sleeper(0, "hedge"))) == "primary"
+        assert policy.stats()["hedges"] == 0
+
+    def test_failed_response_keeps_race_going(self, policy):
+        """Test that an invalid first response does not end the race"""
+        async def hedge():
+            raise ValueError("truncated JSON")
+
+        assert asyncio.run(policy.call_async(_sleeper(0.05, "primary"), hedge)) == "primary"
+
+        async def primary():
+            await asyncio.sleep(0.03)
+            raise ValueError("truncated JSON")
+
+        with pytest.raises(ValueError):
+            asyncio.run(policy.call_async(primary, hedge))
+
+    def test_budget_caps_hedges(self):
+        """Test that hedges stop once they reach the budget share of requests"""
+        policy = HedgePolicy(percentile=50, min_samples=1, min_delay=0.01, budget=0.25, holdout=0)
+        for _ in range(100):
+            policy.calls.observe(0.001)
+
+        async def main():
+            for _ in range(8):
+                await policy.call_async(_sleeper(0.03, "primary"), _sleeper(0, "hedge"))
+
+        asyncio.run(main())
+        stats = policy.stats()
+        assert stats["hedges"] == 2
+        assert stats["extra_call_rate"] == pytest.approx(0.25)
+        assert stats["over_budget"] > 0
+
+    def test_holdout_is_never_hedged(self):
+        """Test that holdout requests only feed the control latency"""
+        policy = HedgePolicy(min_samples=1, min_delay=0.01, budget=1.0, holdout=1.0)
+        policy.calls.observe(0.001)
+        assert asyncio.run(policy.call_async(_sleeper(0.03, "primary"), _sleeper(0, "hedge"))) == "primary"
+        stats = policy.stats()
+        assert stats["hedges"] == 0
+        assert stats["control_p99"] is not None and stats["request_p99"] is None
+
+    def test_timeout(self):
+        """Test that a request past the timeout raises TimeoutError"""
+        policy = HedgePolicy(timeout=0.02)
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(policy.call_async(_sleeper(5, "primary"), _sleeper(5, "hedge")))
+
+    def test_sync_call(self, policy):
+        """Test that the threaded sync path also returns the hedge's answer"""
+        def primary():
+            time.sleep(0.3)
+            return "primary"
+
+        assert policy.call(primary, lambda: "hedge") == "hedge"
+
+    def test_disabled_by_default(self):
+        """Test that a missing hedging section turns hedging off"""
+        assert not HedgePolicy.from_config({}).enabled
+
+
+class _SlowThenFastModel:
+    """First call hangs, later calls answer at once"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(5)
+        return FakeResponse('{"product": "Pixel 9", "sentiment": "positive", "reason": "camera"}')
+
+
+class TestLLMClientHedging:
+    def test_generate_async_hedges_slow_call(self, policy):
+        """Test that LLMClient returns the hedge's parsed response and counts both calls"""
+        model = _SlowThenFastModel()
+        client = LLMClient(model, "hedge-test", RateLimiter(requests_per_minute=600000), hedging=policy)
+
+        result = asyncio.run(client.generate_async("Extract the product", parse=extract_json))
+
+        assert result["product"] == "Pixel 9"
+        assert model.calls == 2
+        assert policy.stats()["hedge_wins"] == 1
@@ -0,0 +1,111 @@
+"""
+Unit tests for json_extract module
+"""
+import pytest
+import json
+import time
+from src.json_extract import (extract_json, extract_json_array, find_json_span, iter_json_spans,
+                              repair_json, repair_stats)
+
+
+class TestExtractJson:
+    def test_plain_object(self):
+        """Test parsing a bare JSON object"""
+        assert extract_json('{"product": "kettle"}') == {"product": "kettle"}
+    
+    def test_markdown_fence(self):
+        """Test parsing JSON wrapped in a markdown code block"""
+        text = 'Sure!\n```json\n{"product": "kettle", "sentiment": "positive"}\n```\nHope that helps.'
+        assert extract_json(text)["sentiment"] == "positive"
+    
+    def test_first_of_several_objects(self):
+        """Test that the first object wins when a response contains several"""
+        text = '{"product": "kettle"} and also {"product": "toaster"}'
+        assert extract_json(text) == {"product": "kettle"}
+    
+    def test_braces_inside_strings(self):
+        """Test that braces and escaped quotes inside strings are ignored"""
+        text = '{"reason": "said \\"hi\\" {not a brace}", "product": "x"} trailing }'
+        assert extract_json(text)["product"] == "x"
+    
+    def test_nested_values(self):
+        """Test nested objects and arrays"""
+        assert extract_json('x {"a": {"b": [1, {"c": 2}]}} y') == {"a": {"b": [1, {"c": 2}]}}
+    
+    def test_skips_braces_in_prose(self):
+        """Test that a non-JSON brace pair before the object is skipped"""
+        assert extract_json('Use {placeholder} here: {"product": "x"}') == {"product": "x"}
+    
+    def test_no_object(self):
+        """Test that responses without a complete object raise JSONDecodeError"""
+        with pytest.raises(json.JSONDecodeError):
+            extract_json("no json here")
+        with pytest.raises(json.JSONDecodeError):
+            extract_json('{"product": "kett', repair=False)
+    
+    def test_array(self):
+        """Test array extraction"""
+        assert extract_json_array('Result: [{"review_id": "1"}] done') == [{"review_id": "1"}]
+    
+    def test_span_stops_at_first_object(self):
+        """Test that the scanner does not look past the first balanced value"""
+        text = '{"a": 1}' + " filler" * 1000
+        assert find_json_span(text) == (0, 8)
+    
+    def test_spans_in_start_order(self):
+        """Test that nested and unclosed values are all offered, outermost first"""
+        text = '{ note {"a": {"b": 1}} x'
+        assert list(iter_json_spans(text)) == [(7, 22), (13, 21)]
+        assert extract_json(text, repair=False) == {"a": {"b": 1}}
+    
+    def test_deep_nesting_is_linear(self):
+        """Test that deeply nested invalid braces do not rescan the text per opener"""
+        text = "{ note " * 20000 + '{"product": "x"}' + "}" * 20000
+        start = time.perf_counter()
+        assert extract_json(text) == {"product": "x"}
+        assert extract_json("{" * 20000 + "}" * 20000) == {}
+        assert time.perf_counter() - start < 2
+
+
+class TestRepairJson:
+    @pytest.fixture(autouse=True)
+    def reset_stats(self):
+        repair_stats.reset()
+    
+    def test_trailing_commas(self):
+        """Test that trailing commas in objects and arrays are removed"""
+        assert extract_json('{"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+    
+    def test_single_quotes(self):
+        """Test that single-quoted keys and strings become double-quoted"""
+        text = "{'product': 'kettle', 'reason': 'it\\'s \"great\"'}"
+        assert extract_json(text) == {"product": "kettle", "reason": 'it\'s "great"'}
+    
+    def test_unterminated_string(self):
+        """Test that a response cut off mid-string is closed"""
+        assert extract_json('{"product": "kettle", "reason": "boils fa') == {
+            "product": "kettle", "reason": "boils fa"
+        }
+    
+    def test_truncated_member_dropped(self):
+        """Test that a key cut off before its value is dropped"""
+        assert extract_json('{"product": "kettle", "sentiment":') == {"product": "kettle"}
+        assert extract_json('{"product": "kettle", "sent') == {"product": "kettle"}
+    
+    def test_truncated_nesting_closed(self):
+        """Test that open arrays and objects are closed in order"""
+        assert repair_json('{"a": [1, {"b": "c"') == '{"a": [1, {"b": "c"}]}'
+    
+    def test_truncated_array(self):
+        """Test repairing a truncated batch array"""
+        assert extract_json_array('[{"review_id": "1"}, {"review_id": "2", "prod') == [
+            {"review_id": "1"}, {"review_id": "2"}
+        ]
+    
+    def test_counters(self):
+        """Test that repairs are counted and valid JSON is not"""
+        extract_json('{"a": 1}')
+        extract_json('{"a": 1,}')
+        with pytest.raises(json.JSONDecodeError):
+            extract_json('{"a": tru}')
+        assert repair_stats.as_dict() == {"attempts": 2, "repaired": 1, "failed": 1}
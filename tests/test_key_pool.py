@@ -0,0 +1,161 @@
+"""
+Unit tests for key_pool module
+"""
+import pytest
+import asyncio
+from google.api_core import exceptions as google_exceptions
+from src.backends import FakeBackend, FakeModel
+from src import metrics
+from src.client_pool import ClientProvider
+from src.key_pool import KeyPool
+from src.llm import LLMClient
+from src.rate_limiter import RateLimiter
+from src.resilience import AdaptiveConcurrency
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_pool(clock, rpms, cooldown=60.0):
+    keys = [f"key-{i}" for i in range(len(rpms))]
+    limiters = [RateLimiter(requests_per_minute=rpm, clock=clock) for rpm in rpms]
+    return KeyPool(keys, limiters, cooldown_seconds=cooldown, clock=clock)
+
+
+class TestKeyPool:
+    def test_from_config_needs_several_keys(self):
+        """Test that a single key does not build a pool"""
+        assert KeyPool.from_config({"api_keys": ["only"]}) is None
+        pool = KeyPool.from_config({
+            "api_keys": ["a", "b"],
+            "rate_limits": {"requests_per_minute": 10},
+            "key_pool": {"cooldown_seconds": 5, "limits": [{}, {"requests_per_minute": 30}]}
+        })
+        assert [key.limiter.requests_per_minute for key in pool.keys] == [10, 30]
+        assert pool.cooldown_seconds == 5
+    
+    def test_routes_to_most_headroom(self, clock):
+        """Test that calls alternate between equal keys and favour the faster one"""
+        pool = make_pool(clock, [60, 60])
+        assert [pool._choose(0)[0].api_key for _ in range(4)] == ["key-0", "key-1", "key-0", "key-1"]
+        
+        pool = make_pool(clock, [10, 60])
+        chosen = [pool._choose(0)[0].api_key for _ in range(7)]
+        assert chosen.count("key-1") == 6
+    
+    def test_throughput_scales_with_keys(self, clock):
+        """Test that N equal keys serve N times the calls in the same waiting time"""
+        single = make_pool(clock, [60])
+        pooled = make_pool(clock, [60, 60, 60])
+        
+        single_wait = max(single._choose(0)[1] for _ in range(10))
+        pooled_wait = max(pooled._choose(0)[1] for _ in range(30))
+        assert pooled_wait == pytest.approx(single_wait)
+    
+    def test_quota_errors_cool_a_key_down(self, clock):
+        """Test that a key is skipped after a quota error until its cooldown expires"""
+        pool = make_pool(clock, [600, 600], cooldown=30)
+        pool.report_quota_error(pool.keys[0])
+        assert {pool._choose(0)[0].api_key for _ in range(3)} == {"key-1"}
+        
+        clock.now = 31
+        assert "key-0" in {pool._choose(0)[0].api_key for _ in range(3)}
+    
+    def test_all_keys_cooling_waits(self, clock):
+        """Test that callers wait for the first key to recover"""
+        pool = make_pool(clock, [60, 60], cooldown=30)
+        pool.report_quota_error(pool.keys[0])
+        clock.now = 10
+        pool.report_quota_error(pool.keys[1])
+        
+        key, wait = pool._choose(0)
+        assert key is None
+        assert wait == pytest.approx(20)
+    
+    def test_utilization_report(self, clock):
+        """Test per-key calls, errors and RPM utilization"""
+        pool = make_pool(clock, [60, 60])
+        for _ in range(4):
+            pool._choose(10)
+        pool.report_quota_error(pool.keys[1])
+        clock.now = 60
+        
+        report = pool.utilization()
+        assert [row["calls"] for row in report] == [2, 2]
+        assert report[0]["key"] == "...ey-0"
+        assert report[0]["rpm_utilization"] == pytest.approx(2 / 60)
+        assert report[1]["quota_errors"] == 1
+        assert report[1]["tokens"] == 20
+
+
+class QuotaBackend(FakeBackend):
+    """Backend whose connections remember their key; 'key-0' is always over quota"""
+    
+    def open_connection(self, asynchronous=False, api_key=None):
+        return api_key
+    
+    def get_model(self, model_name, connection=None):
+        backend = self
+        
+        class KeyModel(FakeModel):
+            async def generate_content_async(self, prompt, **kwargs):
+                if connection == "key-0":
+                    raise google_exceptions.ResourceExhausted("quota")
+                return backend._respond(prompt, "ok")
+        
+        return KeyModel(self, model_name)
+
+
+class TestProviderRouting:
+    def test_quota_error_moves_traffic_to_other_keys(self, clock):
+        """Test that a key returning 429 is taken out of rotation by the provider"""
+        pool = make_pool(clock, [6000, 6000])
+        provider = ClientProvider(QuotaBackend(), key_pool=pool)
+        model = provider.get_model("m")
+        
+        async def run():
+            outcomes = []
+            for _ in range(6):
+                try:
+                    await model.generate_content_async("prompt")
+                    outcomes.append("ok")
+                except google_exceptions.ResourceExhausted:
+                    outcomes.append("429")
+            return outcomes
+        
+        assert asyncio.run(run()) == ["429"] + ["ok"] * 5
+        assert pool.keys[0].quota_errors == 1
+        assert pool.keys[1].calls == 5
+
+    def test_key_wait_is_outside_slot_and_latency(self):
+        """Test that LLMClient waits for a key before taking an AIMD slot and starting the call timer"""
+        concurrency = AdaptiveConcurrency()
+        seen = []
+        
+        class _SlowKeyModel:
+            async def reserve_key_async(self, tokens):
+                seen.append(concurrency.in_flight)
+                await asyncio.sleep(0.2)
+                return "key-1"
+            
+            async def generate_content_async(self, prompt, generation_config=None, api_key=None):
+                seen.append(api_key)
+                return FakeBackend()._respond(prompt, "ok")
+        
+        client = LLMClient(_SlowKeyModel(), "key-wait-test", RateLimiter(requests_per_minute=600000),
+                           concurrency=concurrency)
+        asyncio.run(client.generate_async("prompt"))
+        
+        assert seen == [0, "key-1"]
+        count, total = metrics.LLM_CALL_SECONDS.snapshot(model="key-wait-test")
+        assert count == 1 and total < 0.1
@@ -0,0 +1,45 @@
+"""
+Unit tests for lazy module
+"""
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+import src
+from src.lazy import LazyModule, lazy_import
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyModule:
+    def test_imports_on_first_attribute(self):
+        """Test that the module is imported only when an attribute is read"""
+        module = lazy_import("json")
+        assert "not loaded" in repr(module)
+        assert module.dumps({"a": 1}) == '{"a": 1}'
+        assert "loaded" in repr(module) and "not loaded" not in repr(module)
+        assert module.__dict__["dumps"] is module._module.dumps
+
+    def test_missing_attribute(self):
+        """Test that unknown attributes still raise AttributeError"""
+        module = LazyModule("json")
+        with pytest.raises(AttributeError):
+            module.no_such_function
+
+
+class TestPackageExports:
+    def test_lazy_exports(self):
+        """Test that classes exported by src resolve to their modules' objects"""
+        from src.utils import Review
+        from src.baseline import BaselinePipeline
+        assert src.Review is Review
+        assert src.BaselinePipeline is BaselinePipeline
+        assert "AutoPromptEngine" in dir(src)
+
+    def test_pipelines_import_without_heavy_dependencies(self):
+        """Test that importing the pipelines does not load pandas, NumPy or the Google clients"""
+        heavy = ["pandas", "numpy", "google.generativeai", "google.api_core.exceptions", "matplotlib"]
+        code = ("import sys, src; src.BaselinePipeline; src.AutoPromptEngine; src.Evaluator; "
+                f"print([m for m in {heavy!r} if m in sys.modules])")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "[]"
@@ -0,0 +1,40 @@
+"""
+End-to-end test for main.py on the fake backend
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+import yaml
+from visualize_results import load_results
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestMain:
+    def test_run_feeds_analysis_and_visualization(self, tmp_path):
+        """Test that a normal run writes the files the notebook and visualize_results.py read"""
+        shutil.copytree(ROOT / "data", tmp_path / "data")
+        with open(ROOT / "config" / "prompt_config.yaml") as f:
+            config = yaml.safe_load(f)
+        # Offline, instant and unthrottled, so the run takes a moment instead of the free-tier pace
+        config["backend"].update({"latency": {"mean_ms": 0}, "errors": {}})
+        config["rate_limits"] = {"requests_per_minute": 600000}
+        config.pop("metrics", None)
+        (tmp_path / "config").mkdir()
+        with open(tmp_path / "config" / "prompt_config.yaml", "w") as f:
+            yaml.safe_dump(config, f)
+
+        env = {**os.environ, "AUTOPROMPT_BACKEND": "fake", "PYTHONPATH": str(ROOT)}
+        subprocess.run([sys.executable, str(ROOT / "main.py")], cwd=tmp_path, env=env,
+                       capture_output=True, text=True, check=True, timeout=60)
+
+        results = tmp_path / "results"
+        report = load_results(results / "baseline_results.json", results / "autoprompt_results.json",
+                              results / "benchmark_report.json")
+        assert report is not None and {"baseline", "autoprompt"} <= report.keys()
+        for name in ("baseline", "autoprompt"):
+            with open(results / f"{name}_results.json") as f:
+                assert len(json.load(f)) == 20
@@ -0,0 +1,115 @@
+"""
+Unit tests for metrics module
+"""
+import json
+import urllib.request
+import pytest
+from src import metrics
+from src.backends import FakeResponse
+from src.metrics import MetricsRegistry, Counter, Histogram
+from src.llm import LLMClient
+from src.rate_limiter import RateLimiter
+from src.json_extract import extract_json
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+class _StubModel:
+    def __init__(self, text):
+        self.text = text
+    
+    def generate_content(self, prompt, generation_config=None):
+        return FakeResponse(self.text)
+
+
+class TestMetricsRegistry:
+    def test_counter_per_label(self, registry):
+        """Test that counters accumulate separately per label combination"""
+        calls = Counter("calls", "Calls", ["model"], registry=registry)
+        calls.inc(model="a")
+        calls.inc(2, model="a")
+        calls.inc(model="b")
+        assert calls.value(model="a") == 3
+        assert calls.value(model="b") == 1
+        assert 'calls_total{model="a"} 3.0' in registry.render()
+    
+    def test_counter_rejects_wrong_labels(self, registry):
+        """Test that label names must match the declaration"""
+        calls = Counter("calls", "Calls", ["model"], registry=registry)
+        with pytest.raises(ValueError):
+            calls.inc(pipeline="x")
+        with pytest.raises(ValueError):
+            calls.inc(-1, model="a")
+    
+    def test_duplicate_name_rejected(self, registry):
+        """Test that two metrics cannot share a name"""
+        Counter("calls", "Calls", registry=registry)
+        with pytest.raises(ValueError):
+            Counter("calls", "Calls again", registry=registry)
+    
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test OpenMetrics histogram rendering: cumulative buckets, count and sum"""
+        latency = Histogram("latency_seconds", "Latency", ["model"], buckets=[0.1, 1.0], registry=registry)
+        for value in (0.05, 0.5, 0.7, 3.0):
+            latency.observe(value, model="a")
+        text = registry.render()
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{model="a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{model="a",le="1.0"} 3' in text
+        assert 'latency_seconds_bucket{model="a",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{model="a"} 4' in text
+        assert latency.snapshot(model="a") == (4, pytest.approx(4.25))
+        assert text.endswith("# EOF\n")
+    
+    def test_label_values_are_escaped(self, registry):
+        """Test that quotes in label values cannot break the exposition format"""
+        errors = Counter("errors", "Errors", ["error"], registry=registry)
+        errors.inc(error='bad "json"')
+        assert 'errors_total{error="bad \\"json\\""} 1.0' in registry.render()
+    
+    def test_write_textfile(self, registry, tmp_path):
+        """Test that the textfile holds the rendered metrics"""
+        Counter("calls", "Calls", registry=registry).inc()
+        path = tmp_path / "out" / "metrics.prom"
+        registry.write_textfile(str(path))
+        assert path.read_text() == registry.render()
+    
+    def test_serve_metrics_endpoint(self, registry):
+        """Test that /metrics serves the OpenMetrics text and other paths 404"""
+        Counter("calls", "Calls", registry=registry).inc()
+        server = registry.serve(0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+                assert "calls_total 1.0" in response.read().decode()
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+        finally:
+            server.shutdown()
+
+
+class TestInstrumentation:
+    def test_llm_client_records_calls(self):
+        """Test that a model request records the call, latency, limiter wait and tokens"""
+        model_name = "metrics-test-calls"
+        client = LLMClient(_StubModel(json.dumps({"product": "kettle"})), model_name,
+                           RateLimiter(requests_per_minute=600000))
+        client.generate("Extract the product", parse=extract_json)
+        assert metrics.LLM_CALLS.value(model=model_name) == 1
+        assert metrics.LLM_CALL_SECONDS.snapshot(model=model_name)[0] == 1
+        assert metrics.RATE_LIMIT_WAIT.snapshot(model=model_name)[0] == 1
+        assert metrics.LLM_TOKENS.value(model=model_name, direction="in") > 0
+        assert metrics.LLM_TOKENS.value(model=model_name, direction="out") > 0
+    
+    def test_llm_client_records_parse_failures(self):
+        """Test that unparseable responses are counted"""
+        model_name = "metrics-test-parse"
+        client = LLMClient(_StubModel("no json here"), model_name, RateLimiter(requests_per_minute=600000))
+        with pytest.raises(ValueError):
+            client.generate("Extract the product", parse=extract_json)
+        assert metrics.JSON_PARSE_FAILURES.value(model=model_name) == 1
+
@@ -0,0 +1,94 @@
+"""
+Unit tests for rate_limiter module
+"""
+import pytest
+from src.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    def test_from_config(self):
+        """Test limiter built from the rate_limits config section"""
+        limiter = RateLimiter.from_config({"rate_limits": {"requests_per_minute": 30, "tokens_per_minute": 1000}})
+        assert limiter.requests_per_minute == 30
+        assert limiter.tokens_per_minute == 1000
+    
+    def test_from_config_sums_key_pool(self):
+        """Test that the shared limiter covers the combined quota of every API key"""
+        limiter = RateLimiter.from_config({
+            "api_keys": ["a", "b", "c"],
+            "rate_limits": {"requests_per_minute": 10, "tokens_per_minute": 1000},
+            "key_pool": {"limits": [{"requests_per_minute": 20}]}
+        })
+        assert limiter.requests_per_minute == 40
+        assert limiter.tokens_per_minute == 3000
+    
+    def test_wait_estimate_matches_reservation(self):
+        """Test that wait_estimate predicts the next reservation's wait without taking it"""
+        limiter = RateLimiter(requests_per_minute=10, clock=FakeClock())
+        limiter._reserve(0)
+        assert limiter.wait_estimate() == pytest.approx(6.0)
+        assert limiter._reserve(0) == pytest.approx(6.0)
+    
+    def test_invalid_rate(self):
+        """Test that a non-positive rate is rejected"""
+        with pytest.raises(ValueError):
+            RateLimiter(requests_per_minute=0)
+    
+    def test_requests_are_spaced_evenly(self):
+        """Test that queued requests are spaced at the configured RPM"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=10, clock=clock)
+        
+        waits = [limiter._reserve(0) for _ in range(3)]
+        assert waits == pytest.approx([0.0, 6.0, 12.0])
+    
+    def test_bucket_refills_over_time(self):
+        """Test that capacity returns after idle time"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, burst=2, clock=clock)
+        
+        assert limiter._reserve(0) == 0.0
+        assert limiter._reserve(0) == 0.0
+        clock.now = 2.0
+        assert limiter._reserve(0) == 0.0
+        assert limiter._reserve(0) == 0.0
+        assert limiter._reserve(0) == pytest.approx(1.0)
+    
+    def test_token_limit(self):
+        """Test that large prompts wait on the tokens-per-minute bucket"""
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600, clock=clock)
+        
+        assert limiter._reserve(600) == 0.0
+        # 300 more tokens at 10 tokens/s
+        assert limiter._reserve(300) == pytest.approx(30.0)
+    
+    def test_acquire_sleeps(self):
+        """Test that acquire returns the wait it slept for"""
+        limiter = RateLimiter(requests_per_minute=6000)
+        assert limiter.acquire() == 0.0
+        assert limiter.acquire() == pytest.approx(0.01, abs=0.005)
+    
+    def test_cancelled_waiter_refunds_reservation(self):
+        """Test that a cancelled async acquire gives its slot back"""
+        import asyncio
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=10, clock=clock)
+        
+        async def scenario():
+            limiter._reserve(0)
+            waiter = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        
+        asyncio.run(scenario())
+        assert limiter._reserve(0) == pytest.approx(6.0)
@@ -0,0 +1,180 @@
+"""
+Unit tests for resilience module
+"""
+import asyncio
+import pytest
+from google.api_core import exceptions as google_exceptions
+from src import metrics
+from src.backends import FakeResponse
+from src.baseline import BaselinePipeline
+from src.resilience import AdaptiveConcurrency, classify
+from src.utils import Review
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+def _finish(policy, kind=None):
+    """Take a slot and release it as a success (kind None) or with an error of that kind"""
+    with policy._lock:
+        entered, started = policy._try_enter()
+    assert entered
+    policy._exit(started, kind)
+
+
+class TestClassify:
+    def test_error_kinds(self):
+        """Test that errors are classified by type rather than by message text"""
+        assert classify(google_exceptions.ResourceExhausted("quota")) == "quota"
+        assert classify(google_exceptions.ServiceUnavailable("down")) == "unavailable"
+        assert classify(google_exceptions.DeadlineExceeded("slow")) == "timeout"
+        assert classify(ConnectionResetError()) == "network"
+        assert classify(ValueError("connection timeout in the JSON")) == "other"
+
+
+class TestAdaptiveConcurrency:
+    def test_additive_increase(self, clock):
+        """Test that a full round of successes adds about one slot"""
+        policy = AdaptiveConcurrency(initial_limit=4, clock=clock)
+        for _ in range(4):
+            _finish(policy)
+        assert 4.8 < policy.limit < 5.0
+
+    def test_decrease_once_per_round(self, clock):
+        """Test that errors from requests started before the last cut do not cut again"""
+        policy = AdaptiveConcurrency(initial_limit=8, failure_threshold=100, clock=clock)
+        with policy._lock:
+            starts = [policy._try_enter()[1] for _ in range(3)]
+        clock.now = 1.0
+        for started in starts:
+            policy._exit(started, "quota")
+        assert policy.limit == 4
+        assert policy.decreases == 1
+
+        clock.now = 2.0
+        _finish(policy, "unavailable")
+        assert policy.limit == 2
+        assert policy.errors == {"quota": 3, "unavailable": 1}
+
+    def test_other_errors_keep_limit(self, clock):
+        """Test that non-congestion errors neither shrink the limit nor trip the breaker"""
+        policy = AdaptiveConcurrency(initial_limit=4, failure_threshold=1, clock=clock)
+        _finish(policy, "other")
+        assert policy.limit == 4
+        assert policy.state == "closed"
+
+    def test_circuit_breaker(self, clock):
+        """Test that the breaker opens after the threshold and a successful probe closes it"""
+        policy = AdaptiveConcurrency(initial_limit=4, failure_threshold=3, open_seconds=10, clock=clock)
+        for _ in range(3):
+            clock.now += 1
+            _finish(policy, "unavailable")
+        assert policy.state == "open"
+        assert policy.trips == 1
+        with policy._lock:
+            assert policy._try_enter() == (False, pytest.approx(10))
+
+        clock.now += 10
+        with policy._lock:
+            entered, started = policy._try_enter()
+            assert entered and policy.state == "half_open"
+            # Only the probe runs while half-open
+            assert policy._try_enter() == (False, None)
+        policy._exit(started, None)
+        assert policy.state == "closed"
+
+    def test_failed_probe_reopens(self, clock):
+        """Test that a failing half-open probe opens the breaker again"""
+        policy = AdaptiveConcurrency(failure_threshold=1, open_seconds=5, clock=clock)
+        _finish(policy, "quota")
+        clock.now += 5
+        _finish(policy, "quota")
+        assert policy.state == "open"
+        assert policy.trips == 2
+
+    def test_slot_async_limits_in_flight(self):
+        """Test that no more than `limit` requests run at once"""
+        policy = AdaptiveConcurrency(initial_limit=2, max_limit=2)
+        running = []
+        peak = []
+
+        async def request():
+            async with policy.slot_async():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(main())
+        assert max(peak) == 2
+        assert policy.in_flight == 0
+
+
+class TestRetries:
+    def test_retries_congestion_only(self):
+        """Test that congestion errors are retried and counted while other errors raise at once"""
+        policy = AdaptiveConcurrency(base_delay=0, max_attempts=3)
+        before = metrics.RETRIES.value(pipeline="resilience-test")
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise google_exceptions.ServiceUnavailable("down")
+            return "ok"
+
+        assert policy.run(flaky, "resilience-test") == "ok"
+        assert metrics.RETRIES.value(pipeline="resilience-test") == before + 2
+
+        def broken():
+            attempts.append(1)
+            raise ValueError("bad json")
+
+        attempts.clear()
+        with pytest.raises(ValueError):
+            policy.run(broken, "resilience-test")
+        assert len(attempts) == 1
+
+    def test_quota_backoff_is_longer(self):
+        """Test that quota errors back off longer than other congestion"""
+        policy = AdaptiveConcurrency(base_delay=1.0, max_delay=100)
+        assert 2.0 <= policy.retry_delay("quota", 1) <= 4.0
+        assert 0.5 <= policy.retry_delay("unavailable", 1) <= 1.0
+        assert policy.retry_delay("quota", 10) <= 100
+
+
+class _FlakyModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise google_exceptions.ServiceUnavailable("503 UNAVAILABLE")
+        return FakeResponse('{"product": "Pixel 9", "sentiment": "positive", "reason": "camera"}')
+
+
+class TestPipelineResilience:
+    def test_baseline_retries_unavailable(self, pipeline_config):
+        """Test that the baseline retries a 503 and records it on the shared limit"""
+        baseline = BaselinePipeline({**pipeline_config, "resilience": {"base_delay": 0}})
+        baseline.llm.model = _FlakyModel()
+
+        result = asyncio.run(baseline.process_async(Review(review_id="1", review_text="Love my Pixel 9")))
+
+        assert result.product == "Pixel 9"
+        assert baseline.llm.model.calls == 2
+        assert baseline.resilience.stats()["errors"] == {"unavailable": 1}
@@ -0,0 +1,96 @@
+"""
+Unit tests for scoring module
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from src.scoring import HeuristicScorer, DEFAULT_RULES
+
+
+def legacy_score(data: dict) -> float:
+    """The hand-written heuristic the default rules replace"""
+    score = 0.0
+    if all(field in data for field in ["product", "sentiment", "reason"]):
+        score += 0.4
+    if data.get("sentiment", "").lower() in ["positive", "negative", "neutral", "mixed"]:
+        score += 0.3
+    if 2 < len(data.get("product", "")) < 50:
+        score += 0.2
+    if len(data.get("reason", "")) > 10:
+        score += 0.1
+    return score
+
+
+EXTRACTIONS = [
+    {"product": "kettle", "sentiment": "positive", "reason": "boils water fast"},
+    {"product": "kettle", "sentiment": "Negative", "reason": "short"},
+    {"product": "tv", "sentiment": "angry", "reason": "the picture is too dark"},
+    {"product": "x" * 60, "sentiment": "mixed", "reason": "loud but fast"},
+    {"product": "phone", "sentiment": "neutral"},
+    {"sentiment": "positive", "reason": "works fine for me"},
+    {},
+]
+
+
+@pytest.fixture
+def scorer():
+    return HeuristicScorer(DEFAULT_RULES)
+
+
+class TestHeuristicScorer:
+    def test_default_rules_match_legacy_heuristic(self, scorer):
+        """Test that the default rules score exactly like the original heuristic"""
+        for data in EXTRACTIONS:
+            assert scorer.score(data) == pytest.approx(legacy_score(data))
+    
+    def test_batch_matches_single(self, scorer):
+        """Test that vectorized scoring agrees with one-at-a-time scoring"""
+        batch = EXTRACTIONS + [{"product": None, "sentiment": 3, "reason": float("nan")}]
+        expected = [scorer.score(data) for data in batch]
+        assert scorer.score_batch(batch) == pytest.approx(expected)
+    
+    def test_batch_with_repeated_and_unique_values(self, scorer):
+        """Test that mostly-distinct fields (string path) and repeated ones (lookup path) agree"""
+        batch = [{"product": f"item {i}", "sentiment": ["positive", "bad"][i % 2],
+                  "reason": "r" * (i % 20)} for i in range(200)]
+        expected = [scorer.score(data) for data in batch]
+        assert scorer.score_batch(batch) == pytest.approx(expected)
+    
+    def test_batch_accepts_dataframe(self, scorer):
+        """Test that a DataFrame with one column per field can be scored directly"""
+        frame = pd.DataFrame.from_records(EXTRACTIONS)
+        scores = scorer.score_batch(frame)
+        assert isinstance(scores, np.ndarray)
+        assert scores == pytest.approx([legacy_score(data) for data in EXTRACTIONS])
+    
+    def test_empty_batch(self, scorer):
+        """Test that an empty batch gives an empty array"""
+        assert len(scorer.score_batch([])) == 0
+    
+    def test_regex_rule_from_config(self):
+        """Test that a regex rule declared in config changes the score"""
+        config = {"scoring_rules": DEFAULT_RULES + [
+            {"name": "explains_why", "type": "regex", "field": "reason", "pattern": r"\bbecause\b", "weight": 0.5}
+        ]}
+        scorer = HeuristicScorer.from_config(config)
+        data = {"product": "kettle", "sentiment": "bad", "reason": "Because it leaks"}
+        assert scorer.score(data) == pytest.approx(1.0)
+        assert scorer.explain(data)["explains_why"] is True
+        assert scorer.score_batch([data, {"reason": "it leaks"}]) == pytest.approx([1.0, 0.0])
+    
+    def test_score_is_capped(self):
+        """Test that the total never exceeds 1.0"""
+        scorer = HeuristicScorer([{"type": "required", "fields": ["a"], "weight": 0.8},
+                                  {"type": "length", "field": "a", "min": 1, "weight": 0.8}])
+        assert scorer.score({"a": "x"}) == 1.0
+        assert scorer.score_batch([{"a": "x"}]).tolist() == [1.0]
+    
+    def test_missing_config_uses_defaults(self):
+        """Test that an absent scoring_rules section falls back to the original rules"""
+        scorer = HeuristicScorer.from_config({})
+        assert [rule.name for rule in scorer.rules] == [rule["name"] for rule in DEFAULT_RULES]
+    
+    def test_unknown_rule_type(self):
+        """Test that an unknown rule type is rejected when the rules are compiled"""
+        with pytest.raises(ValueError):
+            HeuristicScorer([{"type": "fuzzy", "field": "product"}])
@@ -0,0 +1,177 @@
+"""
+Unit tests for semantic_scorer module
+"""
+import pytest
+import asyncio
+import json
+from src.backends import FakeResponse
+from src.semantic_scorer import SemanticScorer, build_scoring_prompt, parse_scores
+from src.llm import LLMClient, count_calls
+from src.rate_limiter import RateLimiter
+from src.autoprompt import AutoPromptEngine
+from src.streaming import stream_process
+from src.utils import Review, ExtractedData, JsonlResultWriter, iter_results
+
+
+class _JudgeModel:
+    """Scores every item 3 except those whose extraction has no reason (1)"""
+    def __init__(self):
+        self.calls = 0
+    
+    def _respond(self, prompt):
+        self.calls += 1
+        items = json.loads(prompt.split("Items: ", 1)[1])
+        return FakeResponse(json.dumps([
+            {"id": item["id"], "score": 3 if item["extraction"].get("reason") else 1} for item in items
+        ]))
+    
+    def generate_content(self, prompt, generation_config=None):
+        return self._respond(prompt)
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        await asyncio.sleep(0)
+        return self._respond(prompt)
+
+
+@pytest.fixture
+def judge():
+    return _JudgeModel()
+
+
+def make_scorer(judge, **kwargs):
+    client = LLMClient(judge, "judge", RateLimiter(requests_per_minute=600000))
+    return SemanticScorer(client, **kwargs)
+
+
+class TestPromptAndParsing:
+    def test_prompt_lists_every_pair(self):
+        """Test that one prompt carries all pairs with positional ids"""
+        prompt = build_scoring_prompt([("great kettle", {"product": "kettle"}), ("bad fan", {})])
+        items = json.loads(prompt.split("Items: ", 1)[1])
+        assert [item["id"] for item in items] == [0, 1]
+    
+    def test_parse_scores(self):
+        """Test normalisation, clamping and missing items"""
+        scores = parse_scores('[{"id": 0, "score": 3}, {"id": 2, "score": 9}, {"id": "x"}]', 3)
+        assert scores == [1.0, None, 1.0]
+    
+    def test_unknown_mode(self, judge):
+        """Test that an unknown mode is rejected"""
+        with pytest.raises(ValueError):
+            make_scorer(judge, mode="later")
+
+
+class TestSemanticScorer:
+    def test_score_batch_chunks_requests(self, judge):
+        """Test that pairs are scored batch_size at a time"""
+        scorer = make_scorer(judge, batch_size=4)
+        scores = scorer.score_batch([("text", {"reason": "r"})] * 10)
+        
+        assert scores == [1.0] * 10
+        assert judge.calls == 3
+        assert scorer.requests == 3
+        assert scorer.items_scored == 10
+    
+    def test_inline_calls_share_a_request(self, judge):
+        """Test that concurrent score_async calls are coalesced"""
+        scorer = make_scorer(judge, mode="inline", batch_size=20, max_wait_ms=10)
+        
+        async def run():
+            with count_calls() as calls:
+                scores = await asyncio.gather(*(
+                    scorer.score_async("text", {"reason": "r" if i % 2 else ""}) for i in range(8)
+                ))
+            return scores, calls.count
+        
+        scores, counted = asyncio.run(run())
+        assert scores == [pytest.approx(1 / 3), 1.0] * 4
+        assert judge.calls == 1
+        # Shared scorer requests are not charged to the caller's review
+        assert counted == 0
+    
+    def test_deferred_refines_confidence(self, judge):
+        """Test that deferred results get blended confidence after finish"""
+        scorer = make_scorer(judge, batch_size=3, weight=0.5)
+        results = [ExtractedData(review_id=str(i), product="p", sentiment="positive",
+                                 reason="", confidence=0.6) for i in range(4)]
+        
+        async def run():
+            for result in results:
+                scorer.defer(result, "text", {"reason": ""})
+            await scorer.finish_async()
+        
+        asyncio.run(run())
+        assert [r.confidence for r in results] == [pytest.approx(0.6 * 0.5 + 1 / 3 * 0.5)] * 4
+        assert judge.calls == 2
+        assert len(scorer.drain_refined()) == 4
+        assert scorer.drain_refined() == []
+
+
+class _ExtractionModel:
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        return FakeResponse(json.dumps({"product": "kettle", "sentiment": "positive", "reason": "boils water fast"}))
+
+
+class TestEngineScoring:
+    @pytest.fixture
+    def engine(self, pipeline_config):
+        engine = AutoPromptEngine({
+            **pipeline_config,
+            "generator_model": "gen-model",
+            "scoring_model": "judge-model",
+            "max_prompts_per_item": 1,
+            "use_llm_scoring": True,
+            "semantic_scoring": {"mode": "deferred", "batch_size": 4},
+        })
+        engine.generator.model = _ExtractionModel()
+        engine.scorer.model = _JudgeModel()
+        return engine
+    
+    def test_deferred_scoring_is_batched(self, engine):
+        """Test that ten reviews cost ten extraction calls and three scorer calls"""
+        reviews = [Review(review_id=str(i), review_text=f"kettle {i}") for i in range(10)]
+        results = asyncio.run(engine.process_many(reviews, concurrency=4))
+        
+        assert engine.generator.model.calls == 10
+        assert engine.scorer.model.calls == 3
+        assert all(r.confidence == pytest.approx(1.0) for r in results)
+        assert all(r.llm_calls == 1 for r in results)
+    
+    def test_sync_process_scores_before_returning(self, engine):
+        """Test that sync process() returns refined results instead of queueing them"""
+        async def _extract(prompt, generation_config=None):
+            return FakeResponse(json.dumps({"product": "kettle", "sentiment": "positive", "reason": "no"}))
+        engine.generator.model.generate_content_async = _extract
+        results = [engine.process(Review(review_id=str(i), review_text=f"kettle {i}")) for i in range(3)]
+        
+        assert engine.scorer.model.calls == 3
+        assert engine.semantic_scorer._deferred == []
+        assert all(r.confidence == pytest.approx(0.8 * 0.9 + 0.2) for r in results)
+    
+    def test_concurrent_sync_process_scores_before_returning(self, engine):
+        """Test that deferred scoring on the engine's own loop also finishes in process()"""
+        engine.concurrent_variants = True
+        result = engine.process(Review(review_id="1", review_text="kettle"))
+        assert engine.scorer.model.calls == 1
+        assert result.confidence == pytest.approx(1.0)
+    
+    def test_stream_rewrites_refined_results(self, engine, tmp_path):
+        """Test that refined confidences reach the streamed output"""
+        engine.semantic_scorer.weight = 0.5
+        engine.scorer.model = type("LowJudge", (_JudgeModel,), {
+            "_respond": lambda self, prompt: FakeResponse('[{"id": 0, "score": 0}, {"id": 1, "score": 0}, '
+                                                       '{"id": 2, "score": 0}, {"id": 3, "score": 0}]')
+        })()
+        reviews = [Review(review_id=str(i), review_text=f"kettle {i}") for i in range(6)]
+        path = str(tmp_path / "out.jsonl")
+        
+        with JsonlResultWriter(path) as writer:
+            processed = asyncio.run(stream_process(engine, reviews, writer, concurrency=2))
+        
+        latest = {r.review_id: r for r in iter_results(path)}
+        assert processed == 6
+        assert all(r.confidence == pytest.approx(0.5) for r in latest.values())
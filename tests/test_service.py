@@ -0,0 +1,192 @@
+"""
+Unit tests for service module
+"""
+import pytest
+import asyncio
+import json
+from src.backends import FakeResponse
+from src.service import MicroBatcher, ExtractionService, Overloaded
+from src.baseline import BaselinePipeline
+from src.utils import Review, ExtractedData
+
+
+class _BatchModel:
+    """Answer batch and single prompts, echoing each review's text as the product"""
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        if "Reviews: " in prompt:
+            items = json.loads(prompt.split("Reviews: ")[1])
+            return FakeResponse(json.dumps([
+                {"review_id": item["review_id"], "product": item["text"], "sentiment": "positive", "reason": "r"}
+                for item in items
+            ]))
+        text = prompt.split("Review: '")[1].rstrip("'\n")
+        return FakeResponse(json.dumps({"product": text, "sentiment": "positive", "reason": "r"}))
+
+
+class _Handler:
+    """Record each batch and echo the review text as the product"""
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+    
+    async def __call__(self, reviews):
+        self.batches.append([review.review_text for review in reviews])
+        await asyncio.sleep(self.delay)
+        return [ExtractedData(review_id=r.review_id, product=r.review_text, sentiment="positive",
+                              reason="", confidence=1.0, prompt_used="stub") for r in reviews]
+
+
+def submit_all(batcher, texts, **kwargs):
+    async def _run():
+        results = await asyncio.gather(*(
+            batcher.submit(Review(review_id=f"caller-{i}", review_text=text), **kwargs)
+            for i, text in enumerate(texts)
+        ), return_exceptions=True)
+        await batcher.close()
+        return results
+    return asyncio.run(_run())
+
+
+class TestMicroBatcher:
+    def test_concurrent_requests_share_batches(self):
+        """Test that concurrent submissions are coalesced up to max_items per call"""
+        handler = _Handler()
+        batcher = MicroBatcher(handler, max_items=4, max_wait_ms=20)
+        results = submit_all(batcher, [f"item {i}" for i in range(10)])
+        
+        assert [result.product for result in results] == [f"item {i}" for i in range(10)]
+        assert [result.review_id for result in results] == [f"caller-{i}" for i in range(10)]
+        assert sorted(len(batch) for batch in handler.batches) == [2, 4, 4]
+        assert batcher.stats()["avg_batch_size"] == pytest.approx(10 / 3)
+    
+    def test_callers_may_reuse_review_ids(self):
+        """Test that two callers sending the same review_id each get their own result"""
+        batcher = MicroBatcher(_Handler(), max_items=10, max_wait_ms=20)
+        
+        async def _run():
+            results = await asyncio.gather(
+                batcher.submit(Review(review_id="same", review_text="first")),
+                batcher.submit(Review(review_id="same", review_text="second")),
+            )
+            await batcher.close()
+            return results
+        
+        assert [result.product for result in asyncio.run(_run())] == ["first", "second"]
+    
+    def test_internal_ids_unique_across_batchers(self):
+        """Test that a restarted batcher does not reuse the internal ids of an earlier one"""
+        seen = []
+        
+        async def _record(reviews):
+            seen.extend(review.review_id for review in reviews)
+            return await _Handler()(reviews)
+        
+        for _ in range(2):
+            submit_all(MicroBatcher(_record, max_items=4, max_wait_ms=5), ["a", "b"])
+        assert len(seen) == 4 and len(set(seen)) == 4
+    
+    def test_backpressure_rejects_when_full(self):
+        """Test that requests beyond max_pending are rejected instead of queued"""
+        batcher = MicroBatcher(_Handler(delay=0.05), max_items=1, max_pending=3, max_concurrent_batches=1)
+        results = submit_all(batcher, [str(i) for i in range(5)])
+        
+        assert sum(isinstance(result, Overloaded) for result in results) == 2
+        assert sum(isinstance(result, ExtractedData) for result in results) == 3
+        assert batcher.stats()["rejected"] == 2
+    
+    def test_timeout(self):
+        """Test that a slow batch times out the request without breaking later ones"""
+        handler = _Handler(delay=0.2)
+        batcher = MicroBatcher(handler, max_items=10, max_wait_ms=1)
+        results = submit_all(batcher, ["slow"], timeout=0.05)
+        assert isinstance(results[0], asyncio.TimeoutError)
+        assert batcher.pending == 0
+        
+        handler.delay = 0
+        assert submit_all(batcher, ["fast"], timeout=1)[0].product == "fast"
+    
+    def test_handler_error_reaches_callers(self):
+        """Test that a failed batch raises in every waiting request"""
+        async def failing(reviews):
+            raise RuntimeError("backend down")
+        
+        results = submit_all(MicroBatcher(failing, max_wait_ms=5), ["a", "b"])
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+
+class TestExtractionService:
+    @pytest.fixture
+    def config(self, pipeline_config):
+        return {**pipeline_config, "service": {"max_wait_ms": 20, "max_batch_items": 8}}
+    
+    def test_requests_become_batched_calls(self, config):
+        """Test that concurrent /extract calls reach the model as one batched request"""
+        baseline = BaselinePipeline(config)
+        baseline.llm.model = _BatchModel()
+        service = ExtractionService(config, pipelines={"baseline": baseline})
+        
+        async def _run():
+            results = await asyncio.gather(*(
+                service.extract(Review(review_id=str(i), review_text=f"kettle {i}"), "baseline")
+                for i in range(8)
+            ))
+            await service.close()
+            return results
+        
+        results = asyncio.run(_run())
+        assert [result.product for result in results] == [f"kettle {i}" for i in range(8)]
+        assert [result.review_id for result in results] == [str(i) for i in range(8)]
+        assert baseline.llm.model.calls == 1
+    
+    def test_repeated_request_hits_cache(self, config, tmp_path):
+        """Test that the same review sent again is answered from the response cache"""
+        config = {**config, "cache": {"enabled": True, "path": str(tmp_path / "cache.sqlite")}}
+        baseline = BaselinePipeline(config)
+        baseline.llm.model = _BatchModel()
+        service = ExtractionService(config, pipelines={"baseline": baseline})
+        
+        async def _run():
+            first = await service.extract(Review(review_id="1", review_text="kettle"), "baseline")
+            second = await service.extract(Review(review_id="2", review_text="kettle"), "baseline")
+            await service.close()
+            return first, second
+        
+        first, second = asyncio.run(_run())
+        assert (first.review_id, second.review_id) == ("1", "2")
+        assert second.product == "kettle"
+        assert baseline.llm.model.calls == 1
+    
+    def test_refinements_do_not_accumulate(self, config):
+        """Test that the service drains a pipeline's refined results after each batch"""
+        class _RefiningPipeline:
+            def __init__(self):
+                self.refined = []
+            
+            async def process_batch_async(self, reviews):
+                results = await _Handler()(reviews)
+                self.refined.extend(results)
+                return results
+            
+            def drain_refined(self):
+                refined, self.refined = self.refined, []
+                return refined
+        
+        pipeline = _RefiningPipeline()
+        service = ExtractionService(config, pipelines={"autoprompt": pipeline})
+        
+        async def _run():
+            await service.extract(Review(review_id="1", review_text="kettle"))
+            await service.close()
+        
+        asyncio.run(_run())
+        assert pipeline.refined == []
+    
+    def test_unknown_pipeline(self, config):
+        """Test that an unknown pipeline name raises KeyError"""
+        service = ExtractionService(config, pipelines={"baseline": BaselinePipeline(config)})
+        with pytest.raises(KeyError):
+            asyncio.run(service.extract(Review(review_id="1", review_text="x"), "nope"))
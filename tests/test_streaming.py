@@ -0,0 +1,50 @@
+"""
+Unit tests for streaming module
+"""
+import asyncio
+from src.streaming import stream_process
+from src.utils import Review, ExtractedData, JsonlResultWriter, iter_results
+
+
+class _EchoPipeline:
+    """Minimal pipeline recording the largest batch it was handed"""
+    def __init__(self, batching=None):
+        self.batching = batching or {}
+        self.batch_sizes = []
+    
+    async def process_batch_async(self, reviews):
+        self.batch_sizes.append(len(reviews))
+        await asyncio.sleep(0)
+        return [
+            ExtractedData(review_id=r.review_id, product=r.review_text, sentiment="positive", reason="")
+            for r in reviews
+        ]
+
+
+def _reviews(n):
+    for i in range(n):
+        yield Review(review_id=str(i), review_text=f"item{i}")
+
+
+class TestStreamProcess:
+    def test_writes_every_result(self, tmp_path):
+        """Test that every streamed review ends up in the JSONL output"""
+        path = str(tmp_path / "results.jsonl")
+        pipeline = _EchoPipeline()
+        
+        with JsonlResultWriter(path) as writer:
+            count = asyncio.run(stream_process(pipeline, _reviews(50), writer, concurrency=4, max_pending=3))
+        
+        assert count == 50
+        assert sorted(int(r.review_id) for r in iter_results(path)) == list(range(50))
+        assert set(pipeline.batch_sizes) == {1}
+    
+    def test_uses_pipeline_batching(self, tmp_path):
+        """Test that batching settings group the stream"""
+        path = str(tmp_path / "results.jsonl")
+        pipeline = _EchoPipeline({"enabled": True, "max_items": 4, "max_tokens": 1000})
+        
+        with JsonlResultWriter(path) as writer:
+            asyncio.run(stream_process(pipeline, _reviews(10), writer, concurrency=2))
+        
+        assert sorted(pipeline.batch_sizes) == [2, 4, 4]
@@ -0,0 +1,114 @@
+"""
+Unit tests for tracing module
+"""
+import asyncio
+import json
+import pytest
+from src import tracing
+from src.tracing import Tracer, load_spans
+from src.resilience import AdaptiveConcurrency
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracing.set_tracer(tracer)
+    yield tracer
+    tracing.set_tracer(Tracer(enabled=False))
+
+
+def by_name(spans):
+    return {span["name"]: span for span in spans}
+
+
+class TestTracer:
+    def test_spans_nest(self, tracer):
+        """Test that inner spans record their parent and share the trace"""
+        with tracing.span("review", review_id="1"):
+            with tracing.span("variant", index=0):
+                pass
+        spans = by_name(tracer.spans())
+        assert spans["review"]["parent_id"] is None
+        assert spans["variant"]["parent_id"] == spans["review"]["span_id"]
+        assert spans["variant"]["trace_id"] == spans["review"]["trace_id"]
+        assert spans["review"]["attrs"] == {"review_id": "1"}
+        assert spans["review"]["duration"] >= spans["variant"]["duration"]
+    
+    def test_tasks_inherit_parent(self, tracer):
+        """Test that spans in concurrently spawned tasks hang off the span that spawned them"""
+        async def variant(i):
+            with tracing.span("variant", index=i):
+                await asyncio.sleep(0)
+        
+        async def review():
+            with tracing.span("review"):
+                await asyncio.gather(*(asyncio.create_task(variant(i)) for i in range(3)))
+        
+        asyncio.run(review())
+        spans = tracer.spans()
+        root = next(span for span in spans if span["name"] == "review")
+        variants = [span for span in spans if span["name"] == "variant"]
+        assert len(variants) == 3
+        assert all(span["parent_id"] == root["span_id"] for span in variants)
+    
+    def test_error_recorded(self, tracer):
+        """Test that a span closed by an exception records its type"""
+        with pytest.raises(ValueError):
+            with tracing.span("parse"):
+                raise ValueError("bad json")
+        assert tracer.spans()[0]["attrs"]["error"] == "ValueError"
+    
+    def test_disabled_is_noop(self):
+        """Test that the default tracer records nothing"""
+        with tracing.span("review") as span:
+            assert span is None
+        assert tracing.get_tracer().spans() == []
+    
+    def test_jsonl_export(self, tmp_path):
+        """Test that JSONL traces hold one span per line, readable by load_spans"""
+        path = str(tmp_path / "trace.jsonl")
+        tracer = Tracer(path)
+        with tracer.span("review"):
+            with tracer.span("request"):
+                pass
+        tracer.close()
+        with open(path) as f:
+            assert len(f.readlines()) == 2
+        assert {span["name"] for span in load_spans(path)} == {"review", "request"}
+    
+    def test_chrome_export(self, tmp_path):
+        """Test that .json paths get Chrome trace events that round-trip through load_spans"""
+        path = str(tmp_path / "trace.json")
+        tracer = Tracer(path)
+        with tracer.span("review", review_id="7"):
+            with tracer.span("request"):
+                pass
+        tracer.close()
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        complete = [event for event in events if event["ph"] == "X"]
+        assert len(complete) == 2
+        assert len({event["tid"] for event in complete}) == 1
+        assert any(event["ph"] == "M" and event["args"]["name"] == "review 7" for event in events)
+        spans = by_name(load_spans(path))
+        assert spans["request"]["parent_id"] == spans["review"]["span_id"]
+        assert spans["review"]["attrs"] == {"review_id": "7"}
+    
+    def test_retry_sleeps_traced(self, tracer):
+        """Test that retry backoff through tracing.sleep / sleep_async appears as spans"""
+        policy = AdaptiveConcurrency(base_delay=0, max_attempts=2)
+        attempts = []
+        
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise ConnectionError("try again")
+        
+        async def flaky_async():
+            attempts.append(1)
+            if len(attempts) < 4:
+                raise ConnectionError("try again")
+        
+        policy.run(flaky, "tracing-test")
+        asyncio.run(policy.run_async(flaky_async, "tracing-test"))
+        assert [span["name"] for span in tracer.spans()] == ["sleep", "sleep"]
@@ -2,7 +2,7 @@
 Unit tests for utils module
 """
 import pytest
-from src.utils import Review, ExtractedData, load_reviews, save_results
+from src.utils import Review, ExtractedData, load_reviews, save_results, iter_reviews, iter_results, JsonlResultWriter
 import pandas as pd
 import json
 from pathlib import Path
@@ -101,3 +101,34 @@ class TestSaveResults:
             assert data[0]['product'] == "Test"
         finally:
             Path(temp_path).unlink()
+
+class TestIterReviews:
+    def test_iter_reviews_csv_chunks(self, tmp_path):
+        """Test streaming reviews from CSV across chunk boundaries"""
+        path = tmp_path / "reviews.csv"
+        path.write_text("review_id,review_text\n" + "".join(f"{i},text {i}\n" for i in range(5)))
+        
+        reviews = list(iter_reviews(str(path), chunksize=2))
+        assert [r.review_id for r in reviews] == ["0", "1", "2", "3", "4"]
+        assert reviews[3].review_text == "text 3"
+    
+    def test_iter_reviews_jsonl(self, tmp_path):
+        """Test streaming reviews from JSONL"""
+        path = tmp_path / "reviews.jsonl"
+        path.write_text('{"review_id": 7, "review_text": "Great"}\n\n{"review_id": "8", "review_text": "Bad"}\n')
+        
+        reviews = list(iter_reviews(str(path)))
+        assert [r.review_id for r in reviews] == ["7", "8"]
+
+class TestJsonlResultWriter:
+    def test_round_trip(self, tmp_path):
+        """Test that written results stream back unchanged"""
+        path = str(tmp_path / "out" / "results.jsonl")
+        result = ExtractedData(review_id="1", product="Test", sentiment="positive", reason="Good")
+        
+        with JsonlResultWriter(path) as writer:
+            writer.write(result)
+            # Each record is on disk before the writer closes
+            assert len(Path(path).read_text().splitlines()) == 1
+        
+        assert list(iter_results(path)) == [result]
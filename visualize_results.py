@@ -3,9 +3,22 @@ Results Visualization Script
 Generates comparison charts for baseline vs AutoPrompt performance
 """
 import json
-import matplotlib.pyplot as plt
-import numpy as np
 from pathlib import Path
+from src.lazy import lazy_import
+from src.tracing import load_spans
+
+# Imported on first use: a missing report exits before paying for matplotlib
+plt = lazy_import("matplotlib.pyplot")
+np = lazy_import("numpy")
+
+# Leaf spans drawn on the timeline (container spans like variant/llm_attempt are not)
+TRACE_COLORS = {
+    'request': '#3b82f6',
+    'rate_limit_wait': '#f59e0b',
+    'sleep': '#ef4444',
+    'parse': '#10b981',
+    'score': '#8b5cf6',
+}
 
 def load_results(baseline_path="results/baseline_results.json", 
                  autoprompt_path="results/autoprompt_results.json",
@@ -148,6 +161,73 @@ def create_summary_metrics(report, output_path="results/summary_metrics.png"):
     plt.savefig(output_path, dpi=300, bbox_inches='tight')
     print(f"✅ Summary metrics saved to {output_path}")
 
+def create_trace_timeline(trace_path="results/trace.jsonl", output_path="results/trace_timeline.png"):
+    """Gantt chart of a traced run: one row per concurrency slot, plus requests in flight"""
+    spans = load_spans(trace_path)
+    if not spans:
+        print(f"⚠️  No spans in {trace_path}")
+        return
+    t0 = min(span['start'] for span in spans)
+    end = max(span['start'] + span['duration'] for span in spans) - t0
+    
+    # Pack top-level spans (reviews, batches) into the fewest rows that never overlap
+    roots = sorted((span for span in spans if span['parent_id'] is None), key=lambda span: span['start'])
+    row_ends, row_of = [], {}
+    for root in roots:
+        start = root['start'] - t0
+        row = next((i for i, row_end in enumerate(row_ends) if row_end <= start), len(row_ends))
+        if row == len(row_ends):
+            row_ends.append(0.0)
+        row_ends[row] = start + root['duration']
+        row_of[root['trace_id']] = row
+    
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True,
+                                   gridspec_kw={'height_ratios': [3, 1]})
+    
+    # Whole review/batch in grey: time not covered by a colored span is spent elsewhere
+    for root in roots:
+        ax1.broken_barh([(root['start'] - t0, root['duration'])], (row_of[root['trace_id']] - 0.4, 0.8),
+                        facecolors='#e2e8f0', edgecolor='#94a3b8', linewidth=0.5)
+    for span in spans:
+        color = TRACE_COLORS.get(span['name'])
+        if color and span['trace_id'] in row_of:
+            ax1.broken_barh([(span['start'] - t0, span['duration'])], (row_of[span['trace_id']] - 0.3, 0.6),
+                            facecolors=color)
+    ax1.legend(handles=[plt.Rectangle((0, 0), 1, 1, color=color) for color in TRACE_COLORS.values()]
+               + [plt.Rectangle((0, 0), 1, 1, color='#e2e8f0')],
+               labels=list(TRACE_COLORS) + ['other'], loc='upper right', fontsize=9, ncol=3)
+    ax1.set_ylabel('Concurrency slot', fontweight='bold')
+    ax1.set_yticks(range(len(row_ends)))
+    ax1.set_ylim(-0.6, max(len(row_ends), 1) - 0.4)
+    ax1.invert_yaxis()
+    ax1.set_title(f'Run Timeline ({len(roots)} reviews/batches, peak concurrency {len(row_ends)})',
+                  fontsize=14, fontweight='bold')
+    
+    # Requests in flight over time; shaded where none are (idle)
+    edges = sorted([(span['start'] - t0, 1) for span in spans if span['name'] == 'request']
+                   + [(span['start'] + span['duration'] - t0, -1) for span in spans if span['name'] == 'request'])
+    times, in_flight, current = [0.0], [0], 0
+    for t, delta in edges:
+        current += delta
+        times.append(t)
+        in_flight.append(current)
+    times.append(end)
+    in_flight.append(current)
+    times, in_flight = np.array(times), np.array(in_flight)
+    ax2.step(times, in_flight, where='post', color='#3b82f6')
+    idle = in_flight[:-1] == 0
+    for t_start, t_end in zip(times[:-1][idle], times[1:][idle]):
+        ax2.axvspan(t_start, t_end, color='#fecaca', alpha=0.6, linewidth=0)
+    idle_time = float(np.sum(np.diff(times)[idle]))
+    ax2.set_ylabel('Requests\nin flight', fontweight='bold')
+    ax2.set_xlabel('Seconds since start', fontweight='bold')
+    ax2.set_title(f'Idle (no request in flight): {idle_time:.1f}s of {end:.1f}s', fontsize=11)
+    ax2.grid(axis='y', alpha=0.3, linestyle='--')
+    
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    print(f"✅ Trace timeline saved to {output_path}")
+
 def main():
     # Ensure results directory exists
     Path("results").mkdir(exist_ok=True)
@@ -169,6 +249,12 @@ def main():
     print("  - results/comparison_chart.png")
     print("  - results/improvement_chart.png")
     print("  - results/summary_metrics.png")
+    
+    # Timeline of a traced run (tracing.enabled in the config)
+    trace_path = next((p for p in ("results/trace.jsonl", "results/trace.json") if Path(p).exists()), None)
+    if trace_path:
+        create_trace_timeline(trace_path)
+        print("  - results/trace_timeline.png")
 
 if __name__ == "__main__":
     main()